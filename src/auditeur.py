@@ -24,49 +24,29 @@ ressources avant de venir poser vos questions à un technicien.
 # Voir :doc:`deps` pour les détails
 import serial # <https://www.pyserial.com/docs>
 import numpy as np # <https://numpy.org/>
-import scipy as sp # <https://scipy.org/>
-import scipy.signal.windows
-import matplotlib as mpl # <https://matplotlib.org/>
-import matplotlib.pyplot as plt
-import pandas as pd # <https://pandas.pydata.org/>
 import logging # <https://docs.python.org/3/library/logging.html>
 import time # <https://docs.python.org/3/library/time.html>
 
+from extra.tampon import TamponCirculaire
+from extra.lecteur import LecteurSérie, Découpeur
+from extra.rendu import RenduBlit
+from extra.loop import Ordonnanceur, Arrêt
+from extra.fft import STFT
+from extra.horloge import Horloge
+from extra.enregistreur import Enregistreur
+from extra.relecture import Relecture
+from extra.analyse import AnalyseParallèle
+from extra.sondes import sondes
+from extra.parseur import BlocInvalide, SEP_BLOC
+from extra.trames import analyser, schéma as lire_schéma, séparateur, Schéma, PROTOCOLES, TEXTE, BINAIRE
+
 # Définitions
 # Voir :doc:`defs`
 
-DELIM_VAL = b'[]\r\n '
-'''Caractères délimitant les listes de valeurs dans la communication avec le micro-contrôleur
-
-Le programme d'annonceur sur le micro-contrôleur envoie les données avec la
-même syntaxe qu'une liste Python. On peut donc retirer les caractères de
-:py:var:`DELIM_VAL` des bouts de la chaîne avec :py:meth:`str.strip`.
-'''
-
-SEP_NOM = b'='
-'''Séparateur du nom de variable ou colonne et de la liste de données
-
-Le nom de la variable ou colonne lue sur la ligne série est séparé des données par un signe ``=``.
-'''
-
-SEP_VAL = b','
-'''Séparateur de valeurs
-
-Les valeurs dans la liste sont séparées par des virgules.
-'''
-
-SEP_LIGNE = b'\r\n'
-'''Séparateur de ligne du micro-contrôleur
-
-Arduino utilise la séquence ``\\r\\n`` pour finir les lignes, au lieu du plus
-commun ``\\n``. Il faut donc régler nos séparateurs en conséquence.
-'''
-
-SEP_BLOC = SEP_LIGNE*2
-'''Séparateur de blocs de données
-
-Les blocs de données sont séparés par une ligne vide, soit deux saut de ligne/retours chariots.
-'''
+# Le format des blocs envoyés par l'annonceur, et les séparateurs
+# :py:data:`extra.parseur.SEP_NOM`, :py:data:`extra.parseur.SEP_VAL`,
+# :py:data:`extra.parseur.SEP_LIGNE` et :py:data:`extra.parseur.SEP_BLOC`,
+# sont définis dans :py:mod:`extra.parseur`.
 
 PORT: str = '/dev/cu.usbmodemFA13201'
 '''Port série à utiliser pour le programme
@@ -101,11 +81,49 @@ envoyés. Pour des chiffres, on peut assumer du ASCII 8b, avec un message long
 un délai de 0.8ms. Avec une petite marge, on arrive à 0.005s.
 '''
 
-DELAI_PLT: float = 0.01
-'''Délai de pause de l'afficahge :py:mod:`matplotlib`
+PRÊT: float = 5.
+'''Délai maximal en secondes pour recevoir la bannière de l'annonceur
 
-:py:mod:`matplotlib` a besoin d'être interrompu à certains moments pour que le
-programme d'acquisition continue de s'exécuter. La pause n'a pas besoin d'être longue.
+L'Arduino redémarre à l'ouverture du port, et n'envoie sa bannière qu'une
+fois prêt, en général après une à deux secondes. La première mesure est
+lue dès que la bannière arrive, plutôt qu'après une attente fixe. Voir
+:py:meth:`extra.lecteur.Découpeur.attendre`.
+'''
+
+PROTOCOLE: str | None = None
+'''Protocole des blocs envoyés par l'annonceur
+
+:py:data:`extra.trames.TEXTE` pour des listes Python en texte,
+:py:data:`extra.trames.BINAIRE` pour des trames binaires, environ deux fois
+plus compactes et sans conversion de texte. ``None`` pour utiliser le
+protocole annoncé dans la bannière de l'annonceur. Voir :py:mod:`extra.trames`.
+'''
+
+SONDES: bool | str = False
+'''Chronométrage des étapes de la boucle
+
+``False`` pour ne rien mesurer, ``True`` pour rapporter la durée de
+:py:func:`prendre_mesure`, :py:func:`fft`, :py:func:`plot`, ... avec
+:py:mod:`logging`, ou le nom d'un fichier où ajouter aussi chaque rapport
+en JSON. Voir :py:mod:`extra.sondes`.
+'''
+
+AFFICHAGE: bool = True
+'''Affichage des mesures en direct
+
+``False`` pour un mode sans affichage, par exemple sur un serveur sans
+écran: aucune figure n'est créée, matplotlib n'est jamais importé, et le
+programme ne fait qu'acquérir, analyser et enregistrer (voir
+:py:data:`ENREGISTREMENT`) jusqu'à ce qu'il reçoive ``SIGINT`` (^C) ou
+``SIGTERM``. Voir :py:class:`extra.loop.Arrêt`.
+'''
+
+FPS: float = 30
+'''Nombre maximal d'images par seconde de l'affichage
+
+L'affichage est limité indépendamment de l'acquisition: des blocs qui
+arrivent plus vite que ça sont quand même lus et analysés, mais ne sont pas
+tous affichés. Voir :py:class:`extra.loop.Ordonnanceur`.
 '''
 
 # Définition des indices pour les deux types de graphiques
@@ -125,35 +143,158 @@ autres:
 - La précision du convertisseur analogique-numérique
 - La fréquence d'échantillonage
 - L'intervalle sur lequel les mesures sont prises.
+
+En pratique, le nombre de mesures de chaque canal est lu dans la bannière de
+l'annonceur, voir :py:class:`extra.trames.Schéma`. ``N_max`` ne sert plus
+qu'à fixer :py:data:`N_historique` et :py:data:`SAUT`.
+'''
+
+N_historique: int = 16 * N_max
+'''Nombre de mesures conservées dans :py:data:`res`
+
+Les mesures sont gardées dans un :py:class:`extra.tampon.TamponCirculaire`
+de capacité fixe: la mémoire utilisée et le coût de chaque bloc restent
+constants, peu importe la durée de l'acquisition. Les valeurs plus anciennes
+sont écrasées. Les canaux plus courts, comme ``F``, gardent autant de blocs,
+donc moins de valeurs. Voir :py:func:`mesures`.
+'''
+
+REQUIS: tuple[str, ...] = ('ts', 'A0')
+'''Canaux que la bannière doit annoncer
+
+:py:data:`res` a une colonne par canal annoncé (voir :py:func:`mesures`),
+mais l'acquisition, la transformée de Fourier et l'affichage ne peuvent pas
+se passer de ``ts`` et ``A0``:
+
+- ``ts``, ``A0`` et ``F`` sont envoyées par le micro-contrôleur. ``ts`` est
+  déroulée: elle continue d'augmenter quand ``micros()`` revient à zéro.
+  ``F``, le spectre calculé sur le micro-contrôleur, est optionnel.
+- ``th`` est ajoutée à :py:data:`res`: c'est l'heure de chaque mesure sur
+  l'horloge de l'ordinateur, en secondes, corrigée par une
+  :py:class:`extra.horloge.Horloge`.
+
+Le spectre calculé par :py:func:`fft` n'est pas gardé dans :py:data:`res`,
+mais dans les tableaux d'un :py:class:`extra.fft.STFT`.
+'''
+
+ENREGISTREMENT: str | None = None
+'''Dossier où enregistrer toutes les mesures reçues
+
+``None`` pour ne rien enregistrer. Sinon, chaque bloc est écrit sur disque
+par un :py:class:`extra.enregistreur.Enregistreur`, qui ne ralentit pas
+l'acquisition. L'enregistrement se relit avec
+:py:func:`extra.enregistreur.lire`.
+'''
+
+TYPES: dict[str, str] = {'ts': '<i8', 'th': '<f8'}
+'''Type des colonnes de :py:data:`res` qui ne gardent pas le type annoncé
+
+Les autres canaux sont gardés dans le type annoncé par la bannière (voir
+:py:attr:`extra.trames.Schéma.types`), qui contient déjà toutes leurs
+valeurs: les mesures du CAN de 10 bits, sur 16 bits, prennent quatre fois
+moins de place qu'un :py:data:`numpy.float64`. Seules exceptions:
+
+- ``ts`` est déroulée, donc dépasse les 32 bits de ``micros()``.
+- ``th`` est en secondes, avec la précision d'un :py:data:`numpy.float64`.
+
+Voir :py:func:`types`.
+'''
+
+TRAVAILLEURS: int = 0
+'''Nombre de processus pour :py:func:`analyse_bloc`
+
+``0`` pour ne pas faire cette analyse. Sinon, chaque bloc est envoyé, à
+travers la mémoire partagée, à un groupe de processus qui l'analysent sans
+ralentir l'acquisition, même si l'analyse est longue. Voir
+:py:class:`extra.analyse.AnalyseParallèle`.
+'''
+
+SAUT: int = N_max // 2
+'''Nombre de nouvelles mesures entre deux transformées de Fourier
+
+Avec :py:data:`N_max` mesures par transformée, ``N_max // 2`` donne un
+chevauchement de 50% entre deux spectres consécutifs. Voir
+:py:class:`extra.fft.STFT`.
 '''
 
 us = 1e-6 # Facteur de conversion de µs → s
 MHz = 1e6 # Facteur de conversion de MHz → Hz
 
-def prendre_mesure[R: pd.DataFrame](res: R, ser: serial.Serial) -> R:
+def types(schéma: Schéma) -> dict[str, np.dtype]:
+    '''Type de chaque colonne de :py:data:`res`, ``{nom: dtype}``
+    
+    Le type annoncé par la bannière pour chaque canal, sauf pour les
+    colonnes de :py:data:`TYPES`. ``th`` est ajoutée si ``ts`` est annoncée.
+    Chaque bloc est converti dans ces types dès son analyse, puis copié tel
+    quel dans :py:data:`res` et vers l'enregistreur.
+    '''
+    résultat = {nom: np.dtype(TYPES.get(nom, t)) for nom, t in schéma.types.items()}
+    if 'ts' in résultat:
+        résultat['th'] = np.dtype(TYPES['th'])
+    return résultat
+
+def mesures(schéma: Schéma, historique: int = N_historique) -> TamponCirculaire:
+    '''Tampon des mesures, réservé selon les canaux annoncés par la bannière
+    
+    Chaque canal annoncé par le ``schéma`` a sa colonne, du type donné par
+    :py:func:`types`, qui garde les valeurs des mêmes
+    ``historique // schéma.N`` derniers blocs: ``F``, avec moitié moins de
+    valeurs par bloc que ``A0``, a donc une capacité moitié moindre. ``th``
+    a la capacité de ``ts``.
+    
+    Parameters
+    ----------
+    schéma
+        Canaux annoncés, voir :py:func:`extra.trames.schéma`
+    historique
+        Nombre de mesures à conserver, voir :py:data:`N_historique`
+    
+    Returns
+    -------
+    res
+        Tampon vide, dont toute la mémoire est déjà réservée
+    '''
+    blocs: int = max(historique // schéma.N, 1)
+    capacités: dict[str, int] = {nom: blocs * max(n, 1) for nom, n in schéma.longueurs.items()}
+    if 'ts' in capacités:
+        capacités['th'] = capacités['ts']
+    return TamponCirculaire(capacités, types(schéma))
+
+@sondes.chronométrer()
+def prendre_mesure[R: TamponCirculaire](res: R, ser: serial.Serial, horloge: Horloge | None = None, enregistreur: Enregistreur | None = None, schéma: Schéma | None = None) -> R:
     '''Prise d'une mesure
     
-    prendre_mesure, pour chaque liste de mesures contenues dans ``res``,
-    envoie une requête à l'Arduino puis lit la valeur reçue.
+    prendre_mesure lit un bloc de données envoyé par l'Arduino, et ajoute
+    chaque ligne du bloc à la colonne correspondante de ``res``.
     
     Parameters
     ----------
     res
-        Liste des mesures prises. Structurée en ``[t, pd1, pd2, ...]``
+        Tampon des mesures prises, voir :py:func:`mesures`
     ser
         Objet de communication série avec lequel communiquer pour obtenir
         les données.
+    horloge
+        Modèle de l'horloge du micro-contrôleur, mis à jour avec l'heure
+        d'arrivée du bloc
+    enregistreur
+        Reçoit une copie de chaque bloc valide, pour l'écrire sur disque
+    schéma
+        Canaux annoncés par la bannière: les blocs binaires sont lus avec
+        leurs noms, et les blocs dont un canal n'a pas la longueur annoncée
+        sont rejetés
     
     Returns
     ----------
     res
         Avec les nouvelles valeurs.
 '''
-    mes: pd.DataFrame = pd.DataFrame(dtype=np.float64)
-    '''Cadre de données, :py:class:`pandas.DataFrame` pour les nouvelles mesures'''
-    
-    bloc_cru: bytes = ser.read_until(SEP_BLOC)
-    '''Bloc de données lues de la ligne série'''
+    bloc_cru: bytes | memoryview = ser.read_until(SEP_BLOC)
+    '''Bloc de données lues de la ligne série
+
+    Une :py:class:`memoryview` si ``ser`` est un
+    :py:class:`extra.lecteur.Découpeur`: elle est analysée avant la prochaine
+    lecture, qui la réutilise.'''
     
     # Si on n'a reçu aucune données, on ne pourra pas en faire l'analyse
     # ou les afficher. Donc on quitte la fonction sans modifier :py:var:`res`.
@@ -162,83 +303,102 @@ def prendre_mesure[R: pd.DataFrame](res: R, ser: serial.Serial) -> R:
     if len(bloc_cru) == 0:
         #logging.warning('Aucune donnée reçue.')
         #raise RuntimeWarning('Aucune donnée n\'a été reçue.')
+        sondes.compter('blocs vides')
         return res
-    
-    bloc_ecourte = bloc_cru.strip() # Enlever les caractères invisibles
-    lignes = bloc_ecourte.split(SEP_LIGNE) # Diviser par ligne
-    for l in lignes:
-        if SEP_NOM not in l: # Vérifier qu'on a bien une ligne de mesures
-            #logging.warning('Pas de \'=\' présent dans %r', l)
-            #raise RuntimeError('Pas de \'=\' présent')
-            return res
-
-        nom, valeurs = l.split(SEP_NOM, 1)
-        
-        # Retirer les caractères invisibles
-        nom = nom.strip()\
-                 .decode('utf-8') # Convertire de :py:type:`bytes` à :py:type:`str`
-        
-        # Retirer les caractères invisibles et :py:var:`DELIM_VAL`
-        valeurs_isolees = valeurs.strip(DELIM_VAL)
-        
-        # Séparer les valeurs par :py:var:`SEP_VAL`
-        valeurs_separees = valeurs_isolees.split(SEP_VAL)
-        
-        # Convertir de :py:type:`bytes` à :py:class:`numpy.float64`
-        valeurs_converties = [np.float64(v) for v in valeurs_separees]
-        
-        # La tranformée de Fourier contient moitié moins de valeurs que
-        # les données. Il faut donc les égaliser avant de les mettre
-        # dans le même ``pandas.DataFrame``. Une alternative serait 
-        # d'utiliser un ``pandas.DataFrame`` pour les données et un
-        # pour la transformée de Fourier.
-        diff = len(mes.index) - len(valeurs_converties) # Différence de longueur
-        diff = diff if diff > 0 else 0 # Validation
-        # Voir :py:func:`numpy.pad`.
-        # Les positions ajoutées en début de liste auront la valeur
-        # :py:`numpy.nan`, qui représente une valeur numérique non-définie.
-        valeurs_compensees = np.pad(valeurs_converties,
-                                    (diff, 0),
-                                    constant_values=np.nan)
-        
-        # Voir :py:meth:`pandas.DataFrame.insert`
-        # Ajouter la ligne lue comme une nouvelle colonne de 
-        # :py:var:`mes`.
-        mes.insert(0, nom, valeurs_compensees)
-    
-    # Voir :py:func:`pandas.concat`
-    # Ajouter les données rangées dans :py:var:`mes` à 
-    # :py:var:`res`.
-    res = pd.concat([res, mes], ignore_index=True)
+    sondes.compter('octets', len(bloc_cru))
+    
+    # Voir :py:func:`extra.trames.analyser`.
+    # En texte, chaque ligne ``nom=[v0, v1, ...]`` du bloc est convertie d'un
+    # coup en tableau :py:class:`numpy.ndarray`. En binaire, les valeurs sont
+    # lues directement avec :py:func:`numpy.frombuffer`, après vérification
+    # du CRC. Le bloc est vérifié en entier avant d'écrire quoi que ce soit
+    # dans :py:var:`res`, pour ne pas garder un bloc à moitié ajouté.
+    # Chaque colonne est convertie directement dans le type de sa colonne
+    # de :py:var:`res` (voir :py:func:`types`): les ajouts ne sont que des
+    # copies.
+    dtypes: dict[str, np.dtype] = {nom: res[nom].dtype for nom in res.colonnes}
+    try:
+        if schéma is None:
+            mes: dict[str, np.ndarray] = analyser(bloc_cru, dtypes)
+        else:
+            mes = analyser(bloc_cru, dtypes, schéma.noms)
+            schéma.valider(mes)
+    except BlocInvalide:
+        #logging.warning('Bloc invalide: %r', bloc_cru)
+        #raise
+        sondes.compter('blocs invalides')
+        return res
+    sondes.compter('blocs analysés')
+    
+    # L'heure d'arrivée est prise par le fil de lecture, dès la réception:
+    # elle ne dépend pas du retard du programme principal.
+    # :py:func:`time.monotonic_ns` ne recule jamais et continue d'avancer
+    # pendant que le programme attend, contrairement à
+    # :py:func:`time.process_time_ns`.
+    arrivée: int = ser.arrivée if isinstance(ser, LecteurSérie) else time.monotonic_ns()
+    if horloge is not None and 'ts' in mes and mes['ts'].size:
+        mes['ts'] = horloge.dérouler(mes['ts'])
+        horloge.ajouter(mes['ts'][-1], arrivée)
+        mes['th'] = horloge.convertir(mes['ts'])
+    
+    # L'écriture se fait dans un autre fil d'exécution: ajouter ne fait
+    # que mettre le bloc en file.
+    if enregistreur is not None:
+        enregistreur.ajouter(mes)
+    
+    # Chaque colonne de :py:var:`res` est indépendante, et réservée à la
+    # longueur de son canal, donc la transformée de Fourier, qui contient
+    # moitié moins de valeurs que les données, n'a pas besoin d'être
+    # complétée avec des :py:data:`numpy.nan`.
+    for nom, valeurs in mes.items():
+        if nom in res: # Les colonnes inconnues sont ignorées
+            res.ajouter(nom, valeurs)
 
     return res
 
-def plot(res: pd.DataFrame, fig: mpl.figure.Figure, N: int = N_max):
+@sondes.chronométrer()
+def plot(res: TamponCirculaire, rendu: RenduBlit, spectre: STFT, N: int | None = None):
     '''Mise à jour du graphique avec de nouvelles données
     
-    Met les graphiques contenus dans fig à jour avec les données de res.
+    Met les graphiques de la figure de ``rendu`` à jour avec les données de
+    res. Seules les courbes sont redessinées, à moins que les données ne
+    sortent des limites des axes. Voir :py:class:`extra.rendu.RenduBlit`.
     
     Parameters
     ----------
     res
-        Liste des mesures prises. Structurée en ``[t, pd1, pd2, ...]``
-    fig
-        Figure contenant les différents graphiques
+        Tampon des mesures prises, voir :py:func:`mesures`
+    rendu
+        Affichage de la figure contenant les différents graphiques
+    spectre
+        Transformée de Fourier calculée par :py:func:`fft`
     N
-        Nombre maximal de données.
+        Nombre maximal de données. Par défaut, le nombre de mesures de
+        chaque transformée, ``spectre.N``.
     '''
+    if N is None:
+        N = spectre.N
     
     # Si on n'a pas assez de données, on attend.
-    # En pratique, ça veut dire que le tableau de données
+    # En pratique, ça veut dire que le tampon de données
     # est vide.
-    if res.ts.size < N:
+    if len(res['ts']) < N or len(res['A0']) < N:
+        return
+    
+    # Si la dernière image est trop récente, on n'en prépare pas de nouvelle.
+    if not rendu.prêt():
         return
 
     # Axe du temps, converti de us à s.
-    ts = res.ts.to_numpy()[-N:] * us
+    # Le temps est compté à partir de la dernière mesure, pour que les
+    # limites de l'axe ne changent pas d'une image à l'autre.
+    ts = res.dernier('ts', N)
+    ts = (ts - ts[-1]) * us
     
     # Mesures à la broche A0 (ou autres broches programmées)
-    A0 = res.A0.to_numpy()[-N:]
+    # :py:meth:`extra.tampon.TamponCirculaire.dernier` retourne une vue,
+    # sans copie, des dernières valeurs.
+    A0 = res.dernier('A0', N)
     
     # En cas de valeurs problématiques dans la plage à afficher,
     # on passe à la prochaine.
@@ -246,41 +406,45 @@ def plot(res: pd.DataFrame, fig: mpl.figure.Figure, N: int = N_max):
         return
 
     # On change les valeurs des courbes de mesures
-    fig.axes[BRUT].lines[0].set_data(ts, A0)
-    fig.axes[BRUT].set_xlim(ts[0], ts[-1])
+    ax = rendu.axes[BRUT]
+    ax.lines[0].set_data(ts, A0)
+    rendu.ajuster(ax, x=ts)
     A0_max = 256 if A0.max() < 257 else 1024
-    fig.axes[BRUT].set_ylim(0, A0_max)
-    plt.pause(DELAI_PLT) # Petite pause pour permettre l'affichage correct
+    rendu.limites(ax, ylim=(0, A0_max))
     
     # Axe des fréquences, converti de MHz à Hz
-    fs = res.fs.to_numpy()[-N//2:] * MHz
-    fig.axes[FFT].set_xlim(fs[0], fs[-1])
-    if any(np.isnan(fs)):
-        return
-    
-    # Spectre calculé sur le Arduino
-    F = res.F.to_numpy()[-N//2:]
-    F /= F.max()
-    if not np.isnan(F).sum():
-        fig.axes[FFT].lines[0].set_data(fs, F)
-    else:
-        logging.warning('Pas de FFT Arduino.')
-    
-    # Spectre calculé avec Python
-    F2 = res.F2.to_numpy()[-N//2:]
-    F2 /= F2.max()
-    if not np.isnan(F2).sum():
-        fig.axes[FFT].lines[1].set_data(fs, F2)
-    else:
-        logging.warning('Pas de FFT Python.')
+    # Les N//2 premières fréquences de la transformée, qui correspondent aux
+    # N//2 valeurs envoyées par le micro-contrôleur.
+    fs = spectre.fs[:N//2] * MHz
+    if spectre.trames and not any(np.isnan(fs)):
+        ax2 = rendu.axes[FFT]
+        rendu.ajuster(ax2, x=fs)
+        
+        # Spectre calculé sur le Arduino
+        # Les vues de :py:var:`res` sont en lecture seule: ``F /= F.max()``
+        # modifierait les données gardées en mémoire. On crée donc un nouveau
+        # tableau.
+        # ``F`` n'est pas requis: seulement s'il est annoncé par la bannière.
+        F = res.dernier('F', N//2) if 'F' in res else np.empty(0)
+        if F.size == fs.size and not np.isnan(F).sum():
+            ax2.lines[0].set_data(fs, F / F.max())
+        else:
+            logging.warning('Pas de FFT Arduino.')
+        
+        # Spectre calculé avec Python
+        F2 = spectre.spectre[:N//2]
+        if not np.isnan(F2).sum():
+            ax2.lines[1].set_data(fs, F2 / F2.max())
+        else:
+            logging.warning('Pas de FFT Python.')
     
-    plt.pause(DELAI_PLT) # Petite pause pour permettre l'affichage correct
+    rendu.afficher()
 
 # ===========================
 # = Fonctions structurelles =
 # ===========================
 
-def setup(port: str = PORT, debit: int = DEBIT, delai: int = DELAI) -> tuple[pd.DataFrame, serial.Serial, mpl.figure.Figure, int]:
+def setup(port: str | Relecture = PORT, debit: int = DEBIT, delai: int = DELAI, protocole: str | None = PROTOCOLE, enregistrement: str | None = ENREGISTREMENT, affichage: bool = AFFICHAGE) -> tuple[TamponCirculaire, serial.Serial, RenduBlit | None, STFT, Horloge, Enregistreur | None, Schéma]:
     '''Initialisation du programme
     
     Initialise le programme avec les paramètres transmis, et retourne les
@@ -291,36 +455,125 @@ def setup(port: str = PORT, debit: int = DEBIT, delai: int = DELAI) -> tuple[pd.
     pds
         Le nombre de broches/photodiodes à mesurer
     port
-        Le port série à utiliser
+        Le port série à utiliser, ou une :py:class:`extra.relecture.Relecture`
+        déjà ouverte pour rejouer des données sans micro-contrôleur
     delai
         Le temps d'attente maximal pour une lecture de données
+    protocole
+        :py:data:`extra.trames.TEXTE`, :py:data:`extra.trames.BINAIRE`, ou
+        ``None`` pour suivre la bannière de l'annonceur
+    enregistrement
+        Dossier où enregistrer les mesures, ou ``None``
+    affichage
+        ``False`` pour ne pas créer de figure, voir :py:data:`AFFICHAGE`
     
     Returns
     --------------
     res
-        Liste des mesures, au format ``[t, pd1, pd2, ...]``
+        Tampon des mesures, une colonne par canal annoncé par
+        l'annonceur, voir :py:func:`mesures`
     ser
-        Objet de communication série
-    fig
-        Figure pour l'affichage des données
-    derniere_mesure
-        Valeur initiale de 0
+        Objet de communication série, lu en continu par un
+        :py:class:`extra.lecteur.LecteurSérie`
+    rendu
+        Affichage de la figure pour les données, ou ``None`` sans affichage
+    spectre
+        Transformée de Fourier à court terme, mise à jour par :py:func:`fft`
+    horloge
+        Modèle de l'horloge du micro-contrôleur
+    enregistreur
+        Enregistrement des mesures sur disque, déjà démarré, ou ``None``
+    schéma
+        Canaux annoncés par la bannière, voir :py:func:`extra.trames.schéma`
     '''
     # Initialisation des paramètres importants
     
-    #: On utilise une expression de liste plutôt que la multiplication pour
-    #: ne pas créer un unique object commun répété plusieurs fois dans la liste.
-    #: Voir https://stackoverflow.com/q/366422 pour ce genre de problèmes.
-    res: pd.DataFrame = pd.DataFrame(columns=['ts', 'A0', 'cadre', 'signal', 'F', 'fs', 'F2'], dtype=np.float64)
-    ser = serial.Serial(port, baudrate=debit, timeout=DELAI)
-    time.sleep(2) # On laisse le temps au Arduino de se réveiller
+    #: ``micros()`` compte en µs sur 32 bits.
+    #: Voir :py:class:`extra.horloge.Horloge`.
+    horloge = Horloge(unité=us)
+    
+    if isinstance(port, Relecture):
+        ser = port
+        ser.timeout = DELAI
+    else:
+        ser = serial.Serial(port, baudrate=debit, timeout=DELAI)
     
     # La première ligne envoyée par le programme Arduino affiche les paramètres
     # du micro-contrôleur.
-    l = ser.read_until(SEP_BLOC).strip()
+    #: La ligne série est lue par grands morceaux dans un tampon réutilisé,
+    #: plutôt qu'un octet à la fois. Voir :py:class:`extra.lecteur.Découpeur`.
+    ser = Découpeur(ser)
+    
+    # On laisse le temps au Arduino de se réveiller, mais pas plus: la
+    # bannière est lue dès qu'elle arrive. Elle est toujours en texte, et
+    # peut annoncer le protocole des blocs suivants.
+    début = time.monotonic()
+    l = bytes(ser.attendre(PRÊT)).strip()
+    if not l:
+        ser.close()
+        raise TimeoutError(f'Aucune bannière reçue de {ser.port} en {PRÊT} s.')
+    logging.info('Bannière reçue après %.3f s.', time.monotonic() - début)
     print(l.decode('utf-8'))
     
+    #: La bannière annonce le nombre de mesures, la période d'échantillonage,
+    #: le protocole et les canaux de chaque bloc: noms, types et longueurs.
+    #: Voir :py:func:`extra.trames.schéma`.
+    #: Une bannière invalide, ou à laquelle il manque un canal de
+    #: :py:data:`REQUIS`, arrête le programme tout de suite, plutôt qu'au
+    #: premier bloc ou au premier affichage. Le port est libéré d'abord.
+    try:
+        schéma = lire_schéma(l)
+        if protocole is not None:
+            if protocole not in PROTOCOLES:
+                raise ValueError(f'Protocole {protocole!r} inconnu, choisir parmi {list(PROTOCOLES)}.')
+            schéma.protocole = protocole
+        manquants = [nom for nom in REQUIS if nom not in schéma.canaux]
+        if manquants:
+            raise BlocInvalide(f'La bannière n\'annonce pas les canaux {manquants}, requis par l\'auditeur.')
+    except ValueError:
+        ser.close()
+        raise
+    logging.info('Protocole %s, %s mesures par bloc, canaux %s.',
+                 schéma.protocole, schéma.N, schéma.longueurs)
+    
+    # Les blocs binaires se terminent par :py:data:`extra.trames.FIN_BLOC`
+    # plutôt que par une ligne vide. Ce qui a déjà été lu après la bannière
+    # reste dans le tampon du découpeur.
+    ser.séparateur = séparateur(schéma.protocole)
+    
+    #: Toute la mémoire pour les mesures est réservée dès maintenant, avec
+    #: la longueur et le type de chaque canal. Voir :py:func:`mesures`.
+    res = mesures(schéma)
+    
+    #: De même pour la transformée de Fourier: la fenêtre et les fréquences
+    #: ne sont calculées qu'une fois. Voir :py:class:`extra.fft.STFT`.
+    spectre = STFT(schéma.N, 'hann', saut=min(SAUT, schéma.N))
+    
+    #: Voir :py:class:`extra.enregistreur.Enregistreur`.
+    enregistreur = None
+    if enregistrement is not None:
+        enregistreur = Enregistreur(enregistrement, {nom: res[nom].dtype for nom in res.colonnes})
+        enregistreur.start()
+    
+    #: À partir d'ici, la ligne série est lue sans arrêt dans un fil
+    #: d'exécution séparé, même pendant l'affichage ou l'analyse.
+    #: Voir :py:class:`extra.lecteur.LecteurSérie`.
+    ser = LecteurSérie(ser)
+    ser.start()
+    
+    # Les compteurs du lecteur ne sont lus qu'aux rapports des sondes.
+    sondes.jauge('blocs perdus', lambda: ser.perdus)
+    sondes.jauge('retard max (ms)', lambda: ser.retard_max * 1e-6)
+    if enregistreur is not None:
+        sondes.jauge('blocs non enregistrés', lambda: enregistreur.perdus)
+    
+    if not affichage:
+        return res, ser, None, spectre, horloge, enregistreur, schéma
+    
     #: Paramètres des graphiques
+    #: matplotlib n'est importé qu'ici: c'est le plus long à charger.
+    import matplotlib.pyplot as plt # <https://matplotlib.org/>
+    
     #: Affichage interactif, pour pouvoir suivre l'acquisition en direct
     plt.ion()
     
@@ -330,7 +583,7 @@ def setup(port: str = PORT, debit: int = DEBIT, delai: int = DELAI) -> tuple[pd.
     fig.suptitle('Démonstration de principe d\'un programme d\'analyse pour un oxymètre de pouls')
     
     ax.set_title('Mesures')
-    ax.set_xlabel('Temps (s)')
+    ax.set_xlabel('Temps avant la dernière mesure (s)')
     ax.set_ylabel('Unités CAN (5V / 1024 bits)')
     ax.plot([], color='black', label='A0', ls=':', marker='.')
     ax.legend()
@@ -348,81 +601,193 @@ def setup(port: str = PORT, debit: int = DEBIT, delai: int = DELAI) -> tuple[pd.
     fig.tight_layout()
     plt.pause(0.01)
     plt.show()
+    
+    #: Les mises à jour suivantes ne redessinent que les courbes.
+    #: Le rythme de l'affichage est déjà fixé par l'ordonnanceur du
+    #: programme principal: un second plafond au même rythme sauterait une
+    #: image sur deux, à cause de la gigue. Voir :py:class:`extra.loop.Ordonnanceur`.
+    rendu = RenduBlit(fig, None)
+    sondes.jauge('images sautées', lambda: rendu.sautées)
+    sondes.jauge('redessins', lambda: rendu.redessins)
 
-    return res, ser, fig
+    return res, ser, rendu, spectre, horloge, enregistreur, schéma
 
-def loop(res: pd.DataFrame, ser: serial.Serial, fig: mpl.figure.Figure):
-    '''Prend de nouvelles mesures et les affiche
+@sondes.chronométrer()
+def acquérir(res: TamponCirculaire, ser: serial.Serial, spectre: STFT, horloge: Horloge | None = None, enregistreur: Enregistreur | None = None, délai: float | None = None, analyse: AnalyseParallèle | None = None, schéma: Schéma | None = None) -> int:
+    '''Prend de nouvelles mesures et les analyse, sans les afficher
     
     Parameters
     -----------
     res
-        Liste des mesures prises. Structurée en ``[t, pd1, pd2, ...]``
+        Tampon des mesures prises, voir :py:func:`mesures`
     ser
         Objet de communication série avec lequel communiquer pour obtenir
         les données.
-    fig
-        Figure contenant les différents graphiques
+    spectre
+        Transformée de Fourier, mise à jour avec les nouvelles mesures
+    horloge
+        Modèle de l'horloge du micro-contrôleur
+    enregistreur
+        Enregistrement des mesures sur disque
+    délai
+        Attente maximale d'un bloc, en secondes. Seulement utilisé avec un
+        :py:class:`extra.lecteur.LecteurSérie`, pour ne pas retarder
+        l'affichage.
+    analyse
+        Analyse de chaque nouveau bloc dans d'autres processus, voir
+        :py:func:`analyse_bloc`
+    schéma
+        Canaux annoncés par la bannière, voir :py:func:`prendre_mesure`
     
     Returns
     ---------------
-    res: list[list[int]]
-    ser: serial.Serial
-    fig: matplotlib.figure.Figure
-    derniere_mesure: int
+    n
+        Nombre de mesures reçues
     '''
+    if délai is not None and isinstance(ser, LecteurSérie):
+        ser.timeout = délai
+    
+    avant: int = res['ts'].total
+    
     # Lecture des valeurs de chaque photodiode
-    res = prendre_mesure(res, ser)
+    res = prendre_mesure(res, ser, horloge, enregistreur, schéma)
     
     # Calculs et analyse
     # Dans cet exemple il n'y a que la transformée de Fourier,
     # mais vous allez devoir y ajouter d'autres fonctions.
-    if res.ts.size >= N_max:
-        res = fft(res)
+    N: int = spectre.N
+    if len(res['ts']) >= N and len(res['A0']) >= N:
+        spectre = fft(res, spectre, horloge, None if schéma is None else schéma.d)
     else:
         logging.warning('Pas de calcul de FFT.')
     #res = SpO_2(res)
     #res = un_train_arrive(res)
     
+    # Les analyses longues sont plutôt faites dans d'autres processus, bloc
+    # par bloc. Les résultats reviennent dans l'ordre, quelques blocs plus
+    # tard. Voir :py:func:`analyse_bloc`.
+    n: int = min(res['ts'].total - avant, N)
+    if analyse is not None and n:
+        analyse.soumettre(ts=res.dernier('ts', n), A0=res.dernier('A0', n))
+    if analyse is not None:
+        for résultat in analyse.prêts():
+            # Une analyse qui a échoué rend son exception, déjà journalisée.
+            if not isinstance(résultat, Exception):
+                logging.debug('Analyse: %s', résultat)
+    
     # C'est ici que des fonctions pour réagir aux mesures devraient aller
     #signaler_absence_pouls(res)
     #bouger_barrière(res)
     
+    return res['ts'].total - avant
+
+@sondes.chronométrer()
+def loop(res: TamponCirculaire, ser: serial.Serial, rendu: RenduBlit | None, spectre: STFT, horloge: Horloge | None = None, enregistreur: Enregistreur | None = None, schéma: Schéma | None = None):
+    '''Prend de nouvelles mesures et les affiche
+    
+    Chaque bloc reçu est affiché. Le programme principal utilise plutôt un
+    :py:class:`extra.loop.Ordonnanceur`, qui affiche à un nombre fixe
+    d'images par seconde peu importe la vitesse d'acquisition.
+    
+    Parameters
+    -----------
+    res
+        Tampon des mesures prises, voir :py:func:`mesures`
+    ser
+        Objet de communication série avec lequel communiquer pour obtenir
+        les données.
+    rendu
+        Affichage de la figure contenant les différents graphiques, ou
+        ``None`` pour ne rien afficher
+    spectre
+        Transformée de Fourier des mesures
+    horloge
+        Modèle de l'horloge du micro-contrôleur
+    enregistreur
+        Enregistrement des mesures sur disque
+    schéma
+        Canaux annoncés par la bannière
+    
+    Returns
+    ---------------
+    res: extra.tampon.TamponCirculaire
+    ser: serial.Serial
+    rendu: extra.rendu.RenduBlit | None
+    spectre: extra.fft.STFT
+    horloge: extra.horloge.Horloge
+    enregistreur: extra.enregistreur.Enregistreur | None
+    schéma: extra.trames.Schéma | None
+    '''
+    acquérir(res, ser, spectre, horloge, enregistreur, schéma=schéma)
+    
     # Mise à jour du graphique
-    plot(res, fig)
+    if rendu is not None:
+        plot(res, rendu, spectre)
     
-    return res, ser, fig
+    return res, ser, rendu, spectre, horloge, enregistreur, schéma
 
-def setdown(res: pd.DataFrame, ser: serial.Serial, fig: mpl.figure.Figure):
+def setdown(res: TamponCirculaire, ser: serial.Serial, rendu: RenduBlit | None, spectre: STFT | None = None, horloge: Horloge | None = None, enregistreur: Enregistreur | None = None, schéma: Schéma | None = None):
     '''Ferme tous les objets en ayant besoin
     
     Parameters
     ------------
     res
-        Liste des mesures prises, à effacer
+        Tampon des mesures prises, à effacer
     ser
         Objet de communication série, à fermer
-    fig
-        Figure, à fermer via pyplot
+    rendu
+        Affichage dont la figure est à fermer via pyplot, ou ``None``
+    spectre
+        Transformée de Fourier, pour rapporter le nombre de spectres calculés
+    horloge
+        Modèle de l'horloge, pour rapporter la dérive et la gigue
+    enregistreur
+        Enregistrement à terminer: les blocs en attente sont écrits avant
+        de fermer les fichiers
+    schéma
+        Canaux annoncés par la bannière, pour comparer la période annoncée
+        à celle mesurée
     '''
+    res.vider()
+    
+    if spectre is not None:
+        logging.info('%s spectres calculés.', spectre.trames)
+    if horloge is not None:
+        logging.info('Dérive de l\'horloge: %.1fppm, gigue: %.3fms.',
+                     horloge.dérive, horloge.gigue * 1e3)
+    if schéma is not None and schéma.fréquence is not None:
+        logging.info('Fréquence d\'échantillonage annoncée: %.1fHz.', schéma.fréquence)
+    
+    if isinstance(ser, LecteurSérie):
+        logging.info('%s blocs reçus, %s perdus, retard maximal de %sms.',
+                     ser.reçus, ser.perdus, ser.retard_max / 1e6)
     
     # Si la communication série n'est pas fermée correctement, elle restera
     # ouverte et bloquera tout autre programme qui essaiera d'y accéder,
     # comme par exemple votre programme dans 5s, ou l'IDE Arduino.
     ser.close()
-    plt.close(fig)
+    
+    if enregistreur is not None:
+        enregistreur.close()
+        logging.info('%s blocs enregistrés dans %s, %s perdus.',
+                     enregistreur.écrits, enregistreur.chemin, enregistreur.perdus)
+    
+    if rendu is not None:
+        import matplotlib.pyplot as plt # <https://matplotlib.org/>
+        rendu.close()
+        plt.close(rendu.fig)
 
 # ==================================
 # = Fonctions d'analyse de données =
 # ==================================
 
-def estime_d(res: pd.DataFrame, N: int = N_max) -> float:
+def estime_d(res: TamponCirculaire, N: int = N_max) -> float:
     '''Estimé de la période d'échantillonage
     
     Parameters
     ===============
     res
-        Les mesures prises, incluant la liste des mesures de temps
+        Les mesures prises, incluant la colonne des mesures de temps
     N
         Le nombre de mesures depuis la dernière à considérer
     
@@ -431,80 +796,150 @@ def estime_d(res: pd.DataFrame, N: int = N_max) -> float:
     d
         L'espacement moyen entre chaque mesure
     '''
-    tôt: np.ndarray[int] = res.ts.to_numpy()[-N:-1]
-    tard: np.ndarray[int] = res.ts.to_numpy()[-N+1:]
-    diff: np.ndarray[int] = tard - tôt
-    d: float = diff.mean()
+    ts: np.ndarray[float] = res.dernier('ts', N)
+    # La moyenne des différences ts[i+1] - ts[i] ne dépend que des deux
+    # bouts: (ts[-1] - ts[0]) / (N - 1). Pas besoin de calculer np.diff.
+    # ``ts`` est déroulée, donc un retour à zéro de ``micros()`` ne fausse
+    # pas le résultat.
+    d: float = (ts[-1] - ts[0]) / (ts.size - 1)
     
     return d
 
-def fft(
-    res: pd.DataFrame,
-    N: int = N_max,
-    cadre: str = 'hann'
-) -> pd.DataFrame:
-    '''Retourne la transformée de Fourier des données contenues dans :py:data:`res`. C'est une bonne idée de personnaliser cette fonction selon
+@sondes.chronométrer()
+def fft(res: TamponCirculaire, spectre: STFT, horloge: Horloge | None = None, période: float | None = None) -> STFT:
+    '''Met à jour la transformée de Fourier des données contenues dans :py:data:`res`. C'est une bonne idée de personnaliser cette fonction selon
     vos besoins. Pour bien comprendre ce que fait la fonction, vous devriez
-    consulter :py:func:`scipy.signal.get_window`, :py:func:`numpy.fft.rfft` et
-    :py:func:`numpy.fft.rfftfreq`. Pour les mathématiques derrière, consultez
-    dans un premier lieu votre chargé de groupe.
+    consulter :py:class:`extra.fft.STFT`, :py:func:`scipy.signal.get_window`,
+    :py:func:`numpy.fft.rfft` et :py:func:`numpy.fft.rfftfreq`. Pour les
+    mathématiques derrière, consultez dans un premier lieu votre chargé de
+    groupe.
+    
+    Une transformée de ``spectre.N`` mesures est calculée toutes les
+    ``spectre.saut`` nouvelles mesures de la colonne ``A0``. La fenêtre
+    (``spectre.cadre``) et les fréquences ne sont calculées qu'une fois, et
+    les résultats sont écrits dans ``spectre.fs`` et ``spectre.spectre``.
+    Pour une mise à jour à chaque mesure plutôt qu'à chaque ``saut``, voir
+    :py:class:`extra.fft.DFTGlissante`, qui a la même interface.
     
     Parameters
     ------------
     res
-        Liste des mesures, au format ``[t, pd1, pd2, ...]``
-    N_max
-        Nombre de mesures à utiliser
+        Tampon des mesures, voir :py:func:`mesures`
+    spectre
+        Transformée à mettre à jour
+    horloge
+        Modèle de l'horloge du micro-contrôleur. La période est corrigée
+        par :py:attr:`extra.horloge.Horloge.échelle`, pour que l'axe des
+        fréquences soit en Hz de l'ordinateur.
+    période
+        Période d'échantillonage annoncée par la bannière, en µs (voir
+        :py:attr:`extra.trames.Schéma.d`). Utilisée quand elle ne peut pas
+        être estimée à partir des mesures, par exemple avec moins de deux
+        mesures ou des temps qui n'avancent pas.
     
     Returns
     -------------
-    fs
-        Fréquences associées à la transformée
-    ys
-        Transformées.
+    spectre
+        Avec les nouvelles valeurs dans ``spectre.fs`` et ``spectre.spectre``.
     '''
     # Estimation de l'espacement, basé sur les mesures
-    d: float = estime_d(res, N)
-    d_t: float = estime_d(res, res.index.size)
-    logging.info('d ≅ %sµs = %ss, d_t=%sµs', d, d*us, d_t)
-    logging.info('f = %sMHz = %skHz = %sHz', 1/d, 1000/d, MHz/d)
-    
-    idx = res.index.size - N
-    
-    # Mesure de l'intervalle couvert par la série de mesure
-    # Utile pour vérifier les calculs liés à n, f_{acq}, d, etc.
-    intervalle: int = res.ts.to_numpy()[-1] - res.ts.to_numpy()[-N]
-    logging.info('\\Delta t = %sµs', intervalle)
-    
-    cadre: np.ndarray[float] =  scipy.signal.get_window(cadre, N)
-    res.loc[idx:,'cadre'] = cadre
+    N: int = spectre.N
+    d: float = estime_d(res, N) if len(res['ts']) >= 2 else np.nan
+    if not d > 0 or not np.isfinite(d):
+        if période is None:
+            logging.warning('Période d\'échantillonage inconnue, pas de calcul de FFT.')
+            return spectre
+        d = période
+    if horloge is not None:
+        d *= horloge.échelle
+    logging.debug('d ≅ %sµs = %ss, f = %sHz', d, d*us, MHz/d)
+    
+    # Les fréquences ne sont recalculées que si d change.
+    n: int = spectre.mettre_à_jour(res['A0'], d)
+    logging.debug('%s nouveaux spectres', n)
+
+    return spectre
+
+def analyse_bloc(ts: np.ndarray, A0: np.ndarray) -> dict[str, float]:
+    '''Analyse d'un seul bloc, dans un processus séparé
+    
+    Appelée par :py:class:`extra.analyse.AnalyseParallèle` quand
+    :py:data:`TRAVAILLEURS` n'est pas nul. C'est ici que les analyses longues
+    (saturation en oxygène, détection du pouls, ...) devraient aller: elles
+    ne ralentissent ni l'acquisition ni l'affichage. Les tableaux sont dans
+    la mémoire partagée, et ne doivent pas être gardés après le retour.
     
-    A0 = res.A0.to_numpy()[idx:]
-    A0 = A0 - A0.mean()
-    signal = A0 * cadre
-    res.loc[idx:, 'signal'] = signal
+    Parameters
+    ------------
+    ts
+        Temps de chaque mesure du bloc, en µs
+    A0
+        Mesures du bloc
     
-    fft = np.abs(np.fft.rfft(signal))
-    idx2 = res.index.size - fft.size
-    res.loc[idx2:, 'F2'] = fft
-
-    fs = np.fft.rfftfreq(N, d)
-    res.loc[idx2:, 'fs'] = fs
-
-    return res
+    Returns
+    -------------
+    résultat
+        Temps de la première mesure, moyenne et amplitude du signal. Ce
+        qui est retourné est copié vers le programme principal.
+    '''
+    return {'ts': int(ts[0]), 'moyenne': float(A0.mean()), 'amplitude': float(np.ptp(A0))}
 
 if __name__ == '__main__':
+    import argparse
+    
+    # Les constantes du début du fichier restent les valeurs par défaut: la
+    # ligne de commande permet de lancer plusieurs auditeurs sur une même
+    # machine, un par port.
+    arguments = argparse.ArgumentParser(description=__doc__.partition('\n')[0])
+    arguments.add_argument('--port', default=PORT, help='port série de l\'annonceur')
+    arguments.add_argument('--enregistrement', default=ENREGISTREMENT,
+                           help='dossier où enregistrer les mesures')
+    arguments.add_argument('--sans-affichage', dest='affichage', action='store_false',
+                           default=AFFICHAGE, help='acquisition seulement, sans figure')
+    arguments = arguments.parse_args()
+    
     logging.basicConfig(level=logging.INFO)
-    params = setup()
+    if SONDES:
+        sondes.activer(None if SONDES is True else SONDES)
+    params = setup(arguments.port, enregistrement=arguments.enregistrement,
+                   affichage=arguments.affichage)
+    res, ser, rendu, spectre, horloge, enregistreur, schéma = params
+    
+    #: Voir :py:func:`analyse_bloc`.
+    analyse = None
+    if TRAVAILLEURS:
+        analyse = AnalyseParallèle(analyse_bloc, {'ts': res['ts'].dtype, 'A0': res['A0'].dtype}, schéma.N, TRAVAILLEURS)
+        sondes.jauge('analyses en retard', lambda: analyse.attentes)
+    
+    if rendu is not None:
+        import matplotlib.pyplot as plt # <https://matplotlib.org/>
+        
+        # L'acquisition est appelée dès que des données arrivent, et
+        # l'affichage à :py:data:`FPS` images par seconde.
+        # Voir :py:class:`extra.loop.Ordonnanceur`.
+        ordonnanceur = Ordonnanceur(FPS)
+        afficher = lambda: plot(res, rendu, spectre)
+        fenêtre_ouverte = lambda: len(plt.get_fignums()) > 0
+    else:
+        # Sans affichage, la boucle ne fait que l'acquisition.
+        ordonnanceur = Ordonnanceur(None)
+        afficher = None
+        fenêtre_ouverte = lambda: True
     
+    # ^C ou ``kill`` ne font que demander l'arrêt: la boucle termine son tour,
+    # puis on passe par :py:func:`setdown`. Voir :py:class:`extra.loop.Arrêt`.
     try:
-        # Cette boucle est infinie à toutes fins pratiques, càd équivalente à
-        # while True:
-        #   ...
-        # Techniquement, elle s'arrête quand la fenêtre du graphique est fermée,
-        # ou que l'utilisateur entre ^C sur la ligne de commande.
-        while len(plt.get_fignums()) > 0:
-            params = loop(*params)
+        with Arrêt() as arrêt:
+            # Cette boucle est infinie à toutes fins pratiques, càd équivalente à
+            # while True:
+            #   ...
+            # Techniquement, elle s'arrête quand la fenêtre du graphique est
+            # fermée, ou que le programme reçoit ^C ou ``SIGTERM``.
+            ordonnanceur.exécuter(
+                acquérir=lambda délai: acquérir(res, ser, spectre, horloge, enregistreur, délai, analyse, schéma),
+                afficher=afficher,
+                continuer=lambda: not arrêt.demandé and fenêtre_ouverte()
+            )
     except KeyboardInterrupt:
         # Détection de la combinaison ^C pour arrêter le programme
         logging.critical('Sortie forcée par l\'utilisateur.')
@@ -517,4 +952,6 @@ if __name__ == '__main__':
         # eg: libérer le port série pour qu'il puisse être utilisé par d'autres
         # programmes.
         setdown(*params)
-
+        if analyse is not None:
+            analyse.close()
+            logging.info('%s blocs analysés, %s erreurs.', analyse.rendus, analyse.erreurs)
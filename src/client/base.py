@@ -24,13 +24,18 @@ ressources avant de venir poser vos questions à un technicien.
 # Voir :doc:`deps` pour les détails
 import serial # <https://pyserial.readthedocs.io/en/latest/>
 import numpy as np # <https://numpy.org/>
-import scipy as sp # <https://scipy.org/>
-import scipy.signal.windows
-import matplotlib as mpl # <https://matplotlib.org/>
-import matplotlib.pyplot as plt
+import numpy.typing as npt
 import logging
 import time
 
+from extra.rendu import RenduBlit
+from extra.tampon import TamponCirculaire
+from extra.pyramide import Pyramide
+from extra.loop import Ordonnanceur
+from extra.fft import spectres, fréquences
+from extra.enregistreur import Enregistreur
+from extra.sondes import sondes
+
 # Définitions
 # Voir :doc:`defs`
 
@@ -85,66 +90,246 @@ transformée de Fourier. Voir :py:func:`numpy.fft.rfft`.
 ns2s: float = 1e-9 #: Conversion de ns à secondes pour les axes des graphiques
 GHz2Hz: float = 1e9 #: Conversion de GHz à Hz pour les graphiques
 
+LOT: int = 1
+'''Nombre de mesures demandées d'un coup à chaque appel de :py:func:`prendre_mesure`
+
+Les requêtes pour toutes les photodiodes, et pour :py:data:`LOT` mesures de
+suite, sont envoyées en une seule écriture, puis toutes les réponses sont
+lues ensemble. Plus :py:data:`LOT` est grand, moins on attend d'allers-retours
+sur la ligne série par mesure, mais plus les mesures arrivent par paquets.
+'''
+
+TAMPON_RX: int = 64
+'''Taille du tampon de réception du micro-contrôleur, en octets
+
+Le programme ``serveur/base`` ne lit qu'une requête par tour de boucle. Les
+requêtes en attente s'accumulent dans ce tampon, et celles qui n'y
+entrent pas sont perdues: on n'en envoie jamais plus d'un coup.
+'''
+
+HISTORIQUE: int | None = None
+'''Nombre maximal de mesures gardées en mémoire, ou ``None`` pour tout garder
+
+Les mesures sont gardées en colonnes :py:mod:`numpy` (temps sur 64 bits,
+photodiodes sur 16 bits) plutôt qu'en listes Python, environ 5 fois moins
+de mémoire par valeur. Avec une limite, seules les dernières mesures sont
+gardées, dans une mémoire réservée au démarrage. Voir
+:py:class:`extra.tampon.TamponCirculaire` et :py:func:`mesures`.
+'''
+
+FENÊTRE: float = 2.
+'''Durée affichée, en secondes avant la dernière mesure
+
+Seules les mesures de cette fenêtre sont converties pour l'affichage: le
+coût d'une image ne dépend pas de la durée de l'acquisition. Si la fenêtre
+a plus de mesures que l'axe n'a de pixels, elles sont réduites par une
+:py:class:`extra.pyramide.Pyramide`: le coût d'une image ne dépend pas non
+plus de la fréquence d'échantillonage.
+'''
+
+ENREGISTREMENT: str | None = None
+'''Dossier où enregistrer toutes les mesures, ou ``None``
+
+Les colonnes ``t``, ``pd1``, ``pd2``, ... sont écrites sur disque par un
+:py:class:`extra.enregistreur.Enregistreur`, et se relisent avec
+:py:func:`extra.enregistreur.lire`.
+'''
+
+SONDES: bool | str = False
+'''Chronométrage des étapes de la boucle
+
+``False`` pour ne rien mesurer, ``True`` pour rapporter la durée de
+:py:func:`prendre_mesure`, :py:func:`fft` et :py:func:`plot` avec
+:py:mod:`logging`, ou le nom d'un fichier où ajouter aussi chaque rapport
+en JSON. Voir :py:mod:`extra.sondes`.
+'''
+
+FPS: float = 30
+'''Nombre maximal d'images par seconde de l'affichage
+
+Voir :py:class:`extra.loop.Ordonnanceur`.
+'''
+
 # Définition des indices pour les deux types de graphiques
 BRUT: int = 0 #: Index des graphiques de données dans fig.axes
 FFT: int = 1 #: Index des graphiques de transformée de Fourier dans fig.axes
 
-def prendre_mesure[R: list[list[int]]](res: R, ser: serial.Serial) -> R:
+def mesures(pds: int, historique: int | None = HISTORIQUE) -> TamponCirculaire:
+    '''Tampon vide pour les mesures de ``pds`` photodiodes
+    
+    Les colonnes sont ``t`` (temps en ns, sur 64 bits) et ``pd1``, ``pd2``,
+    ... (valeurs du CAN de 10 bits, sur 16 bits).
+    
+    Parameters
+    ----------
+    pds
+        Le nombre de broches/photodiodes à mesurer
+    historique
+        Voir :py:data:`HISTORIQUE`
+    '''
+    return TamponCirculaire(historique, {'t': np.int64} | {f'pd{i}': np.int16 for i in range(1, pds+1)})
+
+
+@sondes.chronométrer()
+def lire_réponses(ser: serial.Serial, n: int) -> bytes:
+    '''Lit ``n`` lignes de réponse, en aussi peu de lectures que possible
+    
+    Chaque lecture prend tout ce qui est déjà arrivé, ou attend au moins un
+    octet jusqu'au délai de lecture de ``ser``. Il n'y a donc pas de boucle
+    d'attente active: le programme dort tant que la réponse n'est pas
+    arrivée.
+    
+    Parameters
+    ----------
+    ser
+        Objet de communication série, avec un délai de lecture
+    n
+        Nombre de lignes attendues
+    
+    Returns
+    -------
+    réponses
+        Les lignes complètes reçues, possiblement moins que ``n`` si le
+        délai est écoulé. Une dernière ligne tronquée est ignorée: elle
+        serait sinon lue comme une valeur complète.
+    '''
+    réponses = bytearray()
+    while réponses.count(b'\n') < n:
+        morceau: bytes = ser.read(max(1, ser.in_waiting))
+        if not morceau:
+            logging.warning('%s réponses reçues sur %s.', réponses.count(b'\n'), n)
+            break
+        réponses += morceau
+    
+    sondes.compter('octets', len(réponses))
+    # Tout ce qui suit le dernier \n est une ligne incomplète.
+    return bytes(réponses[:réponses.rfind(b'\n') + 1])
+
+@sondes.chronométrer()
+def prendre_mesure(res: TamponCirculaire, ser: serial.Serial, lot: int = LOT, enregistreur: Enregistreur | None = None) -> TamponCirculaire:
     '''Prise d'une mesure
     
-    prendre_mesure, pour chaque liste de mesures contenues dans ``res``,
-    envoie une requête à l'Arduino puis lit la valeur reçue.
+    prendre_mesure envoie d'un coup une requête pour chaque photodiode de
+    ``res``, répétées ``lot`` fois, puis lit toutes les valeurs reçues. Les
+    réponses arrivent dans l'ordre des requêtes.
     
     Parameters
     ----------
     res
-        Liste des mesures prises. Structurée en ``[t, pd1, pd2, ...]``
+        Mesures prises, avec les colonnes ``t``, ``pd1``, ``pd2``, ...
+        Voir :py:func:`mesures`.
     ser
         Objet de communication série avec lequel communiquer pour obtenir
         les données.
+    lot
+        Nombre de mesures de chaque photodiode à demander. Limité par
+        :py:data:`TAMPON_RX`.
+    enregistreur
+        Reçoit les nouvelles mesures, pour les écrire sur disque
     
     Returns
     ----------
     res
         Avec les nouvelles valeurs.
 '''
+    canaux: int = len(res.colonnes) - 1
+    lot = max(1, min(lot, TAMPON_RX // canaux))
+    
+    # Pour demander la photodiode A0, envoyer l'octet \x00, ou
+    # de façon équivalente bytes([0]).
+    # En général, si on veut de A0 à A1, on envoie
+    #
+    # A0    \x00    bytes([0])
+    # A1    \x01    bytes([1])
+    #
+    # Pour 2 photodiodes et un lot de 3 mesures, la requête est donc
+    # b'\x00\x01\x00\x01\x00\x01', envoyée en une seule écriture.
+    requêtes: bytes = bytes(range(canaux)) * lot
+    
     # Mesure du temps auquel la mesure est prise
-    temps: int = time.process_time_ns()
-    
-    mes: list[float] = [temps]
-    for i in bytes(range(1, len(res))):
-        # Pour demander la photodiode A0, envoyer l'octet \x00, ou
-        # de façon équivalente bytes([0]).
-        # En général, si on veut de A0 à A1, et qu'on itère de 1 à 2, on a
-        #
-        # A0    \x00    bytes([0])  bytes([1-1])
-        # A1    \x01    bytes([1])  bytes([2-1])
-        ser.write(bytes([i-1]))
-        ser.flush() # S'assurer que la commande est envoyée immédiatement.
-        while not ser.in_waiting: time.sleep(0.000000001)
-        mes.append(int(ser.readline()))
-        
-    logging.debug('mes = %s', mes)
-    #mes[1:] = map(int, mes[1:])
-    for r, m in zip(res, mes):
-        r.append(m)
+    # :py:func:`time.monotonic_ns` est l'heure de l'ordinateur, qui avance
+    # aussi pendant qu'on attend les réponses, et ne recule jamais.
+    # :py:func:`time.process_time_ns` compte plutôt le temps de calcul du
+    # programme, qui s'arrête pendant les lectures.
+    # Les réponses en retard d'un lot précédent, incomplet ou abandonné
+    # après le délai de lecture, sont associées par position aux requêtes:
+    # elles décaleraient les photodiodes de tout le lot. On les jette.
+    ser.reset_input_buffer()
+    
+    avant: int = time.monotonic_ns()
+    ser.write(requêtes)
+    réponses: bytes = lire_réponses(ser, len(requêtes))
+    après: int = time.monotonic_ns()
+    
+    # Une valeur par ligne, convertie d'un coup. Les espaces de sep
+    # correspondent aussi aux \r\n.
+    valeurs = np.fromstring(réponses, dtype=np.int64, sep=' ')
+    
+    # Seules les mesures complètes, avec une valeur par photodiode, sont
+    # gardées.
+    reçus: int = valeurs.size // canaux
+    if reçus < lot:
+        logging.warning('%s mesures complètes sur %s.', reçus, lot)
+        sondes.compter('mesures incomplètes', lot - reçus)
+    sondes.compter('mesures', reçus)
+    valeurs = valeurs[:reçus * canaux].reshape(reçus, canaux)
+    
+    # Le micro-contrôleur répond à une requête par tour de boucle: les
+    # mesures sont réparties uniformément entre l'envoi et la dernière
+    # réponse.
+    temps = avant + (après - avant) * np.arange(1, reçus + 1) // max(reçus, 1)
+    
+    logging.debug('mes = %s', valeurs.tolist())
+    if enregistreur is not None:
+        mes = {f'pd{i}': v for i, v in enumerate(valeurs.T, start=1)}
+        enregistreur.ajouter({'t': temps, **mes})
+    # Une copie par colonne, sans passer par des listes Python
+    res.ajouter('t', temps)
+    for nom, v in zip(res.colonnes[1:], valeurs.T):
+        res.ajouter(nom, v)
 
     return res
 
-def plot(res: list[list[int]], fig: mpl.figure.Figure):
+@sondes.chronométrer()
+def plot(res: TamponCirculaire, rendu: RenduBlit, pyramide: Pyramide | None = None):
     '''Mise à jour du graphique avec de nouvelles données
     
-    Met les graphiques contenus dans fig à jour avec les données de res.
+    Met les graphiques de la figure de ``rendu`` à jour avec les données de
+    res. Seules les courbes sont redessinées, à moins que les données ne
+    sortent des limites des axes. Voir :py:class:`extra.rendu.RenduBlit`.
     
     Parameters
     ----------
     res
-        Liste des mesures prises. Structurée en ``[t, pd1, pd2, ...]``
-    fig
-        Figure contenant les différents graphiques
+        Mesures prises, avec les colonnes ``t``, ``pd1``, ``pd2``, ...
+    rendu
+        Affichage de la figure contenant les différents graphiques
+    pyramide
+        Versions réduites des mesures, pour ne pas dessiner plus de deux
+        points par pixel. ``None`` pour dessiner toutes les mesures de la
+        fenêtre.
     '''
+    # Si on n'a pas encore de mesures, ou que la dernière image est trop
+    # récente, on n'en prépare pas de nouvelle.
+    if not len(res) or not rendu.prêt():
+        return
+    
     fs, *fft_pd = fft(res) # Calculer la FFT
-    ts = res[0]
+    
+    # Seules les mesures des :py:data:`FENÊTRE` dernières secondes sont
+    # affichées. Les temps sont croissants: une recherche binaire trouve la
+    # première, sans parcourir tout l'historique.
+    t = res.dernier('t')
+    fin = t[-1]
+    n: int = t.size - np.searchsorted(t, fin - FENÊTRE / ns2s)
+    
+    # La pyramide choisit, pour chaque photodiode, le niveau de détail qui
+    # donne au plus deux points par pixel de l'axe.
+    largeur: int = rendu.largeur(rendu.axes[BRUT])
+    
+    # Le temps est compté à partir de la dernière mesure, pour que les
+    # limites de l'axe ne changent pas d'une image à l'autre.
+    ts = (t[-n:] - fin) * ns2s
     # Python permet le paquetage/dépaquetage dans les définitions de variables
     # On peut par exemple définir les mêmes variables avec les mêmes valeurs
     # de plusieurs manières différentes:
@@ -158,35 +343,44 @@ def plot(res: list[list[int]], fig: mpl.figure.Figure):
     # et l'index d'une liste. Dans la boucle, on a donc:
     #
     # i: int = <index des éléments>
-    # pd: list[float] = <données de la broche/photodiode i>
-    # fpd: list[float] = <transformée de pd>
-    for i, (pd, fpd) in enumerate(zip(res[1:], fft_pd)):
-        # fig est la figure passée en argument
-        # fig.axes est la liste des axes contenus dans la figure
-        # fig.axes[0] est l'axe qu'on utilise pour les données brutes
-        # fig.axes[1] est l'axe qu'on utilise pour la FFT
-        # fig.axes[i].lines est la liste des courbes dessinées sur fig.axes[i]
-        # fig.axes[i].lines[pd] est la courbe associée à la photodiode pd
-        # fig.axes[i].lines[pd].set_ydata permet de modifier les valeurs en y
+    # pd: str = <nom de la colonne de la broche/photodiode i>
+    # fpd: np.ndarray = <transformée de pd>
+    for i, (pd, fpd) in enumerate(zip(res.colonnes[1:], fft_pd)):
+        # rendu.fig est la figure passée en argument
+        # rendu.axes est la liste des axes contenus dans la figure
+        # rendu.axes[0] est l'axe qu'on utilise pour les données brutes
+        # rendu.axes[1] est l'axe qu'on utilise pour la FFT
+        # rendu.axes[i].lines est la liste des courbes dessinées sur rendu.axes[i]
+        # rendu.axes[i].lines[pd] est la courbe associée à la photodiode pd
+        # rendu.axes[i].lines[pd].set_ydata permet de modifier les valeurs en y
         #   d'une courbe existante
-        # fig.axes[i].lines[pd].get_ydata permet d'obtenir les valeurs en y
+        # rendu.axes[i].lines[pd].get_ydata permet d'obtenir les valeurs en y
         #   d'une courbe existante.
         
-        # Afficher jusqu'aux 200 derniers points
-        fig.axes[BRUT].lines[i].set_data(np.array(ts)*ns2s, pd)
-        fig.axes[BRUT].set_xlim(max(ts)*ns2s-2, max(ts)*ns2s)
-
-        # Afficher la transformée de Fourier
-        fig.axes[FFT].lines[i].set_data(fs*GHz2Hz, fpd)
+        # Afficher les 2 dernières secondes
+        if pyramide is None:
+            rendu.axes[BRUT].lines[i].set_data(ts, res.dernier(pd, n))
+        else:
+            tp, vp = pyramide.vue(pd, largeur, fin - FENÊTRE / ns2s)
+            rendu.axes[BRUT].lines[i].set_data((tp - fin) * ns2s, vp)
+
+        # Afficher la transformée de Fourier, si elle existe déjà. Sinon,
+        # la courbe précédente reste en place.
+        if fs.size:
+            rendu.axes[FFT].lines[i].set_data(fs*GHz2Hz, fpd)
     
-    fig.axes[FFT].set_ylim(0, max(max(f) for f in fft_pd))
-    plt.pause(1e-10) # Petite pause pour permettre l'affichage correct
+    # Les limites ne sont changées, et la figure redessinée, que si c'est
+    # nécessaire.
+    rendu.limites(rendu.axes[BRUT], xlim=(-FENÊTRE, 0))
+    if fs.size:
+        rendu.ajuster(rendu.axes[FFT], y=(0, max(max(f) for f in fft_pd)))
+    rendu.afficher()
 
 # ===========================
 # = Fonctions structurelles =
 # ===========================
 
-def setup(pds: int = 2, port: str = PORT, debit: int = DEBIT, delai: int = DELAI) -> tuple[list[list[int]], serial.Serial, mpl.figure.Figure, int]:
+def setup(pds: int = 2, port: str = PORT, debit: int = DEBIT, delai: int = DELAI, enregistrement: str | None = ENREGISTREMENT) -> tuple[TamponCirculaire, serial.Serial, RenduBlit, Pyramide, Enregistreur | None, int]:
     '''Initialisation du programme
     
     Initialise le programme avec les paramètres transmis, et retourne les
@@ -200,27 +394,46 @@ def setup(pds: int = 2, port: str = PORT, debit: int = DEBIT, delai: int = DELAI
         Le port série à utiliser
     delai
         Le temps d'attente maximal pour une lecture de données
+    enregistrement
+        Dossier où enregistrer les mesures, ou ``None``
     
     Returns
     --------------
     res
-        Liste des mesures, au format ``[t, pd1, pd2, ...]``
+        Tampon des mesures, avec les colonnes ``t``, ``pd1``, ``pd2``, ...
     ser
         Objet de communication série
-    fig
-        Figure pour l'affichage des données
+    rendu
+        Affichage de la figure pour les données
+    pyramide
+        Versions réduites des mesures, pour l'affichage
+    enregistreur
+        Enregistrement des mesures sur disque, déjà démarré, ou ``None``
     derniere_mesure
         Valeur initiale de 0
     '''
     # Initialisation des paramètres importants
     
-    #: On utilise une expression de liste plutôt que la multiplication pour
-    #: ne pas créer un unique object commun répété plusieurs fois dans la liste.
-    #: Voir https://stackoverflow.com/q/366422 pour ce genre de problèmes.
-    res: list[list[int]] = [[] for pd in range(pds+1)]
+    #: Une colonne par photodiode, plus le temps. Voir :py:func:`mesures`.
+    res = mesures(pds)
     ser = serial.Serial(port, baudrate=debit, timeout=delai)
     
+    #: Versions réduites des mesures, mises à jour à chaque image.
+    #: Voir :py:class:`extra.pyramide.Pyramide`.
+    pyramide = Pyramide(res)
+    
+    #: Le temps en ns, et les valeurs du CAN de 10 bits sur 16 bits.
+    #: Voir :py:class:`extra.enregistreur.Enregistreur`.
+    enregistreur = None
+    if enregistrement is not None:
+        types = {'t': '<i8'} | {f'pd{i}': '<i2' for i in range(1, pds+1)}
+        enregistreur = Enregistreur(enregistrement, types)
+        enregistreur.start()
+    
     #: Paramètres des graphiques
+    #: matplotlib n'est importé qu'ici: c'est le plus long à charger.
+    import matplotlib.pyplot as plt # <https://matplotlib.org/>
+    
     #: Affichage interactif, pour pouvoir suivre l'acquisition en direct
     plt.ion()
     
@@ -230,7 +443,7 @@ def setup(pds: int = 2, port: str = PORT, debit: int = DEBIT, delai: int = DELAI
     fig.suptitle('Démonstration de principe d\'un programme d\'analyse pour un oxymètre de pouls')
     
     ax.set_title('Mesures des photodiodes')
-    ax.set_xlabel('Temps (s)')
+    ax.set_xlabel('Temps avant la dernière mesure (s)')
     ax.set_ylabel('Unités CAN (5V / 1024 bits)')
     ax.plot([], color='black', label='IR')
     ax.plot([], color='red', label='VIS')
@@ -244,7 +457,7 @@ def setup(pds: int = 2, port: str = PORT, debit: int = DEBIT, delai: int = DELAI
     ax2.legend()
 
     ax.set_ylim(0, 1030)
-    ax.set_xlim(left=-200, right=0)
+    ax.set_xlim(left=-2, right=0)
     ax2.set_ylim(bottom=0)
     ax2.set_ylim(auto=True)
     ax2.set_xlim(left=0, right=50)
@@ -252,61 +465,92 @@ def setup(pds: int = 2, port: str = PORT, debit: int = DEBIT, delai: int = DELAI
     fig.tight_layout()
     plt.pause(0.01)
     plt.show()
-
-    return res, ser, fig, 0
-
-def loop(res: list[list[int]], ser: serial.Serial, fig: mpl.figure.Figure):
+    
+    #: Les mises à jour suivantes ne redessinent que les courbes.
+    #: Le rythme de l'affichage est déjà fixé par l'ordonnanceur du
+    #: programme principal: un second plafond au même rythme sauterait une
+    #: image sur deux, à cause de la gigue. Voir :py:class:`extra.loop.Ordonnanceur`.
+    rendu = RenduBlit(fig, None)
+    sondes.jauge('images sautées', lambda: rendu.sautées)
+    sondes.jauge('redessins', lambda: rendu.redessins)
+    if enregistreur is not None:
+        sondes.jauge('lots non enregistrés', lambda: enregistreur.perdus)
+
+    return res, ser, rendu, pyramide, enregistreur, 0
+
+@sondes.chronométrer()
+def loop(res: TamponCirculaire, ser: serial.Serial, rendu: RenduBlit, pyramide: Pyramide | None = None, enregistreur: Enregistreur | None = None):
     '''Prend de nouvelles mesures et les affiche
     
     Parameters
     -----------
     res
-        Liste des mesures prises. Structurée en ``[t, pd1, pd2, ...]``
+        Mesures prises, avec les colonnes ``t``, ``pd1``, ``pd2``, ...
     ser
         Objet de communication série avec lequel communiquer pour obtenir
         les données.
-    fig
-        Figure contenant les différents graphiques
+    rendu
+        Affichage de la figure contenant les différents graphiques
+    pyramide
+        Versions réduites des mesures, pour l'affichage
+    enregistreur
+        Enregistrement des mesures sur disque
     
     Returns
     ---------------
-    res: list[list[int]]
+    res: extra.tampon.TamponCirculaire
     ser: serial.Serial
-    fig: matplotlib.figure.Figure
+    rendu: extra.rendu.RenduBlit
+    pyramide: extra.pyramide.Pyramide | None
+    enregistreur: extra.enregistreur.Enregistreur | None
     derniere_mesure: int
     '''
     # Lecture des valeurs de chaque photodiode
-    res = prendre_mesure(res, ser)
+    res = prendre_mesure(res, ser, LOT, enregistreur)
     
     # Mise à jour du graphique
-    plot(res, fig)
+    plot(res, rendu, pyramide)
     
-    return res, ser, fig, res[0][-1]
+    return res, ser, rendu, pyramide, enregistreur, int(res.dernier('t', 1)[-1]) if len(res) else 0
 
-def setdown(res: list[list[int]], ser: serial.Serial, fig: mpl.figure.Figure):
+def setdown(res: TamponCirculaire, ser: serial.Serial, rendu: RenduBlit, pyramide: Pyramide | None = None, enregistreur: Enregistreur | None = None):
     '''Ferme tous les objets en ayant besoin
     
     Parameters
     ------------
     res
-        Liste des mesures prises, à effacer
+        Mesures prises, à effacer
     ser
         Objet de communication série, à fermer
-    fig
-        Figure, à fermer via pyplot
+    rendu
+        Affichage dont la figure est à fermer via pyplot
+    pyramide
+        Versions réduites des mesures, à effacer
+    enregistreur
+        Enregistrement à terminer, après avoir écrit les mesures en attente
     '''
-    del res[:]
+    res.vider()
+    if pyramide is not None:
+        pyramide.vider()
     ser.close()
-    plt.close(fig)
+    if enregistreur is not None:
+        enregistreur.close()
+        logging.info('%s lots enregistrés dans %s, %s perdus.',
+                     enregistreur.écrits, enregistreur.chemin, enregistreur.perdus)
+    import matplotlib.pyplot as plt # <https://matplotlib.org/>
+    rendu.close()
+    plt.close(rendu.fig)
 
 # ==================================
 # = Fonctions d'analyse de données =
 # ==================================
 
+@sondes.chronométrer()
 def fft(
-    res: list[list[int]],
+    res: TamponCirculaire,
     N_max: int = 50,
-    cadre: str = 'hann'
+    cadre: str = 'hann',
+    dtype: npt.DTypeLike = np.float64
 ) -> tuple[np.array, ...]:
     '''Retourne la transformée de Fourier des données contenues dans :py:data:`res`. C'est une bonne idée de personnaliser cette fonction selon
     vos besoins. Pour bien comprendre ce que fait la fonction, vous devriez
@@ -314,41 +558,72 @@ def fft(
     :py:func:`numpy.fft.rfftfreq`. Pour les mathématiques derrière, consultez
     dans un premier lieu votre chargé de groupe.
     
+    Toutes les photodiodes sont transformées d'un coup, voir
+    :py:func:`extra.fft.spectres`.
+    
     Parameters
     ------------
     res
-        Liste des mesures, au format ``[t, pd1, pd2, ...]``
+        Mesures prises, avec les colonnes ``t``, ``pd1``, ``pd2``, ...
     N_max
         Nombre de mesures à utiliser
+    cadre
+        Nom de la fenêtre, voir :py:func:`scipy.signal.get_window`
+    dtype
+        Précision du calcul, :py:data:`numpy.float64` ou
+        :py:data:`numpy.float32`
     
     Returns
     -------------
     fs
-        Fréquences associées à la transformée
+        Fréquences associées à la transformée, vide s'il y a moins de deux
+        mesures ou que leur espacement est nul
     ys
-        Transformées.
+        Transformées, vides dans les mêmes cas.
     '''
-    N: int = min(len(res[0]), N_max) # Nombre de valeurs à considérer
+    N: int = min(len(res), N_max) # Nombre de valeurs à considérer
     
-    # Estimation de l'espacement, basé sur les mesures
-    ts: list[float] = res[0]
-    d: float = np.mean(np.array(ts[1:]) - np.array(ts[:-1]))
-
-    cadre = scipy.signal.get_window(cadre, N)
-    ys = []
-    for sig in res[1:]:
-        signal = np.array(sig[-N:]) * cadre
-        ys.append(np.abs(np.fft.rfft(signal)))
+    # Estimation de l'espacement, basé sur les N dernières mesures.
+    # La moyenne des différences ts[i+1] - ts[i] ne dépend que des deux
+    # bouts: (ts[-1] - ts[0]) / (N - 1).
+    ts: np.ndarray = res.dernier('t', N)
+    d: float = (ts[-1] - ts[0]) / max(N - 1, 1)
+
+    # Avec une seule mesure, ou des temps tous égaux, l'espacement est nul
+    # et les fréquences ne sont pas définies: pas de spectre pour l'instant.
+    if N < 2 or not d > 0:
+        return np.empty(0), *np.empty((len(res.colonnes) - 1, 0), dtype=dtype)
+
+    # Une ligne par photodiode, une colonne par mesure, à partir des vues
+    # du tampon. La fenêtre est calculée une seule fois pour toutes les
+    # photodiodes, et gardée en mémoire d'un appel à l'autre.
+    signaux = np.array([res.dernier(pd, N) for pd in res.colonnes[1:]], dtype=dtype)
+    ys = spectres(signaux, cadre, dtype)
     
-    fs = np.fft.rfftfreq(signal.size, d=d)
+    fs = fréquences(N, d)
 
     # Équivalent à
     # return fs, ys[0], ys[1], ...
     return fs, *ys
 
 if __name__ == '__main__':
+    import matplotlib.pyplot as plt # <https://matplotlib.org/>
+    
     logging.basicConfig(level=logging.DEBUG)
+    if SONDES:
+        sondes.activer(None if SONDES is True else SONDES)
     *params, derniere_mesure = setup()
+    res, ser, rendu, pyramide, enregistreur = params
+    
+    # Les mesures sont prises à :py:data:`FREQ` Hz, et l'affichage est mis à
+    # jour à :py:data:`FPS` images par seconde, indépendamment.
+    # Voir :py:class:`extra.loop.Ordonnanceur`.
+    ordonnanceur = Ordonnanceur(FPS, fréquence=FREQ)
+    
+    def acquérir(délai: float) -> int:
+        avant = res['t'].total
+        prendre_mesure(res, ser, LOT, enregistreur)
+        return (res['t'].total - avant) * (len(res.colonnes) - 1) # Une valeur par photodiode
     
     try:
         # Cette boucle est infinie à toutes fins pratiques, càd équivalente à
@@ -356,9 +631,11 @@ if __name__ == '__main__':
         #   ...
         # Techniquement, elle s'arrête quand la fenêtre du graphique est fermée,
         # ou que l'utilisateur entre ^C sur la ligne de commande.
-        while len(plt.get_fignums()) > 0:
-            if time.process_time_ns() > (derniere_mesure + ESPACEMENT):
-                *params, derniere_mesure = loop(*params)
+        ordonnanceur.exécuter(
+            acquérir=acquérir,
+            afficher=lambda: plot(res, rendu, pyramide),
+            continuer=lambda: len(plt.get_fignums()) > 0
+        )
     except KeyboardInterrupt:
         # Détection de la combinaison ^C pour arrêter le programme
         logging.critical('Sortie forcée par l\'utilisateur.')
@@ -24,13 +24,20 @@ ressources avant de venir poser vos questions à un technicien.
 # Voir :doc:`deps` pour les détails
 import serial # <https://www.pyserial.com/docs>
 import numpy as np # <https://numpy.org/>
-import scipy as sp # <https://scipy.org/>
-import scipy.signal.windows
-import matplotlib as mpl # <https://matplotlib.org/>
-import matplotlib.pyplot as plt
+import numpy.typing as npt
 import logging
 import time
 
+from extra.rendu import RenduBlit
+from extra.tampon import TamponCirculaire
+from extra.pyramide import Pyramide
+from extra.loop import Ordonnanceur, Arrêt
+from extra.fft import spectres, fréquences
+from extra.horloge import Horloge
+from extra.enregistreur import Enregistreur
+from extra.sondes import sondes
+from client.base import mesures, lire_réponses
+
 # Définitions
 # Voir :doc:`defs`
 
@@ -65,58 +72,258 @@ plus petit que la période associée (0.01ms) multipliée par le nombre de bits
 envoyés. Pour des chiffres, on peut assumer du ASCII 8b, avec un message long
 (eg: ``1021 1012``) faisant donc un peut moins de 80b, on doit avoir au minimum
 un délai de 0.8ms. Avec une petite marge, on arrive à 0.005s.
+
+Pendant une rafale, les octets arrivent sans interruption: le délai ne
+compte qu'entre deux lectures, pas pour la rafale complète.
+'''
+
+DÉCLENCHEUR: bytes = b'\x00'
+'''Requête d'une rafale
+
+Le programme ``serveur/rapide`` lit un seul octet, peu importe sa valeur,
+puis envoie d'un coup toutes les mesures gardées en mémoire. Chaque octet
+envoyé déclenche une rafale complète: on n'en envoie jamais plus d'un.
+'''
+
+M_MESURES: int = 500
+'''Nombre de mesures gardées en mémoire par le micro-contrôleur
+
+Doit correspondre à ``M_mesures`` dans le programme ``serveur/rapide``.
+Voir :py:func:`remplissage`.
+'''
+
+HISTORIQUE: int | None = None
+'''Nombre maximal de mesures gardées en mémoire, ou ``None`` pour tout garder
+
+Voir :py:func:`client.base.mesures`.
+'''
+
+FENÊTRE: float = 2.
+'''Durée affichée, en secondes avant la dernière mesure
+
+Voir :py:data:`client.base.FENÊTRE`.
+'''
+
+ENREGISTREMENT: str | None = None
+'''Dossier où enregistrer toutes les mesures, ou ``None``
+
+Voir :py:data:`client.base.ENREGISTREMENT`.
 '''
 
+SONDES: bool | str = False
+'''Chronométrage des étapes de la boucle
+
+``False`` pour ne rien mesurer, ``True`` pour rapporter la durée de
+:py:func:`prendre_mesure`, :py:func:`fft` et :py:func:`plot` avec
+:py:mod:`logging`, ou le nom d'un fichier où ajouter aussi chaque rapport
+en JSON. Voir :py:mod:`extra.sondes`.
+'''
+
+FPS: float = 30
+'''Nombre maximal d'images par seconde de l'affichage
+
+Voir :py:class:`extra.loop.Ordonnanceur`.
+'''
+
+# Facteurs de conversion
+ns2s: float = 1e-9 #: Conversion de ns à secondes pour les axes des graphiques
+GHz2Hz: float = 1e9 #: Conversion de GHz à Hz pour les graphiques
+us: float = 1e-6 #: Durée d'un coup de ``micros()``, en secondes
+
 # Définition des indices pour les deux types de graphiques
 BRUT: int = 0 #: Index des graphiques de données dans fig.axes
 FFT: int = 1 #: Index des graphiques de transformée de Fourier dans fig.axes
 
-def prendre_mesure[R: list[list[int]]](res: R, ser: serial.Serial) -> R:
-    '''Prise d'une mesure
+def lire_rafale(réponses: bytes, canaux: int) -> np.ndarray | None:
+    '''Convertit une rafale complète en tableau, d'un coup
+    
+    Le programme ``serveur/rapide`` envoie une ligne par colonne de sa
+    mémoire: ``0`` pour le temps (``micros()``), puis ``1``, ``2``, ... pour
+    chaque broche. Chaque ligne commence par son numéro, suivi des mesures
+    séparées par des tabulations::
     
-    prendre_mesure, pour chaque liste de mesures contenues dans ``res``,
-    envoie une requête à l'Arduino puis lit la valeur reçue.
+        0\t1200\t1424\t...\r\n
+        1\t512\t515\t...\r\n
+        2\t498\t501\t...\r\n
+    
+    Toute la rafale est convertie par un seul appel à
+    :py:func:`numpy.fromstring`: les tabulations et les ``\r\n`` sont tous
+    des espaces pour ``sep=' '``.
+    
+    Parameters
+    ----------
+    réponses
+        Octets reçus
+    canaux
+        Nombre de broches mesurées
+    
+    Returns
+    -------
+    rafale
+        Une ligne par colonne (temps, puis broches), une colonne par mesure,
+        ou ``None`` si la rafale est incomplète.
+    '''
+    lignes: int = canaux + 1
+    valeurs = np.fromstring(réponses, dtype=np.int64, sep=' ')
+    if valeurs.size < 2 * lignes or valeurs.size % lignes:
+        return None
+    
+    # La première valeur de chaque ligne est son numéro: une ligne tronquée
+    # décale tous les numéros suivants.
+    valeurs = valeurs.reshape(lignes, -1)
+    if not np.array_equal(valeurs[:, 0], np.arange(lignes)):
+        return None
+    return valeurs[:, 1:]
+
+@sondes.chronométrer()
+def prendre_mesure(res: TamponCirculaire, ser: serial.Serial, horloge: Horloge, enregistreur: Enregistreur | None = None) -> TamponCirculaire:
+    '''Prise d'une rafale de mesures
+    
+    prendre_mesure envoie une seule requête, :py:data:`DÉCLENCHEUR`, puis lit
+    d'un coup toute la mémoire du micro-contrôleur: une ligne pour le temps,
+    puis une par broche. Voir :py:func:`lire_rafale` pour le format.
+    
+    Le micro-contrôleur mesure en continu dans une mémoire circulaire, et
+    l'envoie dans l'ordre de la mémoire. Les mesures sont d'abord remises
+    dans l'ordre chronologique, puis seules celles qui sont plus récentes
+    que la rafale précédente sont gardées.
     
     Parameters
     ----------
     res
-        Liste des mesures prises. Structurée en ``[t, pd1, pd2, ...]``
+        Mesures prises, avec les colonnes ``t``, ``pd1``, ``pd2``, ...
+        Voir :py:func:`client.base.mesures`.
     ser
         Objet de communication série avec lequel communiquer pour obtenir
         les données.
+    horloge
+        Modèle de l'horloge du micro-contrôleur. Se souvient aussi de la
+        dernière mesure reçue, d'une rafale à l'autre.
+    enregistreur
+        Reçoit les nouvelles mesures, pour les écrire sur disque
     
     Returns
     ----------
     res
         Avec les nouvelles valeurs.
 '''
-    # Mesure du temps auquel la mesure est prise
-    mes: list[float] = []
-    ser.write(0)
-    while ser.in_waiting:
-        mes.append(res.readline())
+    canaux: int = len(res.colonnes) - 1
+    
+    # Les restes d'une rafale abandonnée, ou la ligne vide envoyée au
+    # démarrage du micro-contrôleur, décaleraient la lecture.
+    ser.reset_input_buffer()
+    
+    # :py:func:`time.monotonic_ns` est l'heure de l'ordinateur, qui avance
+    # aussi pendant qu'on attend les réponses, et ne recule jamais.
+    avant: int = time.monotonic_ns()
+    ser.write(DÉCLENCHEUR)
+    rafale = lire_rafale(lire_réponses(ser, canaux + 1), canaux)
+    if rafale is None:
+        logging.warning('Rafale incomplète.')
+        sondes.compter('rafales incomplètes')
+        return res
+    sondes.compter('rafales')
     
-    mes = [float(v) for v in l.split[1:] for l in mes]
+    # Les mesures sont dans l'ordre de la mémoire circulaire: la plus
+    # ancienne suit la plus récente, là où le temps recule.
+    brut = rafale[0]
+    sauts = np.diff(brut) % horloge.tour
+    k = int(np.argmax(sauts)) if sauts.size else 0
+    if sauts.size and sauts[k] > horloge.tour // 2:
+        rafale = np.roll(rafale, -(k + 1), axis=1)
     
-    for i in range(res):
-        res[i] += mes[i]
+    # Une rafale reprend les mesures déjà envoyées à la précédente, si le
+    # micro-contrôleur n'a pas eu le temps de remplir sa mémoire.
+    précédent = horloge.dernier
+    ts = horloge.dérouler(rafale[0])
+    nouvelles = slice(None) if précédent is None else ts > précédent
+    ts, valeurs = ts[nouvelles], rafale[1:, nouvelles]
+    sondes.compter('mesures', ts.size)
+    if not ts.size:
+        return res
+    
+    # La dernière mesure est prise juste avant que le micro-contrôleur ne
+    # lise la requête.
+    horloge.ajouter(ts[-1], avant)
+    temps = (horloge.convertir(ts) / ns2s).astype(np.int64)
+    
+    if enregistreur is not None:
+        mes = {f'pd{i}': v for i, v in enumerate(valeurs, start=1)}
+        enregistreur.ajouter({'t': temps, **mes})
+    # Une copie par colonne, sans passer par des listes Python
+    res.ajouter('t', temps)
+    for nom, v in zip(res.colonnes[1:], valeurs):
+        res.ajouter(nom, v)
 
     return res
 
-def plot(res: list[list[int]], fig: mpl.figure.Figure):
+def remplissage(res: TamponCirculaire, mesures: int = M_MESURES) -> float:
+    '''Temps avant que la mémoire du micro-contrôleur ne soit remplie de nouvelles mesures
+    
+    Le micro-contrôleur ne mesure pas pendant qu'il envoie une rafale, et
+    chaque rafale renvoie toute sa mémoire. Demander la suivante aussitôt
+    ferait renvoyer presque les mêmes mesures: il vaut mieux attendre que
+    ``mesures`` nouvelles mesures soient prises. La période est estimée à
+    partir des dernières mesures reçues.
+    
+    Parameters
+    ----------
+    res
+        Mesures prises, avec la colonne ``t``
+    mesures
+        Taille de la mémoire du micro-contrôleur, voir :py:data:`M_MESURES`
+    
+    Returns
+    -------
+    attente
+        En secondes à partir de la fin de la dernière rafale, 0 s'il n'y a
+        pas assez de mesures pour estimer la période.
+    '''
+    n: int = min(len(res), mesures)
+    if n < 2:
+        return 0.
+    t = res.dernier('t', n)
+    return float(t[-1] - t[0]) / (n - 1) * mesures * ns2s
+
+@sondes.chronométrer()
+def plot(res: TamponCirculaire, rendu: RenduBlit, pyramide: Pyramide | None = None):
     '''Mise à jour du graphique avec de nouvelles données
     
-    Met les graphiques contenus dans fig à jour avec les données de res.
+    Met les graphiques de la figure de ``rendu`` à jour avec les données de
+    res. Seules les courbes sont redessinées, à moins que les données ne
+    sortent des limites des axes. Voir :py:class:`extra.rendu.RenduBlit`.
     
     Parameters
     ----------
     res
-        Liste des mesures prises. Structurée en ``[t, pd1, pd2, ...]``
-    fig
-        Figure contenant les différents graphiques
+        Mesures prises, avec les colonnes ``t``, ``pd1``, ``pd2``, ...
+    rendu
+        Affichage de la figure contenant les différents graphiques
+    pyramide
+        Versions réduites des mesures, pour ne pas dessiner plus de deux
+        points par pixel. ``None`` pour dessiner toutes les mesures de la
+        fenêtre.
     '''
+    # Si on n'a pas encore de mesures, ou que la dernière image est trop
+    # récente, on n'en prépare pas de nouvelle.
+    if not len(res) or not rendu.prêt():
+        return
+    
     fs, *fft_pd = fft(res) # Calculer la FFT
-    ts = res[0]
+    
+    # Seules les mesures des :py:data:`FENÊTRE` dernières secondes sont
+    # affichées. Voir :py:func:`client.base.plot`.
+    t = res.dernier('t')
+    fin = t[-1]
+    n: int = t.size - np.searchsorted(t, fin - FENÊTRE / ns2s)
+    
+    # Une rafale apporte des milliers de mesures d'un coup: la pyramide
+    # n'en garde qu'au plus deux points par pixel de l'axe.
+    largeur: int = rendu.largeur(rendu.axes[BRUT])
+    
+    # Le temps est compté à partir de la dernière mesure, pour que les
+    # limites de l'axe ne changent pas d'une image à l'autre.
+    ts = (t[-n:] - fin) * ns2s
     # Python permet le paquetage/dépaquetage dans les définitions de variables
     # On peut par exemple définir les mêmes variables avec les mêmes valeurs
     # de plusieurs manières différentes:
@@ -130,35 +337,44 @@ def plot(res: list[list[int]], fig: mpl.figure.Figure):
     # et l'index d'une liste. Dans la boucle, on a donc:
     #
     # i: int = <index des éléments>
-    # pd: list[float] = <données de la broche/photodiode i>
-    # fpd: list[float] = <transformée de pd>
-    for i, (pd, fpd) in enumerate(zip(res[1:], fft_pd)):
-        # fig est la figure passée en argument
-        # fig.axes est la liste des axes contenus dans la figure
-        # fig.axes[0] est l'axe qu'on utilise pour les données brutes
-        # fig.axes[1] est l'axe qu'on utilise pour la FFT
-        # fig.axes[i].lines est la liste des courbes dessinées sur fig.axes[i]
-        # fig.axes[i].lines[pd] est la courbe associée à la photodiode pd
-        # fig.axes[i].lines[pd].set_ydata permet de modifier les valeurs en y
+    # pd: str = <nom de la colonne de la broche/photodiode i>
+    # fpd: np.ndarray = <transformée de pd>
+    for i, (pd, fpd) in enumerate(zip(res.colonnes[1:], fft_pd)):
+        # rendu.fig est la figure passée en argument
+        # rendu.axes est la liste des axes contenus dans la figure
+        # rendu.axes[0] est l'axe qu'on utilise pour les données brutes
+        # rendu.axes[1] est l'axe qu'on utilise pour la FFT
+        # rendu.axes[i].lines est la liste des courbes dessinées sur rendu.axes[i]
+        # rendu.axes[i].lines[pd] est la courbe associée à la photodiode pd
+        # rendu.axes[i].lines[pd].set_ydata permet de modifier les valeurs en y
         #   d'une courbe existante
-        # fig.axes[i].lines[pd].get_ydata permet d'obtenir les valeurs en y
+        # rendu.axes[i].lines[pd].get_ydata permet d'obtenir les valeurs en y
         #   d'une courbe existante.
         
-        # Afficher jusqu'aux 200 derniers points
-        fig.axes[BRUT].lines[i].set_data(np.array(ts)*ns2s, pd)
-        fig.axes[BRUT].set_xlim(max(ts)*ns2s-2, max(ts)*ns2s)
-
-        # Afficher la transformée de Fourier
-        fig.axes[FFT].lines[i].set_data(fs*GHz2Hz, fpd)
+        # Afficher les 2 dernières secondes
+        if pyramide is None:
+            rendu.axes[BRUT].lines[i].set_data(ts, res.dernier(pd, n))
+        else:
+            tp, vp = pyramide.vue(pd, largeur, fin - FENÊTRE / ns2s)
+            rendu.axes[BRUT].lines[i].set_data((tp - fin) * ns2s, vp)
+
+        # Afficher la transformée de Fourier, si elle existe déjà. Sinon,
+        # la courbe précédente reste en place.
+        if fs.size:
+            rendu.axes[FFT].lines[i].set_data(fs*GHz2Hz, fpd)
     
-    fig.axes[FFT].set_ylim(0, max(max(f) for f in fft_pd))
-    plt.pause(1e-10) # Petite pause pour permettre l'affichage correct
+    # Les limites ne sont changées, et la figure redessinée, que si c'est
+    # nécessaire.
+    rendu.limites(rendu.axes[BRUT], xlim=(-FENÊTRE, 0))
+    if fs.size:
+        rendu.ajuster(rendu.axes[FFT], y=(0, max(max(f) for f in fft_pd)))
+    rendu.afficher()
 
 # ===========================
 # = Fonctions structurelles =
 # ===========================
 
-def setup(pds: int = 2, port: str = PORT, debit: int = DEBIT, delai: int = DELAI) -> tuple[list[list[int]], serial.Serial, mpl.figure.Figure, int]:
+def setup(pds: int = 2, port: str = PORT, debit: int = DEBIT, delai: int = DELAI, enregistrement: str | None = ENREGISTREMENT) -> tuple[TamponCirculaire, serial.Serial, RenduBlit, Pyramide, Horloge, Enregistreur | None]:
     '''Initialisation du programme
     
     Initialise le programme avec les paramètres transmis, et retourne les
@@ -172,27 +388,50 @@ def setup(pds: int = 2, port: str = PORT, debit: int = DEBIT, delai: int = DELAI
         Le port série à utiliser
     delai
         Le temps d'attente maximal pour une lecture de données
+    enregistrement
+        Dossier où enregistrer les mesures, ou ``None``
     
     Returns
     --------------
     res
-        Liste des mesures, au format ``[t, pd1, pd2, ...]``
+        Tampon des mesures, avec les colonnes ``t``, ``pd1``, ``pd2``, ...
     ser
         Objet de communication série
-    fig
-        Figure pour l'affichage des données
-    derniere_mesure
-        Valeur initiale de 0
+    rendu
+        Affichage de la figure pour les données
+    pyramide
+        Versions réduites des mesures, pour l'affichage
+    horloge
+        Modèle de l'horloge du micro-contrôleur
+    enregistreur
+        Enregistrement des mesures sur disque, déjà démarré, ou ``None``
     '''
     # Initialisation des paramètres importants
     
-    #: On utilise une expression de liste plutôt que la multiplication pour
-    #: ne pas créer un unique object commun répété plusieurs fois dans la liste.
-    #: Voir https://stackoverflow.com/q/366422 pour ce genre de problèmes.
-    res: list[list[int]] = [[] for pd in range(pds+1)]
+    #: Une colonne par photodiode, plus le temps. Voir
+    #: :py:func:`client.base.mesures`.
+    res = mesures(pds, HISTORIQUE)
     ser = serial.Serial(port, baudrate=debit, timeout=delai)
     
+    #: Versions réduites des mesures, mises à jour à chaque image.
+    #: Voir :py:class:`extra.pyramide.Pyramide`.
+    pyramide = Pyramide(res)
+    
+    #: Le temps de chaque mesure vient de ``micros()``, converti à l'horloge
+    #: de l'ordinateur. Voir :py:class:`extra.horloge.Horloge`.
+    horloge = Horloge(unité=us)
+    
+    #: Voir :py:class:`extra.enregistreur.Enregistreur`.
+    enregistreur = None
+    if enregistrement is not None:
+        types = {'t': '<i8'} | {f'pd{i}': '<i2' for i in range(1, pds+1)}
+        enregistreur = Enregistreur(enregistrement, types)
+        enregistreur.start()
+    
     #: Paramètres des graphiques
+    #: matplotlib n'est importé qu'ici: c'est le plus long à charger.
+    import matplotlib.pyplot as plt # <https://matplotlib.org/>
+    
     #: Affichage interactif, pour pouvoir suivre l'acquisition en direct
     plt.ion()
     
@@ -202,7 +441,7 @@ def setup(pds: int = 2, port: str = PORT, debit: int = DEBIT, delai: int = DELAI
     fig.suptitle('Démonstration de principe d\'un programme d\'analyse pour un oxymètre de pouls')
     
     ax.set_title('Mesures des photodiodes')
-    ax.set_xlabel('Temps (s)')
+    ax.set_xlabel('Temps avant la dernière mesure (s)')
     ax.set_ylabel('Unités CAN (5V / 1024 bits)')
     ax.plot([], color='black', label='IR')
     ax.plot([], color='red', label='VIS')
@@ -216,7 +455,7 @@ def setup(pds: int = 2, port: str = PORT, debit: int = DEBIT, delai: int = DELAI
     ax2.legend()
 
     ax.set_ylim(0, 1030)
-    ax.set_xlim(left=-200, right=0)
+    ax.set_xlim(left=-2, right=0)
     ax2.set_ylim(bottom=0)
     ax2.set_ylim(auto=True)
     ax2.set_xlim(left=0, right=50)
@@ -224,61 +463,96 @@ def setup(pds: int = 2, port: str = PORT, debit: int = DEBIT, delai: int = DELAI
     fig.tight_layout()
     plt.pause(0.01)
     plt.show()
-
-    return res, ser, fig, 0
-
-def loop(res: list[list[int]], ser: serial.Serial, fig: mpl.figure.Figure):
-    '''Prend de nouvelles mesures et les affiche
+    
+    #: Les mises à jour suivantes ne redessinent que les courbes.
+    #: Le rythme de l'affichage est déjà fixé par l'ordonnanceur du
+    #: programme principal: un second plafond au même rythme sauterait une
+    #: image sur deux, à cause de la gigue. Voir :py:class:`extra.loop.Ordonnanceur`.
+    rendu = RenduBlit(fig, None)
+    sondes.jauge('images sautées', lambda: rendu.sautées)
+    sondes.jauge('redessins', lambda: rendu.redessins)
+    if enregistreur is not None:
+        sondes.jauge('lots non enregistrés', lambda: enregistreur.perdus)
+
+    return res, ser, rendu, pyramide, horloge, enregistreur
+
+@sondes.chronométrer()
+def loop(res: TamponCirculaire, ser: serial.Serial, rendu: RenduBlit, pyramide: Pyramide | None, horloge: Horloge, enregistreur: Enregistreur | None = None):
+    '''Prend une nouvelle rafale de mesures et l'affiche
     
     Parameters
     -----------
     res
-        Liste des mesures prises. Structurée en ``[t, pd1, pd2, ...]``
+        Mesures prises, avec les colonnes ``t``, ``pd1``, ``pd2``, ...
     ser
         Objet de communication série avec lequel communiquer pour obtenir
         les données.
-    fig
-        Figure contenant les différents graphiques
+    rendu
+        Affichage de la figure contenant les différents graphiques
+    pyramide
+        Versions réduites des mesures, pour l'affichage
+    horloge
+        Modèle de l'horloge du micro-contrôleur
+    enregistreur
+        Enregistrement des mesures sur disque
     
     Returns
     ---------------
-    res: list[list[int]]
+    res: extra.tampon.TamponCirculaire
     ser: serial.Serial
-    fig: matplotlib.figure.Figure
-    derniere_mesure: int
+    rendu: extra.rendu.RenduBlit
+    pyramide: extra.pyramide.Pyramide | None
+    horloge: extra.horloge.Horloge
+    enregistreur: extra.enregistreur.Enregistreur | None
     '''
-    # Lecture des valeurs de chaque photodiode
-    res = prendre_mesure(res, ser)
+    # Lecture d'une rafale de toutes les photodiodes
+    res = prendre_mesure(res, ser, horloge, enregistreur)
     
     # Mise à jour du graphique
-    plot(res, fig)
+    plot(res, rendu, pyramide)
     
-    return res, ser, fig, res[0][-1]
+    return res, ser, rendu, pyramide, horloge, enregistreur
 
-def setdown(res: list[list[int]], ser: serial.Serial, fig: mpl.figure.Figure):
+def setdown(res: TamponCirculaire, ser: serial.Serial, rendu: RenduBlit, pyramide: Pyramide | None = None, horloge: Horloge | None = None, enregistreur: Enregistreur | None = None):
     '''Ferme tous les objets en ayant besoin
     
     Parameters
     ------------
     res
-        Liste des mesures prises, à effacer
+        Mesures prises, à effacer
     ser
         Objet de communication série, à fermer
-    fig
-        Figure, à fermer via pyplot
+    rendu
+        Affichage dont la figure est à fermer via pyplot
+    pyramide
+        Versions réduites des mesures, à effacer
+    horloge
+        Modèle de l'horloge du micro-contrôleur, rien à fermer
+    enregistreur
+        Enregistrement à terminer, après avoir écrit les mesures en attente
     '''
-    del res[:]
+    res.vider()
+    if pyramide is not None:
+        pyramide.vider()
     ser.close()
-    plt.close(fig)
+    if enregistreur is not None:
+        enregistreur.close()
+        logging.info('%s lots enregistrés dans %s, %s perdus.',
+                     enregistreur.écrits, enregistreur.chemin, enregistreur.perdus)
+    import matplotlib.pyplot as plt # <https://matplotlib.org/>
+    rendu.close()
+    plt.close(rendu.fig)
 
 # ==================================
 # = Fonctions d'analyse de données =
 # ==================================
 
+@sondes.chronométrer()
 def fft(
-    res: list[list[int]],
+    res: TamponCirculaire,
     N_max: int = 500,
-    cadre: str = 'hann'
+    cadre: str = 'hann',
+    dtype: npt.DTypeLike = np.float64
 ) -> tuple[np.array, ...]:
     '''Retourne la transformée de Fourier des données contenues dans :py:data:`res`. C'est une bonne idée de personnaliser cette fonction selon
     vos besoins. Pour bien comprendre ce que fait la fonction, vous devriez
@@ -286,50 +560,95 @@ def fft(
     :py:func:`numpy.fft.rfftfreq`. Pour les mathématiques derrière, consultez
     dans un premier lieu votre chargé de groupe.
     
+    Toutes les photodiodes sont transformées d'un coup, voir
+    :py:func:`extra.fft.spectres`.
+    
     Parameters
     ------------
     res
-        Liste des mesures, au format ``[t, pd1, pd2, ...]``
+        Mesures prises, avec les colonnes ``t``, ``pd1``, ``pd2``, ...
     N_max
         Nombre de mesures à utiliser
+    cadre
+        Nom de la fenêtre, voir :py:func:`scipy.signal.get_window`
+    dtype
+        Précision du calcul, :py:data:`numpy.float64` ou
+        :py:data:`numpy.float32`
     
     Returns
     -------------
     fs
-        Fréquences associées à la transformée
+        Fréquences associées à la transformée, vide s'il y a moins de deux
+        mesures ou que leur espacement est nul
     ys
-        Transformées.
+        Transformées, vides dans les mêmes cas.
     '''
-    N: int = min(len(res[0]), N_max) # Nombre de valeurs à considérer
+    N: int = min(len(res), N_max) # Nombre de valeurs à considérer
     
-    # Estimation de l'espacement, basé sur les mesures
-    ts: list[float] = res[0]
-    d: float = np.mean(np.array(ts[1:]) - np.array(ts[:-1]))
-
-    ys = []
-    for sig in res[1:]:
-        cadre = scipy.signal.get_window(cadre, N)
-        signal = np.array(sig[-N:]) * cadre
-        ys.append(np.abs(np.fft.rfft(signal)))
+    # Estimation de l'espacement, basé sur les N dernières mesures.
+    # Voir :py:func:`client.base.fft`.
+    ts: np.ndarray = res.dernier('t', N)
+    d: float = (ts[-1] - ts[0]) / max(N - 1, 1)
+
+    # Avec une seule mesure, ou des temps tous égaux, l'espacement est nul
+    # et les fréquences ne sont pas définies: pas de spectre pour l'instant.
+    if N < 2 or not d > 0:
+        return np.empty(0), *np.empty((len(res.colonnes) - 1, 0), dtype=dtype)
+
+    # Une ligne par photodiode, une colonne par mesure, à partir des vues
+    # du tampon. La fenêtre est calculée une seule fois pour toutes les
+    # photodiodes, et gardée en mémoire d'un appel à l'autre.
+    signaux = np.array([res.dernier(pd, N) for pd in res.colonnes[1:]], dtype=dtype)
+    ys = spectres(signaux, cadre, dtype)
     
-    fs = np.fft.rfftfreq(signal.size, d=d)
+    fs = fréquences(N, d)
 
     # Équivalent à
     # return fs, ys[0], ys[1], ...
     return fs, *ys
 
 if __name__ == '__main__':
-    *params, derniere_mesure = setup()
+    import matplotlib.pyplot as plt # <https://matplotlib.org/>
     
+    logging.basicConfig(level=logging.INFO)
+    if SONDES:
+        sondes.activer(None if SONDES is True else SONDES)
+    params = setup()
+    res, ser, rendu, pyramide, horloge, enregistreur = params
+    
+    # Une rafale est demandée quand la mémoire du micro-contrôleur est
+    # remplie de nouvelles mesures, et l'affichage est mis à jour à
+    # :py:data:`FPS` images par seconde, indépendamment.
+    # Voir :py:class:`extra.loop.Ordonnanceur` et :py:func:`remplissage`.
+    ordonnanceur = Ordonnanceur(FPS)
+    prochaine: float = time.monotonic()
+    
+    def acquérir(délai: float) -> int:
+        global prochaine
+        # L'attente est limitée à délai, pour que l'affichage suive.
+        reste = prochaine - time.monotonic()
+        if reste > 0:
+            time.sleep(min(reste, délai))
+            return 0
+        avant = res['t'].total
+        prendre_mesure(res, ser, horloge, enregistreur)
+        prochaine = time.monotonic() + remplissage(res)
+        return (res['t'].total - avant) * (len(res.colonnes) - 1) # Une valeur par photodiode
+    
+    # ^C ou ``kill`` ne font que demander l'arrêt: la boucle termine son tour,
+    # puis on passe par :py:func:`setdown`. Voir :py:class:`extra.loop.Arrêt`.
     try:
-        # Cette boucle est infinie à toutes fins pratiques, càd équivalente à
-        # while True:
-        #   ...
-        # Techniquement, elle s'arrête quand la fenêtre du graphique est fermée,
-        # ou que l'utilisateur entre ^C sur la ligne de commande.
-        while plt.get_fignums() > 0:
-            if time.process_time_ns() > (derniere_mesure + ESPACEMENT):
-                *params, derniere_mesure = loop(*params)
+        with Arrêt() as arrêt:
+            # Cette boucle est infinie à toutes fins pratiques, càd équivalente à
+            # while True:
+            #   ...
+            # Techniquement, elle s'arrête quand la fenêtre du graphique est
+            # fermée, ou que le programme reçoit ^C ou ``SIGTERM``.
+            ordonnanceur.exécuter(
+                acquérir=acquérir,
+                afficher=lambda: plot(res, rendu, pyramide),
+                continuer=lambda: not arrêt.demandé and len(plt.get_fignums()) > 0
+            )
     except KeyboardInterrupt:
         # Détection de la combinaison ^C pour arrêter le programme
         logging.critical('Sortie forcée par l\'utilisateur.')
@@ -342,4 +661,3 @@ if __name__ == '__main__':
         # eg: libérer le port série pour qu'il puisse être utilisé par d'autres
         # programmes.
         setdown(*params)
-
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+'''Acquisition simultanée sur plusieurs micro-contrôleurs avec :py:mod:`asyncio`
+
+``auditeur.setup`` n'ouvre qu'un seul port. Pour un banc avec plusieurs
+micro-contrôleurs, on pourrait lancer un programme par port, ou un
+:py:class:`extra.lecteur.LecteurSérie` par port. Ici, une seule boucle
+:py:mod:`asyncio` surveille tous les ports à la fois: le système
+d'exploitation signale chaque port qui a des données prêtes
+(:py:meth:`asyncio.loop.add_reader`), et seul ce port est lu, sans jamais
+bloquer. Un port lent ne ralentit donc pas les autres.
+
+Chaque :py:class:`Appareil` a son propre tampon de réception, sa propre
+interprétation des blocs et son propre
+:py:class:`extra.tampon.TamponCirculaire`.
+
+.. note::
+
+    :py:meth:`asyncio.loop.add_reader` demande un descripteur de fichier
+    (:py:meth:`serial.Serial.fileno`), disponible sous Linux et macOS.
+'''
+
+import asyncio # <https://docs.python.org/3/library/asyncio.html>
+import logging
+import os
+
+from typing import Callable, Iterable
+
+import numpy as np # <https://numpy.org/>
+import serial # <https://pyserial.readthedocs.io/en/latest/>
+
+from extra.parseur import analyser_bloc, BlocInvalide, SEP_BLOC
+from extra.tampon import TamponCirculaire
+
+TAILLE_LECTURE: int = 1 << 16 #: Nombre maximal d'octets lus d'un coup
+CAPACITÉ: int = 4096 #: Nombre de valeurs gardées par colonne et par appareil
+COLONNES: tuple[str, ...] = ('ts', 'A0', 'F') #: Colonnes envoyées par l'annonceur
+
+
+class Appareil:
+    '''Un micro-contrôleur annonceur, branché sur un port série
+
+    Parameters
+    ----------
+    port
+        Port série à utiliser
+    debit
+        Débit de communication
+    capacité
+        Nombre de valeurs gardées par colonne
+    colonnes
+        Colonnes de :py:attr:`res`, les autres sont ignorées
+    bannière
+        Si vrai, le premier bloc reçu contient les paramètres du
+        micro-contrôleur et est gardé dans :py:attr:`bannière`.
+    '''
+
+    def __init__(self,
+                 port: str,
+                 debit: int = 1000000,
+                 capacité: int = CAPACITÉ,
+                 colonnes: Iterable[str] = COLONNES,
+                 bannière: bool = True):
+        # Un délai nul rend la lecture non-bloquante.
+        self.ser = serial.Serial(port, baudrate=debit, timeout=0)
+        self.port: str = port
+        self.res = TamponCirculaire(capacité, colonnes)
+        self.bannière: bytes | None = None if bannière else b''
+        self._reçu = bytearray() # Octets reçus, pas encore dans un bloc complet
+
+        self.octets: int = 0 #: Nombre d'octets lus
+        self.blocs: int = 0 #: Nombre de blocs valides
+        self.invalides: int = 0 #: Nombre de blocs rejetés
+
+    def fileno(self) -> int:
+        return self.ser.fileno()
+
+    def lire(self) -> list[dict[str, np.ndarray]]:
+        '''Lit les octets disponibles et retourne les blocs complétés
+
+        N'attend jamais: à appeler quand le port est prêt à être lu.
+        '''
+        try:
+            données = os.read(self.fileno(), TAILLE_LECTURE)
+        except BlockingIOError:
+            return []
+        self.octets += len(données)
+        self._reçu += données
+
+        blocs = []
+        début: int = 0
+        while (fin := self._reçu.find(SEP_BLOC, début)) >= 0:
+            fin += len(SEP_BLOC)
+            bloc = bytes(self._reçu[début:fin])
+            début = fin
+
+            if self.bannière is None:
+                self.bannière = bloc.strip()
+                continue
+
+            try:
+                mes = analyser_bloc(bloc)
+            except BlocInvalide:
+                self.invalides += 1
+                continue
+
+            for nom, valeurs in mes.items():
+                if nom in self.res:
+                    self.res.ajouter(nom, valeurs)
+            self.blocs += 1
+            blocs.append(mes)
+
+        del self._reçu[:début]
+        return blocs
+
+    def close(self):
+        self.ser.close()
+
+
+class Acquisition:
+    '''Boucle :py:mod:`asyncio` qui lit plusieurs :py:class:`Appareil` à la fois
+
+    Parameters
+    ----------
+    appareils
+        Les appareils à lire
+    rappel
+        Fonction appelée pour chaque bloc reçu, avec l'appareil et le bloc
+        converti. Elle s'exécute dans la boucle: elle doit être rapide.
+    '''
+
+    def __init__(self,
+                 appareils: Iterable[Appareil],
+                 rappel: Callable[[Appareil, dict[str, np.ndarray]], None] | None = None):
+        self.appareils: list[Appareil] = list(appareils)
+        self.rappel = rappel
+
+    def _prêt(self, appareil: Appareil):
+        try:
+            blocs = appareil.lire()
+        except OSError:
+            # Le micro-contrôleur a été débranché: on cesse de le surveiller
+            # sans arrêter les autres.
+            logging.exception('Erreur de lecture sur %s.', appareil.port)
+            asyncio.get_running_loop().remove_reader(appareil.fileno())
+            return
+
+        if self.rappel is not None:
+            for mes in blocs:
+                self.rappel(appareil, mes)
+
+    async def exécuter(self, arrêt: asyncio.Event | None = None, durée: float | None = None):
+        '''Lit tous les appareils jusqu'à ``arrêt`` ou pendant ``durée`` secondes
+
+        Parameters
+        ----------
+        arrêt
+            Événement qui termine l'acquisition
+        durée
+            Durée maximale de l'acquisition, en secondes
+        '''
+        boucle = asyncio.get_running_loop()
+        arrêt = arrêt or asyncio.Event()
+        for a in self.appareils:
+            boucle.add_reader(a.fileno(), self._prêt, a)
+
+        try:
+            await asyncio.wait_for(arrêt.wait(), durée)
+        except TimeoutError:
+            pass
+        finally:
+            for a in self.appareils:
+                boucle.remove_reader(a.fileno())
+
+    def close(self):
+        '''Ferme tous les ports'''
+        for a in self.appareils:
+            a.close()
+
+
+def acquérir(ports: Iterable[str], durée: float, **kargs) -> list[Appareil]:
+    '''Lit plusieurs ports pendant ``durée`` secondes
+
+    Les autres arguments sont passés à :py:class:`Appareil`.
+
+    Returns
+    -------
+    appareils
+        Les appareils, fermés, avec leurs mesures dans :py:attr:`Appareil.res`.
+    '''
+    acq = Acquisition(Appareil(p, **kargs) for p in ports)
+    try:
+        asyncio.run(acq.exécuter(durée=durée))
+    finally:
+        acq.close()
+    return acq.appareils
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+'''Analyse des blocs dans des processus séparés, à travers la mémoire partagée
+
+Une analyse lourde (saturation en oxygène, détection de pouls, ...) faite
+dans le programme principal retarde l'acquisition et l'affichage, et des
+fils d'exécution n'y changent rien: le GIL ne laisse qu'un fil exécuter du
+Python à la fois. :py:class:`AnalyseParallèle` envoie plutôt chaque bloc à
+un groupe de processus (:py:class:`extra.decorators.Travailleurs`).
+
+Les tableaux ne passent pas par :py:mod:`pickle`: ils sont copiés une seule
+fois dans une case d'un segment de :py:mod:`multiprocessing.shared_memory`,
+que les processus voient directement comme des :py:class:`numpy.ndarray`.
+Seuls le numéro de la case et la taille du bloc sont envoyés, et seul le
+résultat de l'analyse (habituellement quelques nombres) revient par
+:py:mod:`pickle`.
+
+Il y a autant de cases que de blocs en cours d'analyse au maximum: quand
+elles sont toutes occupées, :py:meth:`AnalyseParallèle.soumettre` attend
+que le plus ancien bloc soit terminé. Les résultats sont rendus dans l'ordre
+des blocs par :py:meth:`AnalyseParallèle.prêts`: une analyse qui échoue
+rend son exception à la place de son résultat, pour que chaque résultat
+corresponde toujours à son bloc.
+
+.. code-block:: python
+
+    def pouls(ts, A0):  # Au niveau du module, pour être importable
+        ...
+        return bpm
+
+    with AnalyseParallèle(pouls, {'ts': '<i8', 'A0': '<i2'}, N=256) as analyse:
+        while ...:
+            analyse.soumettre(ts=..., A0=...)
+            for bpm in analyse.prêts():
+                ...
+'''
+
+import os
+import logging
+import concurrent.futures
+
+from collections import deque
+from multiprocessing import shared_memory
+from typing import Any, Callable, Iterator, Mapping
+
+import numpy as np # <https://numpy.org/>
+import numpy.typing as npt
+
+from extra.decorators import Travailleurs
+
+TRAVAILLEURS: int = max(1, (os.cpu_count() or 2) - 1) #: Nombre de processus par défaut, un cœur restant pour l'acquisition
+EN_COURS: int = 2 #: Nombre de blocs en cours d'analyse par processus, par défaut
+
+
+def _disposition(colonnes: Mapping[str, np.dtype], N: int) -> tuple[dict[str, int], int]:
+    '''Position de chaque colonne dans une case, et taille d'une case, en octets'''
+    positions: dict[str, int] = {}
+    taille: int = 0
+    for nom, dtype in colonnes.items():
+        # Chaque colonne est alignée sur 64 octets, comme une ligne de cache.
+        taille = -(-taille // 64) * 64
+        positions[nom] = taille
+        taille += N * dtype.itemsize
+    return positions, -(-taille // 64) * 64
+
+
+def _vues(tampon: memoryview, colonnes: Mapping[str, np.dtype], N: int, cases: int) -> list[dict[str, np.ndarray]]:
+    '''Tableaux de chaque colonne de chaque case du segment'''
+    positions, taille = _disposition(colonnes, N)
+    return [{nom: np.ndarray(N, dtype, tampon, i * taille + positions[nom])
+             for nom, dtype in colonnes.items()}
+            for i in range(cases)]
+
+
+# État de chaque processus de travail, préparé une seule fois par
+# :py:func:`_attacher`.
+_segment: shared_memory.SharedMemory | None = None
+_cases: list[dict[str, np.ndarray]] = []
+_fonction: Callable[..., Any] | None = None
+
+
+def _attacher(nom: str, colonnes: dict[str, str], N: int, cases: int, fonction: Callable[..., Any]):
+    global _segment, _cases, _fonction
+    # Le segment appartient au programme principal, qui le détruira: le
+    # processus ne fait que s'y attacher, sans le suivre.
+    _segment = shared_memory.SharedMemory(nom, track=False)
+    _cases = _vues(_segment.buf, {k: np.dtype(v) for k, v in colonnes.items()}, N, cases)
+    _fonction = fonction
+
+
+def _analyser(case: int, n: int) -> Any:
+    vues = _cases[case]
+    return _fonction(**{nom: v[:n] for nom, v in vues.items()})
+
+
+class AnalyseParallèle:
+    '''Analyse chaque bloc dans un groupe de processus
+
+    Parameters
+    ----------
+    fonction
+        Analyse d'un bloc, appelée avec un tableau par colonne, en
+        arguments nommés. Elle doit être définie au niveau d'un module,
+        pour que les processus puissent l'importer, et ne pas garder les
+        tableaux après son retour: la case est réutilisée.
+    colonnes
+        Nom et type de chaque colonne envoyée
+    N
+        Nombre maximal de valeurs par colonne dans un bloc
+    travailleurs
+        Nombre de processus
+    en_cours
+        Nombre maximal de blocs envoyés mais pas encore rendus par
+        :py:meth:`prêts`. Par défaut, :py:data:`EN_COURS` par processus.
+    '''
+
+    def __init__(self,
+                 fonction: Callable[..., Any],
+                 colonnes: Mapping[str, npt.DTypeLike],
+                 N: int,
+                 travailleurs: int = TRAVAILLEURS,
+                 en_cours: int | None = None):
+        self.fonction: Callable[..., Any] = fonction
+        self.colonnes: dict[str, np.dtype] = {nom: np.dtype(d) for nom, d in colonnes.items()}
+        self.N: int = N
+        self.en_cours: int = en_cours or EN_COURS * travailleurs
+
+        _, taille = _disposition(self.colonnes, N)
+        self._segment = shared_memory.SharedMemory(create=True, size=taille * self.en_cours)
+        self._cases: list[dict[str, np.ndarray]] = _vues(self._segment.buf, self.colonnes, N, self.en_cours)
+        self._libres: deque[int] = deque(range(self.en_cours))
+        self._envoyés: deque[tuple[int, concurrent.futures.Future]] = deque()
+        self._terminés: deque[Any] = deque()
+
+        # Les cases libres limitent déjà le nombre de blocs en cours: les
+        # travailleurs n'ont jamais à faire attendre.
+        self._travailleurs = Travailleurs(
+            travailleurs, processus=True, en_cours=self.en_cours, journaliser=False,
+            initializer=_attacher,
+            initargs=(self._segment.name, {k: v.str for k, v in self.colonnes.items()},
+                      N, self.en_cours, fonction))
+
+        self.soumis: int = 0 #: Nombre de blocs envoyés
+        self.rendus: int = 0 #: Nombre de résultats rendus par :py:meth:`prêts`
+        self.attentes: int = 0 #: Nombre de fois où :py:meth:`soumettre` a attendu une case libre
+        self.erreurs: int = 0 #: Nombre d'analyses qui ont levé une exception
+
+    def _récupérer(self):
+        case, futur = self._envoyés.popleft()
+        try:
+            self._terminés.append(futur.result())
+        except Exception as e:
+            # L'exception prend la place du résultat: les suivants restent
+            # alignés sur leurs blocs.
+            self._terminés.append(e)
+            self.erreurs += 1
+            logging.exception('Erreur dans l\'analyse de %s.', self.fonction.__name__)
+        finally:
+            self._libres.append(case)
+
+    def soumettre(self, **colonnes: npt.ArrayLike):
+        '''Copie un bloc dans une case libre et l'envoie à l'analyse
+
+        Si toutes les cases sont occupées, attend que le plus ancien bloc
+        soit analysé. Son résultat est gardé pour :py:meth:`prêts`.
+        '''
+        valeurs = {nom: np.asarray(colonnes[nom]).ravel() for nom in self.colonnes}
+        n: int = valeurs[next(iter(valeurs))].size
+        if n > self.N or any(v.size != n for v in valeurs.values()):
+            raise ValueError(f'Les colonnes doivent avoir la même taille, au plus {self.N}: '
+                             f'{ {nom: v.size for nom, v in valeurs.items()} }.')
+
+        if not self._libres:
+            self.attentes += 1
+            self._récupérer()
+        case: int = self._libres.popleft()
+        for nom, vue in self._cases[case].items():
+            vue[:n] = valeurs[nom]
+        self._envoyés.append((case, self._travailleurs.soumettre(_analyser, case, n)))
+        self.soumis += 1
+
+    def prêts(self) -> Iterator[Any]:
+        '''Résultats déjà terminés, dans l'ordre des blocs, sans attendre
+
+        Il y a un résultat par bloc soumis. Une analyse qui a échoué rend
+        l'exception qu'elle a levée, déjà journalisée et comptée dans
+        :py:attr:`erreurs`.
+        '''
+        while self._envoyés and self._envoyés[0][1].done():
+            self._récupérer()
+        while self._terminés:
+            self.rendus += 1
+            yield self._terminés.popleft()
+
+    def attendre(self) -> Iterator[Any]:
+        '''Tous les résultats restants, dans l'ordre des blocs'''
+        while self._envoyés:
+            self._récupérer()
+        yield from self.prêts()
+
+    def close(self):
+        '''Abandonne les blocs en attente, arrête les processus et libère la mémoire'''
+        self._travailleurs.fermer(annuler=True)
+        self._envoyés.clear()
+        self._cases.clear()
+        self._segment.close()
+        self._segment.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
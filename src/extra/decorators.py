@@ -1,66 +1,386 @@
+# -*- coding: utf-8 -*-
+
+'''Outils de cadence et d'exécution en parallèle
+
+Toutes les heures viennent de l'horloge monotone (:py:func:`time.monotonic_ns`),
+précise à la µs ou mieux, qui ne recule jamais, même si l'heure du système
+est changée. :py:func:`numpy.datetime64` ``('now')`` n'a qu'une précision
+d'une seconde, peu importe l'unité demandée.
+
+:py:func:`après_au_moins` ignore les appels trop rapprochés d'une fonction.
+
+:py:class:`Périodique` donne des échéances à fréquence fixe: la ``k``-ième
+échéance est toujours à ``début + k × période``, peu importe le temps pris
+par chaque tour. Une boucle qui attend plutôt ``période`` après chaque tour
+(délai fixe) prend du retard à chaque tour, et une boucle qui vérifie l'heure
+sans arrêt (attente active) occupe un cœur au complet. :py:meth:`Périodique.attendre`
+dort jusqu'à un peu avant l'échéance, puis n'attend activement que les
+dernières :py:data:`MARGE` secondes, pour corriger l'imprécision de
+:py:func:`time.sleep`.
+
+:py:class:`Travailleurs` garde des fils d'exécution ou des processus
+démarrés, pour y envoyer des appels (sauvegarde, analyse, ...) sans bloquer
+l'acquisition. :py:func:`en_parallèle` décore une fonction pour que chaque
+appel y soit envoyé, et :py:func:`fermer` les arrête proprement.
+'''
+
+import os
+import time
+import atexit
+import logging
+import importlib
+import threading
+import multiprocessing
+import concurrent.futures
+
+from contextlib import contextmanager
 from functools import wraps
-from multiprocessing import Process
 from typing import Callable, Any, Final
 import numpy as np
 
-def nanos():
-    return np.datetime64('now', 'ns')
-    
-def micros():
-    return np.datetime64('now', 'us')
+def nanos() -> int:
+    '''Horloge monotone, en ns'''
+    return time.monotonic_ns()
+
+def micros() -> int:
+    '''Horloge monotone, en µs'''
+    return time.monotonic_ns() // 1_000
+
+def millis() -> int:
+    '''Horloge monotone, en ms'''
+    return time.monotonic_ns() // 1_000_000
 
-def millis():
-    return np.datetime64('now', 'ms')
+def seconds() -> int:
+    '''Horloge monotone, en s'''
+    return time.monotonic_ns() // 1_000_000_000
 
-def seconds():
-    return np.datetime64('now', 's')
+DT: Final[float] = 10e-6 #: Délai minimal par défaut entre deux appels, en secondes
+MARGE: Final[float] = 200e-6
+'''Fin de l'attente faite activement par :py:meth:`Périodique.attendre`, en secondes
 
-__horloges: list[np.datetime64] = []
-__processus: list[Process] = []
+:py:func:`time.sleep` se réveille habituellement de 50 à 200 µs en retard.
+``0`` pour ne jamais attendre activement, au prix de cette imprécision.
+'''
 
-DT: Final[np.timedelta64] = np.timedelta64(10, 'us')
+TRAVAILLEURS: Final[int] = min(4, os.cpu_count() or 1) #: Nombre de travailleurs par défaut
+EN_COURS: Final[int] = 2 #: Nombre d'appels en cours par travailleur, par défaut
+
+ns: Final[float] = 1e-9 #: Conversion de ns à s
+
+
+class DélaiTropCourt(Exception):
+    '''Fonction appelée avant la fin de son délai minimal, voir :py:func:`après_au_moins`'''
+
+
+def _secondes(dt: float | np.timedelta64) -> float:
+    if isinstance(dt, np.timedelta64):
+        return dt / np.timedelta64(1, 's')
+    return float(dt)
 
 def après_au_moins(
-    dt: np.timedelta64 = DT,
-    horloge: Callable[[], np.datetime64] = nanos,
+    dt: float | np.timedelta64 = DT,
+    horloge: Callable[[], int] = nanos,
     signaler: bool = False
-                  ) -> Callable[Callable[..., Any], Callable[..., Any]]:
-    i: int = len(__horloges)
-    __horloges.append(horloge())
-    
+                  ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    '''Ignore les appels qui suivent le précédent de moins de ``dt``
+
+    Parameters
+    ----------
+    dt
+        Délai minimal entre deux appels exécutés, en secondes ou en
+        :py:class:`numpy.timedelta64`
+    horloge
+        Heure actuelle, en ns
+    signaler
+        Lever :py:exc:`DélaiTropCourt` plutôt que d'ignorer l'appel
+
+    Returns
+    -------
+    déco
+        Décorateur. La fonction décorée retourne ``None`` quand l'appel est
+        ignoré.
+    '''
+    délai: int = round(_secondes(dt) / ns)
+
     def déco(f: Callable[..., Any]) -> Callable[..., Any]:
-        
+        # Chaque fonction décorée a sa propre heure de dernier appel.
+        dernier: int | None = None
+
         @wraps(f)
         def f_décoré(*args, **kargs):
-            if horloge() >= __horloges[i] + dt:
-                __horloges[i] = horloge()
+            nonlocal dernier
+            maintenant: int = horloge()
+            if dernier is None or maintenant - dernier >= délai:
+                dernier = maintenant
                 return f(*args, **kargs)
             elif signaler:
-                desc = f'Il faut attendre {dt} pour exécuter {f}.'
+                desc = f'Il faut attendre {dt} pour exécuter {f.__name__}.'
                 raise DélaiTropCourt(desc)
-    
+
+        return f_décoré
+
     return déco
 
-def en_parallèle(f: Callable[..., Any]) -> Callable[..., Any]:
-    
-    @wraps(f)
-    def f_décoré(*args, **kargs):
-        proc: Process = Process(target=f, args=args, kargs=kargs)
-        __processus.append(proc)
-        
-        proc.start()
-        return proc
-    
-    return f_décoré
 
-@contextmanager
-def fermer(f: Callable[..., Any]) -> Callable[..., Any]:
-    
-    @wraps(f)
-    def f_décoré(*args, **kargs):
+class Périodique:
+    '''Échéances à fréquence fixe, sans dérive
+
+    La ``k``-ième échéance est à ``début + k × période``. Si un tour prend
+    plus d'une période, les échéances manquées sont sautées (et comptées
+    dans :py:attr:`manquées`) plutôt que rattrapées d'un coup: la cadence
+    reprend à la prochaine échéance, sans changer de phase.
+
+    .. code-block:: python
+
+        cadence = Périodique(FREQ)
+        while True:
+            cadence.attendre()
+            prendre_mesure(...)
+
+    Parameters
+    ----------
+    fréquence
+        Nombre d'échéances par seconde
+    marge
+        Fin de l'attente faite activement, en secondes, voir :py:data:`MARGE`
+    '''
+
+    def __init__(self, fréquence: float, marge: float = MARGE):
+        self.période: int = round(1 / fréquence / ns) #: Période, en ns
+        self.marge: int = round(marge / ns)
+        self.début: int = time.monotonic_ns() #: Heure de l'échéance 0, en ns
+        self.k: int = 0 #: Numéro de la prochaine échéance, la première est immédiate
+
+        self.tours: int = 0 #: Nombre d'échéances atteintes
+        self.manquées: int = 0 #: Nombre d'échéances sautées parce qu'un tour a pris trop de temps
+        self.retard: int = 0 #: Retard sur la dernière échéance atteinte, en ns
+        self.retard_max: int = 0 #: Plus grand retard, en ns
+
+    @property
+    def prochaine(self) -> int:
+        '''Heure de la prochaine échéance, en ns, sur :py:func:`time.monotonic_ns`'''
+        return self.début + self.k * self.période
+
+    def _avancer(self, maintenant: int):
+        # Prochaine échéance strictement après maintenant. Le retard est
+        # compté à partir de la dernière échéance passée.
+        k: int = (maintenant - self.début) // self.période + 1
+        self.manquées += k - 1 - self.k
+        self.retard = maintenant - (self.début + (k - 1) * self.période)
+        self.retard_max = max(self.retard_max, self.retard)
+        self.k = k
+        self.tours += 1
+
+    def due(self, maintenant: int | None = None) -> bool:
+        '''Vrai si l'échéance est passée, sans attendre
+
+        L'échéance est alors consommée: l'appel suivant attend la prochaine.
+        '''
+        if maintenant is None:
+            maintenant = time.monotonic_ns()
+        if maintenant < self.prochaine:
+            return False
+        self._avancer(maintenant)
+        return True
+
+    def attendre(self) -> int:
+        '''Dort jusqu'à la prochaine échéance
+
+        Returns
+        -------
+        retard
+            Retard du réveil sur l'échéance, en ns
+        '''
+        cible: int = self.prochaine
+        reste: int = cible - time.monotonic_ns() - self.marge
+        if reste > 0:
+            time.sleep(reste * ns)
+        # Attente active seulement pour la marge
+        while (maintenant := time.monotonic_ns()) < cible:
+            pass
+        self._avancer(maintenant)
+        return self.retard
+
+
+class Travailleurs:
+    '''Groupe de fils d'exécution ou de processus persistants
+
+    Les travailleurs sont démarrés une seule fois, puis réutilisés pour
+    chaque appel: démarrer un :py:class:`multiprocessing.Process` par appel
+    coûte des dizaines de ms, et chaque processus oublié devient un zombie.
+    Chaque appel retourne un :py:class:`concurrent.futures.Future`.
+
+    Au plus ``en_cours`` appels peuvent être soumis sans être terminés:
+    :py:meth:`soumettre` attend alors qu'une place se libère, et
+    :py:meth:`essayer` abandonne tout de suite. La file ne grandit donc pas
+    sans fin quand les travailleurs ne suivent pas.
+
+    Parameters
+    ----------
+    n
+        Nombre de travailleurs
+    processus
+        ``True`` pour des processus (calculs en Python, qui ne se partagent
+        pas le GIL), ``False`` pour des fils d'exécution (entrées-sorties,
+        numpy, qui libèrent le GIL). Avec des processus, les fonctions et
+        leurs arguments doivent pouvoir passer par :py:mod:`pickle`.
+    en_cours
+        Nombre maximal d'appels soumis mais pas terminés. Par défaut,
+        :py:data:`EN_COURS` par travailleur.
+    initializer, initargs
+        Fonction appelée une fois au démarrage de chaque travailleur, voir
+        :py:class:`concurrent.futures.ProcessPoolExecutor`
+    journaliser
+        Écrire les exceptions des appels avec :py:mod:`logging`, pour ne pas
+        les perdre quand personne ne lit le résultat du
+        :py:class:`~concurrent.futures.Future`
+    '''
+
+    def __init__(self,
+                 n: int = TRAVAILLEURS,
+                 processus: bool = False,
+                 en_cours: int | None = None,
+                 initializer: Callable[..., Any] | None = None,
+                 initargs: tuple = (),
+                 journaliser: bool = True):
+        self.n: int = n
+        self.processus: bool = processus
+        self.en_cours: int = en_cours or EN_COURS * n
+        self.journaliser: bool = journaliser
+        if processus:
+            # « spawn » partout, comme sous Windows et macOS: un processus
+            # « fork » hériterait des fils d'exécution du programme (lecteur,
+            # enregistreur) dans un état incohérent.
+            self._exécuteur = concurrent.futures.ProcessPoolExecutor(
+                n, mp_context=multiprocessing.get_context('spawn'),
+                initializer=initializer, initargs=initargs)
+        else:
+            self._exécuteur = concurrent.futures.ThreadPoolExecutor(
+                n, thread_name_prefix='Travailleurs',
+                initializer=initializer, initargs=initargs)
+        self._places = threading.BoundedSemaphore(self.en_cours)
+        self.fermé: bool = False
+
+        self.soumis: int = 0 #: Nombre d'appels soumis
+        self.refusés: int = 0 #: Nombre d'appels abandonnés par :py:meth:`essayer`
+        self.erreurs: int = 0 #: Nombre d'appels qui ont levé une exception
+
+    def _terminé(self, futur: concurrent.futures.Future):
+        self._places.release()
+        if not futur.cancelled() and futur.exception() is not None:
+            self.erreurs += 1
+            if self.journaliser:
+                logging.error('Erreur dans un travailleur.', exc_info=futur.exception())
+
+    def _soumettre(self, f: Callable[..., Any], args, kargs) -> concurrent.futures.Future:
         try:
-            yield f(*args, **kargs)
-        finally:
-            for p in __processus:
-                p.terminate()
-                p.close()
+            futur = self._exécuteur.submit(f, *args, **kargs)
+        except BaseException:
+            self._places.release()
+            raise
+        self.soumis += 1
+        futur.add_done_callback(self._terminé)
+        return futur
+
+    def soumettre(self, f: Callable[..., Any], /, *args, **kargs) -> concurrent.futures.Future:
+        '''Appelle ``f(*args, **kargs)`` dans un travailleur
+
+        Attend une place si ``en_cours`` appels sont déjà en cours.
+        '''
+        self._places.acquire()
+        return self._soumettre(f, args, kargs)
+
+    def essayer(self, f: Callable[..., Any], /, *args, **kargs) -> concurrent.futures.Future | None:
+        '''Comme :py:meth:`soumettre`, mais retourne ``None`` sans attendre s'il n'y a pas de place'''
+        if not self._places.acquire(blocking=False):
+            self.refusés += 1
+            return None
+        return self._soumettre(f, args, kargs)
+
+    def fermer(self, attendre: bool = True, annuler: bool = False):
+        '''Arrête les travailleurs
+
+        Parameters
+        ----------
+        attendre
+            Attendre la fin des appels en cours
+        annuler
+            Abandonner les appels qui n'ont pas encore commencé
+        '''
+        if not self.fermé:
+            self.fermé = True
+            self._exécuteur.shutdown(wait=attendre, cancel_futures=annuler)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+
+_défaut: Travailleurs | None = None
+
+def travailleurs() -> Travailleurs:
+    '''Groupe de fils d'exécution partagé par :py:func:`en_parallèle`, démarré au premier appel'''
+    global _défaut
+    if _défaut is None or _défaut.fermé:
+        _défaut = Travailleurs()
+        atexit.register(_défaut.fermer)
+    return _défaut
+
+def _appeler(module: str, nom: str, args: tuple, kargs: dict) -> Any:
+    # Dans un processus, la fonction est retrouvée par son nom: le nom du
+    # module désigne la version décorée, qu'on déballe.
+    f = importlib.import_module(module)
+    for partie in nom.split('.'):
+        f = getattr(f, partie)
+    while getattr(f, '_en_parallèle', False):
+        f = f.__wrapped__
+    return f(*args, **kargs)
+
+def en_parallèle(f: Callable[..., Any] | None = None, *,
+                 groupe: Travailleurs | None = None) -> Callable[..., Any]:
+    '''Exécute chaque appel de la fonction dans un travailleur
+
+    La fonction décorée retourne un :py:class:`concurrent.futures.Future`.
+    Sans ``groupe``, les appels passent par :py:func:`travailleurs`.
+
+    .. code-block:: python
+
+        @en_parallèle
+        def sauvegarder(res): ...
+
+        analyses = Travailleurs(4, processus=True)
+
+        @en_parallèle(groupe=analyses)
+        def analyser(bloc): ...
+
+        with fermer(analyses):
+            futur = analyser(bloc)
+            ...
+    '''
+    def déco(f: Callable[..., Any]) -> Callable[..., Any]:
+
+        @wraps(f)
+        def f_décoré(*args, **kargs) -> concurrent.futures.Future:
+            g = groupe or travailleurs()
+            if g.processus:
+                return g.soumettre(_appeler, f.__module__, f.__qualname__, args, kargs)
+            return g.soumettre(f, *args, **kargs)
+
+        f_décoré._en_parallèle = True
+        return f_décoré
+
+    return déco if f is None else déco(f)
+
+@contextmanager
+def fermer(*groupes: Travailleurs, annuler: bool = False):
+    '''Arrête les travailleurs à la sortie du bloc ``with``, même en cas d'erreur
+
+    Sans argument, arrête le groupe de :py:func:`travailleurs`.
+    '''
+    try:
+        yield groupes[0] if len(groupes) == 1 else groupes
+    finally:
+        for g in groupes or ([_défaut] if _défaut is not None else []):
+            g.fermer(annuler=annuler)
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+
+'''Enregistrement des mesures sur disque, colonne par colonne
+
+Un enregistrement est un dossier qui contient un fichier par colonne,
+``<nom>.col``. Chaque fichier commence par un petit entête de
+:py:data:`TAILLE_ENTÊTE` octets:
+
+.. code-block:: text
+
+    PHSCOL1\\0 | type (32 o, ex. '<f8') | nombre de valeurs (uint64) | réservé
+
+suivi des valeurs, à la suite, dans le type annoncé. Les fichiers ne font
+que grandir: une valeur écrite n'est jamais déplacée. Ils sont agrandis par
+morceaux de :py:data:`CROISSANCE` valeurs et écrits à travers
+:py:class:`numpy.memmap`: une écriture n'est qu'une copie en mémoire, et le
+système d'exploitation s'occupe du disque.
+
+:py:class:`Enregistreur` écrit dans son propre fil d'exécution, à partir
+d'une file bornée: :py:meth:`Enregistreur.ajouter` ne bloque jamais
+l'acquisition. Si le disque ne suit pas, les blocs les plus anciens sont
+abandonnés et comptés dans :py:attr:`Enregistreur.perdus`.
+
+:py:func:`lire` ouvre un enregistrement sans le charger en mémoire, même
+s'il fait plusieurs Go: seules les pages lues sont chargées.
+'''
+
+import os
+import struct
+import threading
+import logging
+
+from collections import deque
+from pathlib import Path
+from typing import Iterable, Mapping
+
+import numpy as np # <https://numpy.org/>
+import numpy.typing as npt
+
+MAGIQUE: bytes = b'PHSCOL1\0' #: Début de chaque fichier de colonne
+ENTÊTE = struct.Struct('<8s32sQ') #: Magique, type, nombre de valeurs
+TAILLE_ENTÊTE: int = 64 #: Taille de l'entête, en octets, pour aligner les valeurs
+CROISSANCE: int = 1 << 20 #: Nombre de valeurs ajoutées à un fichier quand il est plein
+PROFONDEUR: int = 1024 #: Nombre maximal de blocs en attente d'écriture
+SUFFIXE: str = '.col' #: Extension des fichiers de colonne
+
+
+class _Colonne:
+    '''Fichier d'une colonne, ouvert en écriture'''
+
+    def __init__(self, chemin: Path, dtype: npt.DTypeLike, croissance: int = CROISSANCE):
+        self.chemin: Path = chemin
+        self.dtype: np.dtype = np.dtype(dtype)
+        self.croissance: int = croissance
+        self.n: int = 0
+
+        if chemin.exists():
+            # On continue un enregistrement existant.
+            n, dtype = _lire_entête(chemin)
+            if dtype != self.dtype:
+                raise ValueError(f'{chemin} contient des {dtype}, pas des {self.dtype}.')
+            self.n = n
+        else:
+            with open(chemin, 'wb') as f:
+                f.write(self._entête())
+
+        self._carte: np.memmap | None = None
+        self._valeurs: np.ndarray | None = None
+        self._agrandir(self.n)
+
+    def _entête(self) -> bytes:
+        entête = ENTÊTE.pack(MAGIQUE, self.dtype.str.encode(), self.n)
+        return entête.ljust(TAILLE_ENTÊTE, b'\0')
+
+    @property
+    def capacité(self) -> int:
+        return 0 if self._valeurs is None else self._valeurs.size
+
+    def _agrandir(self, minimum: int):
+        capacité = max(self.capacité, self.croissance)
+        while capacité < minimum:
+            capacité *= 2
+        if self._carte is not None:
+            self._carte.flush()
+        self._carte = self._valeurs = None
+
+        taille = TAILLE_ENTÊTE + capacité * self.dtype.itemsize
+        with open(self.chemin, 'r+b') as f:
+            if os.fstat(f.fileno()).st_size < taille:
+                f.truncate(taille)
+        self._carte = np.memmap(self.chemin, dtype=np.uint8, mode='r+', shape=(taille,))
+        self._valeurs = self._carte[TAILLE_ENTÊTE:].view(self.dtype)
+        self._nombre = self._carte[ENTÊTE.size - 8:ENTÊTE.size].view('<u8')
+
+    def ajouter(self, valeurs: np.ndarray):
+        fin = self.n + valeurs.size
+        if fin > self.capacité:
+            self._agrandir(fin)
+        self._valeurs[self.n:fin] = valeurs
+        self.n = fin
+        # Le nombre est écrit après les valeurs: un lecteur ne voit jamais
+        # de valeurs qui ne sont pas encore écrites.
+        self._nombre[0] = fin
+
+    def fermer(self):
+        if self._carte is not None:
+            self._carte.flush()
+        self._carte = self._valeurs = self._nombre = None
+        # On retire l'espace réservé qui n'a pas servi.
+        with open(self.chemin, 'r+b') as f:
+            f.truncate(TAILLE_ENTÊTE + self.n * self.dtype.itemsize)
+
+
+def _lire_entête(chemin: Path) -> tuple[int, np.dtype]:
+    with open(chemin, 'rb') as f:
+        magique, dtype, n = ENTÊTE.unpack(f.read(ENTÊTE.size))
+    if magique != MAGIQUE:
+        raise ValueError(f'{chemin} n\'est pas un fichier de colonne.')
+    return n, np.dtype(dtype.rstrip(b'\0').decode())
+
+
+class Enregistreur(threading.Thread):
+    '''Fil d'exécution qui enregistre des blocs de mesures sur disque
+
+    Parameters
+    ----------
+    chemin
+        Dossier de l'enregistrement, créé au besoin. Un enregistrement
+        existant est continué.
+    colonnes
+        Noms des colonnes à enregistrer, avec leur type. Les autres
+        colonnes des blocs sont ignorées.
+    profondeur
+        Nombre maximal de blocs en attente d'écriture
+    '''
+
+    def __init__(self,
+                 chemin: str | os.PathLike,
+                 colonnes: Iterable[str] | Mapping[str, npt.DTypeLike],
+                 profondeur: int = PROFONDEUR):
+        super().__init__(name=f'Enregistreur({chemin})', daemon=True)
+        self.chemin: Path = Path(chemin)
+        self.chemin.mkdir(parents=True, exist_ok=True)
+        if not isinstance(colonnes, Mapping):
+            colonnes = {nom: np.float64 for nom in colonnes}
+        self._colonnes: dict[str, _Colonne] = {
+            nom: _Colonne(self.chemin / f'{nom}{SUFFIXE}', dtype)
+            for nom, dtype in colonnes.items()
+        }
+
+        self.profondeur: int = profondeur
+        self._file: deque[dict[str, np.ndarray]] = deque(maxlen=profondeur)
+        self._nouveau = threading.Event()
+        self._arrêt = threading.Event()
+
+        self.reçus: int = 0 #: Nombre de blocs reçus
+        self.perdus: int = 0 #: Nombre de blocs abandonnés parce que la file était pleine
+        self.écrits: int = 0 #: Nombre de blocs écrits
+
+    @property
+    def colonnes(self) -> tuple[str, ...]:
+        return tuple(self._colonnes)
+
+    def ajouter(self, mes: Mapping[str, npt.ArrayLike]):
+        '''Met un bloc en file pour l'écriture, sans jamais attendre
+
+        Les tableaux ne doivent plus être modifiés après l'appel: ils sont
+        écrits plus tard, sans copie.
+        '''
+        if len(self._file) == self.profondeur:
+            self.perdus += 1
+        self._file.append(mes)
+        self.reçus += 1
+        self._nouveau.set()
+
+    def _écrire(self, mes: Mapping[str, npt.ArrayLike]):
+        for nom, valeurs in mes.items():
+            if nom in self._colonnes:
+                self._colonnes[nom].ajouter(np.asarray(valeurs).ravel())
+        self.écrits += 1
+
+    def run(self):
+        try:
+            while True:
+                try:
+                    mes = self._file.popleft()
+                except IndexError:
+                    if self._arrêt.is_set():
+                        break
+                    self._nouveau.clear()
+                    if not self._file:
+                        self._nouveau.wait(0.1)
+                    continue
+                self._écrire(mes)
+        except BaseException:
+            logging.exception('Erreur d\'écriture dans %s.', self.chemin)
+            raise
+
+    def close(self):
+        '''Écrit les blocs en attente, puis ferme les fichiers'''
+        self._arrêt.set()
+        self._nouveau.set()
+        if self.is_alive():
+            self.join()
+        else:
+            # Jamais démarré: on écrit ce qui est en file ici.
+            while self._file:
+                self._écrire(self._file.popleft())
+        for colonne in self._colonnes.values():
+            colonne.fermer()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def lire(chemin: str | os.PathLike) -> dict[str, np.ndarray]:
+    '''Ouvre un enregistrement, sans le charger en mémoire
+
+    Peut être appelé pendant l'enregistrement: seules les valeurs déjà
+    écrites sont visibles.
+
+    Parameters
+    ----------
+    chemin
+        Dossier de l'enregistrement
+
+    Returns
+    -------
+    colonnes
+        ``{nom: valeurs}``, des :py:class:`numpy.memmap` en lecture seule
+    '''
+    colonnes: dict[str, np.memmap] = {}
+    for fichier in sorted(Path(chemin).glob(f'*{SUFFIXE}')):
+        n, dtype = _lire_entête(fichier)
+        if n == 0:
+            # :py:class:`numpy.memmap` refuse les régions vides.
+            colonnes[fichier.stem] = np.empty(0, dtype)
+            continue
+        colonnes[fichier.stem] = np.memmap(fichier, dtype=dtype, mode='r',
+                                           offset=TAILLE_ENTÊTE, shape=(n,))
+    return colonnes
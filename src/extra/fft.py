@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+
+'''Transformées de Fourier en continu
+
+``auditeur.fft`` recalculait, à chaque bloc, la fenêtre
+(:py:func:`scipy.signal.get_window`), les fréquences
+(:py:func:`numpy.fft.rfftfreq`) et une transformée complète. Ce module
+garde en mémoire ce qui ne change pas d'un bloc à l'autre, et offre deux
+façons de suivre le spectre d'un signal qui arrive en continu:
+
+- :py:class:`STFT`, une transformée de Fourier à court terme: une
+  transformée complète de ``N`` mesures toutes les ``saut`` nouvelles
+  mesures, avec un chevauchement de ``N - saut`` mesures;
+- :py:class:`DFTGlissante`, une transformée de Fourier discrète glissante:
+  le spectre est mis à jour à partir des mesures qui entrent dans la fenêtre
+  et de celles qui en sortent, pour un coût proportionnel au nombre de
+  nouvelles mesures fois le nombre de fréquences.
+
+Les résultats sont écrits dans des tableaux alloués une seule fois,
+:py:attr:`Spectre.fs` et :py:attr:`Spectre.spectre`.
+
+Pour plusieurs canaux mesurés en même temps (les photodiodes des clients),
+:py:func:`spectres` calcule toutes les transformées d'un seul appel à
+:py:func:`numpy.fft.rfft`.
+'''
+
+import abc
+import functools
+
+import numpy as np # <https://numpy.org/>
+import numpy.typing as npt
+
+from extra.tampon import Anneau
+
+CADRE: str = 'hann' #: Fenêtre utilisée par défaut
+
+# Fenêtres en somme de cosinus, w[n] = a0 - a1 cos(2πn/N), et leur effet
+# dans le domaine des fréquences: Y[k] = a0 X[k] - a1/2 (X[k-1] + X[k+1]).
+_COSINUS: dict[str, tuple[float, float]] = {
+    'boxcar': (1., 0.),
+    'hann': (0.5, 0.5),
+    'hamming': (0.54, 0.46),
+}
+
+
+@functools.lru_cache(maxsize=32)
+def fenêtre(cadre: str, N: int, dtype: npt.DTypeLike = np.float64) -> np.ndarray:
+    '''Fenêtre ``cadre`` de ``N`` points, calculée une seule fois
+
+    Voir :py:func:`scipy.signal.get_window`. Le tableau retourné est partagé
+    et en lecture seule.
+
+    Les fenêtres en somme de cosinus (:py:data:`_COSINUS`) sont calculées
+    directement, sans importer :py:mod:`scipy.signal`, qui prend à lui seul
+    plusieurs secondes au démarrage. Elles sont périodiques, comme celles
+    de :py:func:`scipy.signal.get_window`.
+    '''
+    if cadre in _COSINUS and N <= 1:
+        w = np.ones(N, dtype=dtype)
+    elif cadre in _COSINUS:
+        a0, a1 = _COSINUS[cadre]
+        w = (a0 - a1 * np.cos(2 * np.pi * np.arange(N) / N)).astype(dtype)
+    else:
+        import scipy.signal # <https://scipy.org/>
+        w = scipy.signal.get_window(cadre, N).astype(dtype)
+    w.flags.writeable = False
+    return w
+
+
+@functools.lru_cache(maxsize=32)
+def _fréquences_unitaires(N: int) -> np.ndarray:
+    # rfftfreq(N, d) == rfftfreq(N, 1) / d: seule la division dépend de d.
+    f = np.fft.rfftfreq(N)
+    f.flags.writeable = False
+    return f
+
+
+def fréquences(N: int, d: float) -> np.ndarray:
+    '''Équivalent à :py:func:`numpy.fft.rfftfreq`, sans recalculer les
+    fréquences pour chaque ``d``'''
+    return _fréquences_unitaires(N) / d
+
+
+def spectres(signaux: npt.ArrayLike,
+             cadre: str = CADRE,
+             dtype: npt.DTypeLike = np.float64) -> np.ndarray:
+    '''Amplitude des transformées de Fourier de plusieurs canaux d'un coup
+
+    Les canaux sont empilés en un tableau 2-D, multipliés par la même
+    fenêtre (:py:func:`fenêtre`) et transformés par un seul appel à
+    :py:func:`numpy.fft.rfft` sur le dernier axe, plutôt qu'un appel par
+    canal.
+
+    Parameters
+    ----------
+    signaux
+        Mesures, une ligne par canal et ``N`` colonnes
+    cadre
+        Nom de la fenêtre, voir :py:func:`scipy.signal.get_window`
+    dtype
+        Précision du calcul. :py:data:`numpy.float32` est amplement
+        suffisant pour des mesures sur 10 bits, et plus rapide quand il y a
+        beaucoup de canaux.
+
+    Returns
+    -------
+    ys
+        Amplitudes, une ligne par canal et ``N//2 + 1`` colonnes
+    '''
+    x = np.asarray(signaux, dtype=dtype)
+    x = x * fenêtre(cadre, x.shape[-1], dtype) # Nouveau tableau
+    return np.abs(np.fft.rfft(x, axis=-1))
+
+
+class Spectre(abc.ABC):
+    '''Interface commune des transformées en continu
+
+    Une sous-classe doit définir :py:meth:`mettre_à_jour`, sinon elle ne
+    peut pas être créée.
+
+    Parameters
+    ----------
+    N
+        Nombre de mesures dans chaque transformée
+    cadre
+        Nom de la fenêtre, voir :py:func:`scipy.signal.get_window`
+    '''
+
+    def __init__(self, N: int, cadre: str = CADRE):
+        self.N: int = N
+        self.cadre: str = cadre
+        self.d: float = np.nan #: Période d'échantillonage des dernières fréquences calculées
+        self.fs: np.ndarray = np.full(N//2 + 1, np.nan) #: Fréquences, en unités de 1/d
+        self.spectre: np.ndarray = np.full(N//2 + 1, np.nan) #: Amplitude du dernier spectre
+        self.trames: int = 0 #: Nombre de spectres calculés
+
+    def régler_d(self, d: float):
+        '''Met :py:attr:`fs` à jour pour une période d'échantillonage ``d``'''
+        if d != self.d:
+            self.d = d
+            np.divide(_fréquences_unitaires(self.N), d, out=self.fs)
+
+    @abc.abstractmethod
+    def mettre_à_jour(self, anneau: Anneau, d: float | None = None) -> int:
+        '''Tient compte des nouvelles mesures de ``anneau``
+
+        Parameters
+        ----------
+        anneau
+            Colonne de mesures, dont :py:attr:`~extra.tampon.Anneau.total`
+            indique combien sont nouvelles depuis le dernier appel
+        d
+            Période d'échantillonage, pour :py:attr:`fs`
+
+        Returns
+        -------
+        n
+            Nombre de nouveaux spectres calculés
+        '''
+
+
+class STFT(Spectre):
+    '''Transformée de Fourier à court terme, avec chevauchement
+
+    Un spectre est calculé pour chaque fenêtre de ``N`` mesures qui se
+    termine à un multiple de ``saut`` mesures.
+
+    Parameters
+    ----------
+    N
+        Nombre de mesures dans chaque transformée
+    cadre
+        Nom de la fenêtre, voir :py:func:`scipy.signal.get_window`
+    saut
+        Nombre de mesures entre deux spectres. ``N // 2`` donne un
+        chevauchement de 50%.
+    historique
+        Nombre de spectres gardés dans :py:attr:`spectrogramme`
+    '''
+
+    def __init__(self, N: int, cadre: str = CADRE, saut: int | None = None, historique: int = 64):
+        super().__init__(N, cadre)
+        self.saut: int = saut or N // 2
+        self._fin: int = N # Indice absolu de la fin de la prochaine fenêtre
+
+        #: Derniers spectres, en tampon circulaire: le spectre numéro ``i``
+        #: est à la ligne ``i % historique``.
+        self.spectrogramme: np.ndarray = np.zeros((historique, N//2 + 1))
+
+    @property
+    def chevauchement(self) -> int:
+        return self.N - self.saut
+
+    def mettre_à_jour(self, anneau: Anneau, d: float | None = None) -> int:
+        if d is not None:
+            self.régler_d(d)
+
+        w = fenêtre(self.cadre, self.N)
+        n: int = 0
+        while self._fin <= anneau.total:
+            retard: int = anneau.total - self._fin # Mesures arrivées après la fenêtre
+            if retard + self.N <= len(anneau):
+                x = anneau.dernier(retard + self.N)[:self.N]
+                x = (x - x.mean()) * w # Nouveau tableau, la vue n'est pas modifiée
+                np.abs(np.fft.rfft(x), out=self.spectre)
+                self.spectrogramme[self.trames % len(self.spectrogramme)] = self.spectre
+                self.trames += 1
+                n += 1
+            # Sinon, les mesures de cette fenêtre ont déjà été écrasées.
+            self._fin += self.saut
+
+        return n
+
+
+class DFTGlissante(Spectre):
+    '''Transformée de Fourier discrète glissante
+
+    Pour chaque mesure ``x_n`` qui entre dans la fenêtre, et ``x_{n-N}`` qui
+    en sort, chaque coefficient devient
+
+    .. math::
+
+        X_k \\leftarrow (X_k + x_n - x_{n-N}) e^{2\\pi i k/N}
+
+    Les ``m`` nouvelles mesures d'un bloc sont traitées d'un coup, par un
+    produit matrice-vecteur de taille ``(N/2+1) × m``. La fenêtre est
+    appliquée dans le domaine des fréquences, ce qui limite ``cadre`` aux
+    fenêtres en somme de cosinus (``'boxcar'``, ``'hann'``, ``'hamming'``).
+
+    Les erreurs d'arrondi s'accumulent: le spectre est recalculé au complet
+    toutes les ``resynchro`` mesures.
+
+    Parameters
+    ----------
+    N
+        Nombre de mesures dans la fenêtre
+    cadre
+        Nom de la fenêtre
+    resynchro
+        Nombre de mesures entre deux recalculs complets
+    '''
+
+    def __init__(self, N: int, cadre: str = CADRE, resynchro: int | None = None):
+        if cadre not in _COSINUS:
+            raise ValueError(f'Fenêtre {cadre!r} non supportée par la DFT glissante, '
+                             f'choisir parmi {list(_COSINUS)}.')
+        super().__init__(N, cadre)
+        self.resynchro: int = resynchro or 64 * N
+        self._X: np.ndarray = np.zeros(N//2 + 1, dtype=np.complex128)
+        self._vues: int | None = None # Indice absolu de la prochaine mesure à traiter
+        self._depuis_resynchro: int = 0
+
+        # Puissances de e^{2πik/N}, pour k les fréquences et r de 0 à N-1
+        k = np.arange(N//2 + 1)[:, None]
+        r = np.arange(N)[None, :]
+        self._rotations: np.ndarray = np.exp(2j * np.pi * k * r / N)
+        self._matrices: dict[int, np.ndarray] = {}
+
+    def _matrice(self, m: int) -> np.ndarray:
+        # Colonne j: rotation de e^{2πik/N} appliquée (m - j) fois.
+        # Les blocs ont presque toujours la même taille: une seule matrice
+        # est calculée en pratique.
+        if m not in self._matrices:
+            if len(self._matrices) > 8:
+                self._matrices.clear()
+            self._matrices[m] = self._rotations[:, (m - np.arange(m)) % self.N]
+        return self._matrices[m]
+
+    def _resynchroniser(self, anneau: Anneau):
+        self._X[:] = np.fft.rfft(anneau.dernier(self.N))
+        self._depuis_resynchro = 0
+
+    def mettre_à_jour(self, anneau: Anneau, d: float | None = None) -> int:
+        if d is not None:
+            self.régler_d(d)
+        if len(anneau) < self.N:
+            return 0
+
+        m: int = anneau.total - (self._vues if self._vues is not None else anneau.total)
+        if m == 0 and self._vues is not None:
+            return 0
+
+        if (self._vues is None
+                or m + self.N > len(anneau)
+                or self._depuis_resynchro + m >= self.resynchro):
+            # Premier appel, mesures perdues ou trop d'erreurs accumulées
+            self._resynchroniser(anneau)
+        else:
+            x = anneau.dernier(m + self.N)
+            delta = x[self.N:] - x[:m] # Entrées moins sorties
+            self._X *= self._rotations[:, m % self.N]
+            self._X += self._matrice(m) @ delta
+            self._depuis_resynchro += m
+
+        self._vues = anneau.total
+        self._fenêtrer()
+        self.trames += 1
+        return 1
+
+    def _fenêtrer(self):
+        a0, a1 = _COSINUS[self.cadre]
+        X = self._X.copy()
+        X[0] = 0 # Retirer la moyenne, comme x - x.mean()
+
+        # Y[k] = a0 X[k] - a1/2 (X[k-1] + X[k+1]), avec la symétrie
+        # X[-k] = conj(X[k]) d'un signal réel pour les bouts.
+        Y = a0 * X
+        if a1:
+            précédent = np.empty_like(X)
+            suivant = np.empty_like(X)
+            précédent[1:] = X[:-1]
+            précédent[0] = np.conj(X[1])
+            suivant[:-1] = X[1:]
+            suivant[-1] = np.conj(X[-2] if self.N % 2 == 0 else X[-1])
+            Y -= a1 / 2 * (précédent + suivant)
+        np.abs(Y, out=self.spectre)
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+'''Correspondance entre l'horloge du micro-contrôleur et celle de l'ordinateur
+
+Le micro-contrôleur date ses mesures avec ``micros()``: un compteur de 32
+bits, en µs, qui revient à zéro toutes les 71 minutes et dont le quartz
+dérive de quelques dizaines de ppm par rapport à l'horloge de l'ordinateur.
+:py:class:`Horloge` déroule ce compteur, et ajuste en continu un modèle
+linéaire
+
+.. math::
+
+    t_{hôte} = a + b \\, t_{appareil}
+
+par moindres carrés, à partir de l'heure d'arrivée de chaque bloc
+(:py:func:`time.monotonic_ns`). Chaque point ne coûte qu'une mise à jour de
+quelques moyennes: l'historique n'est jamais relu. Les anciens points sont
+oubliés progressivement, pour suivre une dérive qui change avec la
+température.
+
+L'écart type des résidus, :py:attr:`Horloge.gigue`, mesure l'irrégularité
+des arrivées, et :py:attr:`Horloge.dérive` l'écart entre les deux horloges.
+'''
+
+import math
+
+import numpy as np # <https://numpy.org/>
+import numpy.typing as npt
+
+MÉMOIRE: int = 1000 #: Nombre de points qui comptent pleinement dans le modèle
+BITS: int = 32 #: Taille du compteur du micro-contrôleur, en bits
+
+
+class Horloge:
+    '''Modèle de l'horloge du micro-contrôleur, ajusté en continu
+
+    Parameters
+    ----------
+    unité
+        Durée d'un coup du compteur du micro-contrôleur, en secondes
+    mémoire
+        Nombre de points qui comptent pleinement dans le modèle. Les plus
+        anciens ont un poids qui décroît exponentiellement.
+    bits
+        Taille du compteur, pour le dérouler quand il revient à zéro
+    '''
+
+    def __init__(self, unité: float = 1e-6, mémoire: int = MÉMOIRE, bits: int = BITS):
+        self.unité: float = unité
+        self.mémoire: int = mémoire
+        self.tour: int = 1 << bits #: Nombre de valeurs du compteur
+
+        self._dernier: int | None = None # Dernière valeur brute du compteur
+        self._décalage: int = 0 # Tours complets du compteur, en coups
+
+        self.n: int = 0 #: Nombre de points ajoutés
+        # Origines, pour garder la précision des float64
+        self._x0: float = 0.
+        self._y0: float = 0.
+        # Moyennes et covariances pondérées, centrées sur les origines
+        self._mx: float = 0.
+        self._my: float = 0.
+        self._cxx: float = 0.
+        self._cxy: float = 0.
+        self._cyy: float = 0.
+
+    def dérouler(self, ts: npt.ArrayLike) -> np.ndarray:
+        '''Compteur du micro-contrôleur, sans retour à zéro
+
+        Doit recevoir les valeurs dans l'ordre d'arrivée: l'état est gardé
+        d'un appel à l'autre.
+
+        Parameters
+        ----------
+        ts
+            Valeurs brutes du compteur
+
+        Returns
+        -------
+        ts
+            Valeurs croissantes, en coups depuis le démarrage
+        '''
+        ts = np.asarray(ts).astype(np.int64)
+        if ts.size == 0:
+            return ts
+        précédent = ts[0] if self._dernier is None else self._dernier
+        # Un recul de plus d'un demi-tour est un retour à zéro.
+        sauts = np.diff(ts, prepend=précédent) < -(self.tour // 2)
+        tours = np.cumsum(sauts) * self.tour + self._décalage
+        self._dernier = int(ts[-1])
+        self._décalage = int(tours[-1])
+        return ts + tours
+
+    @property
+    def dernier(self) -> int | None:
+        '''Dernière valeur déroulée par :py:meth:`dérouler`, ou ``None``'''
+        if self._dernier is None:
+            return None
+        return self._dernier + self._décalage
+
+    def ajouter(self, appareil: float, hôte: int):
+        '''Ajoute un point au modèle
+
+        Parameters
+        ----------
+        appareil
+            Valeur déroulée du compteur (voir :py:meth:`dérouler`)
+        hôte
+            Heure de l'ordinateur au même moment, en ns
+            (:py:func:`time.monotonic_ns`)
+        '''
+        x = float(appareil) * self.unité
+        y = hôte * 1e-9
+        if self.n == 0:
+            self._x0, self._y0 = x, y
+        x -= self._x0
+        y -= self._y0
+
+        self.n += 1
+        # Moyennes et covariances à poids exponentiels. Avec α = 1/n, ce sont
+        # exactement les moyennes et covariances de tous les points.
+        α = 1 / min(self.n, self.mémoire)
+        dx, dy = x - self._mx, y - self._my
+        self._mx += α * dx
+        self._my += α * dy
+        self._cxx = (1 - α) * (self._cxx + α * dx * dx)
+        self._cxy = (1 - α) * (self._cxy + α * dx * dy)
+        self._cyy = (1 - α) * (self._cyy + α * dy * dy)
+
+    @property
+    def échelle(self) -> float:
+        '''Secondes de l'ordinateur par seconde du micro-contrôleur, :math:`b`'''
+        if self.n < 2 or self._cxx == 0:
+            return 1.
+        return self._cxy / self._cxx
+
+    @property
+    def dérive(self) -> float:
+        '''Avance de l'horloge du micro-contrôleur, en ppm'''
+        return (1 / self.échelle - 1) * 1e6
+
+    @property
+    def gigue(self) -> float:
+        '''Écart type des heures d'arrivée autour du modèle, en secondes'''
+        if self.n < 3 or self._cxx == 0:
+            return math.nan
+        return math.sqrt(max(0., self._cyy - self._cxy**2 / self._cxx))
+
+    def convertir(self, appareil: npt.ArrayLike) -> np.ndarray:
+        '''Heures de l'ordinateur correspondant à des valeurs du compteur
+
+        Parameters
+        ----------
+        appareil
+            Valeurs déroulées du compteur
+
+        Returns
+        -------
+        t
+            Heures, en secondes sur l'horloge de :py:func:`time.monotonic_ns`
+        '''
+        x = np.asarray(appareil, dtype=np.float64) * self.unité - self._x0
+        # Droite qui passe par les moyennes, de pente échelle
+        return (x - self._mx) * self.échelle + self._my + self._y0
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+
+'''Lecture de la ligne série dans un fil d'exécution dédié
+
+Dans une boucle simple, la lecture, l'analyse et l'affichage se font un
+après l'autre. Pendant que :py:func:`matplotlib.pyplot.pause` ou une
+transformée de Fourier s'exécute, personne ne lit la ligne série: le tampon
+du système d'exploitation se remplit et des blocs sont perdus.
+
+:py:class:`LecteurSérie` possède l'objet :py:class:`serial.Serial` et le lit
+sans arrêt dans son propre :py:class:`threading.Thread`. Les blocs complets
+sont déposés dans une file bornée (:py:class:`collections.deque`). Si le
+programme principal prend trop de retard, les blocs les plus anciens sont
+abandonnés et comptés dans :py:attr:`LecteurSérie.perdus`. Un verrou couvre
+seulement le dépôt et le retrait d'un bloc, pour que la vérification de la
+file pleine et l'ajout forment une seule opération: le lecteur n'attend
+jamais après l'analyse ou l'affichage, seulement après un
+:py:meth:`~collections.deque.popleft`.
+
+:py:meth:`serial.Serial.read_until` lit un octet à la fois, soit un appel
+système par octet, et retourne un nouvel objet :py:class:`bytes` à chaque
+bloc. :py:class:`Découpeur` lit plutôt tout ce qui est disponible d'un coup,
+avec :py:meth:`~io.RawIOBase.readinto`, dans un tampon alloué une seule
+fois, et retourne des :py:class:`memoryview` des blocs complets, sans copie.
+'''
+
+import threading # <https://docs.python.org/3/library/threading.html>
+import time
+import logging
+
+from collections import deque
+
+import serial # <https://pyserial.readthedocs.io/en/latest/>
+
+from extra.parseur import SEP_BLOC
+
+PROFONDEUR: int = 64 #: Nombre maximal de blocs en attente dans la file
+TAILLE: int = 1 << 16 #: Taille initiale du tampon d'un :py:class:`Découpeur`, en octets
+TRANCHE: float = 0.1 #: Délai de lecture maximal de :py:meth:`Découpeur.attendre`, en secondes
+
+
+class Découpeur:
+    '''Découpe les blocs de la ligne série dans un tampon réutilisé
+
+    L'objet imite :py:meth:`serial.Serial.read_until`, et peut donc le
+    remplacer directement, mais retourne une :py:class:`memoryview` du
+    tampon interne plutôt qu'une copie. Elle n'est valide que jusqu'au
+    prochain appel de :py:meth:`read_until`: les valeurs doivent être
+    converties ou copiées avant.
+
+    Un bloc interrompu par le délai de lecture est gardé dans le tampon, et
+    complété à l'appel suivant. Le tampon double de taille si un bloc ne
+    rentre pas.
+
+    Parameters
+    ----------
+    ser
+        Objet de communication série, déjà ouvert
+    séparateur
+        Séquence qui termine chaque bloc
+    taille
+        Taille initiale du tampon, en octets
+    '''
+
+    def __init__(self,
+                 ser: serial.Serial,
+                 séparateur: bytes = SEP_BLOC,
+                 taille: int = TAILLE):
+        self.ser: serial.Serial = ser
+        self.séparateur: bytes = séparateur
+        self._tampon = bytearray(taille)
+        self._vue = memoryview(self._tampon)
+        self._début: int = 0 # Début du prochain bloc
+        self._fin: int = 0 # Fin des octets lus
+        self._cherché: int = 0 # Le séparateur n'est pas avant cette position
+
+        self.lectures: int = 0 #: Nombre d'appels à ``readinto``
+        self.octets: int = 0 #: Nombre d'octets lus
+        self.blocs: int = 0 #: Nombre de blocs retournés
+
+    @property
+    def port(self) -> str:
+        return self.ser.port
+
+    @property
+    def timeout(self) -> float | None:
+        return self.ser.timeout
+
+    @timeout.setter
+    def timeout(self, valeur: float | None):
+        self.ser.timeout = valeur
+
+    def _remplir(self) -> int:
+        if self._début == self._fin:
+            # Tampon vide: on repart du début, sans rien déplacer.
+            self._début = self._fin = self._cherché = 0
+        elif self._fin == len(self._tampon):
+            reste: int = self._fin - self._début
+            if self._début == 0:
+                # Un seul bloc occupe tout le tampon: on l'agrandit.
+                self._tampon = self._tampon + bytearray(len(self._tampon))
+                self._vue = memoryview(self._tampon)
+            else:
+                # On ramène le bloc incomplet au début du tampon.
+                self._tampon[:reste] = self._vue[self._début:self._fin]
+                self._cherché -= self._début
+                self._début, self._fin = 0, reste
+
+        # Tout ce qui est déjà arrivé, ou au moins un octet en attendant le
+        # délai de lecture.
+        n: int = min(max(1, self.ser.in_waiting), len(self._tampon) - self._fin)
+        lu: int = self.ser.readinto(self._vue[self._fin:self._fin + n]) or 0
+        self.lectures += 1
+        self.octets += lu
+        self._fin += lu
+        return lu
+
+    def read_until(self, expected: bytes | None = None, size: int | None = None) -> memoryview | bytes:
+        '''Prochain bloc complet, terminé par le séparateur
+
+        Le séparateur est fixé à la création; ``expected`` et ``size`` ne
+        sont acceptés que pour la compatibilité.
+
+        Returns
+        -------
+        bloc
+            Vue du bloc dans le tampon, ou ``b''`` si aucun bloc n'a été
+            complété avant le délai de lecture.
+        '''
+        while True:
+            i: int = self._tampon.find(self.séparateur, self._cherché, self._fin)
+            if i >= 0:
+                fin: int = i + len(self.séparateur)
+                bloc = self._vue[self._début:fin]
+                self._début = self._cherché = fin
+                self.blocs += 1
+                return bloc
+
+            # Le séparateur peut être coupé entre deux lectures.
+            self._cherché = max(self._début, self._fin - len(self.séparateur) + 1)
+            if not self._remplir():
+                return b''
+
+    def attendre(self, délai: float) -> memoryview | bytes:
+        '''Premier bloc complet arrivé en moins de ``délai`` secondes
+
+        À l'ouverture du port, la plupart des Arduino redémarrent, et ne
+        répondent qu'une à deux secondes plus tard. Plutôt que d'attendre un
+        temps fixe, on lit par tranches de :py:data:`TRANCHE` secondes,
+        jusqu'à ce qu'un bloc (par exemple la bannière) soit complet. Le
+        délai de lecture du port est ensuite remis comme avant.
+
+        Returns
+        -------
+        bloc
+            Comme :py:meth:`read_until`, ``b''`` si rien n'est arrivé à temps.
+        '''
+        limite: float = time.monotonic() + délai
+        timeout = self.timeout
+        try:
+            while (reste := limite - time.monotonic()) > 0:
+                self.timeout = min(reste, TRANCHE)
+                bloc = self.read_until()
+                if bloc:
+                    return bloc
+            return b''
+        finally:
+            self.timeout = timeout
+
+    def cancel_read(self):
+        if hasattr(self.ser, 'cancel_read'):
+            self.ser.cancel_read()
+
+    def close(self):
+        self.ser.close()
+
+
+class LecteurSérie(threading.Thread):
+    '''Fil d'exécution qui lit des blocs de la ligne série en continu
+
+    L'objet imite la partie de l'interface de :py:class:`serial.Serial`
+    utilisée par les programmes (:py:meth:`read_until`, :py:meth:`close`),
+    et peut donc le remplacer directement.
+
+    Les blocs sont découpés par un :py:class:`Découpeur`, puis copiés une
+    seule fois dans la file.
+
+    Parameters
+    ----------
+    ser
+        Objet de communication série, déjà ouvert, ou :py:class:`Découpeur`
+        qui a déjà commencé à le lire (par exemple la bannière). Il
+        appartient au lecteur à partir de maintenant.
+    profondeur
+        Nombre maximal de blocs en attente
+    séparateur
+        Séquence qui termine chaque bloc. Ignoré si ``ser`` est un
+        :py:class:`Découpeur`, qui a déjà le sien.
+    '''
+
+    def __init__(self,
+                 ser: serial.Serial | Découpeur,
+                 profondeur: int = PROFONDEUR,
+                 séparateur: bytes = SEP_BLOC):
+        super().__init__(name=f'LecteurSérie({ser.port})', daemon=True)
+        self.découpeur: Découpeur = ser if isinstance(ser, Découpeur) else Découpeur(ser, séparateur)
+        self.ser: serial.Serial = self.découpeur.ser
+        self.profondeur: int = profondeur
+        self.séparateur: bytes = self.découpeur.séparateur
+        self.timeout: float | None = ser.timeout
+
+        #: Paires ``(heure d'arrivée en ns, bloc)``
+        self._file: deque[tuple[int, bytes]] = deque(maxlen=profondeur)
+        #: Rend indivisibles la vérification de la file pleine et l'ajout
+        self._verrou = threading.Lock()
+        self._nouveau = threading.Event()
+        self._arrêt = threading.Event()
+        self._erreur: BaseException | None = None
+
+        self.reçus: int = 0 #: Nombre de blocs complets lus
+        self.perdus: int = 0 #: Nombre de blocs abandonnés parce que la file était pleine
+        self.octets: int = 0 #: Nombre d'octets lus
+        self.retard: int = 0 #: Temps d'attente dans la file du dernier bloc remis, en ns
+        self.retard_max: int = 0 #: Plus long temps d'attente dans la file, en ns
+        self.arrivée: int = 0 #: Heure de lecture du dernier bloc remis, en ns (:py:func:`time.monotonic_ns`)
+
+    @property
+    def en_attente(self) -> int:
+        '''Nombre de blocs dans la file'''
+        return len(self._file)
+
+    def run(self):
+        try:
+            while not self._arrêt.is_set():
+                # Le découpeur garde lui-même les blocs interrompus par le
+                # délai de lecture: ce qu'il retourne est toujours complet.
+                vue = self.découpeur.read_until()
+                if not vue:
+                    continue
+
+                # La vue sera écrasée par la prochaine lecture: on copie le
+                # bloc pour le programme principal.
+                bloc = bytes(vue)
+                self.octets += len(bloc)
+
+                # La file est bornée: le bloc le plus ancien est écrasé. Sans
+                # le verrou, le programme principal pourrait retirer un bloc
+                # entre la vérification et l'ajout, et un bloc livré serait
+                # compté comme perdu.
+                arrivée = time.monotonic_ns()
+                with self._verrou:
+                    if len(self._file) == self.profondeur:
+                        self.perdus += 1
+                    self._file.append((arrivée, bloc))
+                    self.reçus += 1
+                self._nouveau.set()
+        except BaseException as e:
+            # L'erreur est transmise au programme principal au prochain
+            # appel de :py:meth:`read_until`.
+            if not self._arrêt.is_set():
+                logging.exception('Erreur de lecture sur %s.', self.ser.port)
+                self._erreur = e
+                self._nouveau.set()
+
+    def prendre(self, timeout: float | None = None) -> bytes:
+        '''Retire le plus ancien bloc de la file
+
+        Parameters
+        ----------
+        timeout
+            Attente maximale en secondes. ``None`` pour attendre indéfiniment.
+
+        Returns
+        -------
+        bloc
+            Le bloc, terminé par le séparateur, ou ``b''`` si aucun bloc
+            n'est arrivé à temps.
+
+        Raises
+        ------
+        serial.SerialException
+            Ou toute autre erreur survenue dans le fil de lecture.
+        '''
+        limite = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                with self._verrou:
+                    arrivée, bloc = self._file.popleft()
+            except IndexError:
+                if self._erreur is not None:
+                    raise self._erreur
+                # On efface l'événement, puis on vérifie la file une dernière
+                # fois: un bloc arrivé entre temps a déjà remis l'événement.
+                self._nouveau.clear()
+                if self._file:
+                    continue
+                reste = None if limite is None else limite - time.monotonic()
+                if (reste is not None and reste <= 0) or not self._nouveau.wait(reste):
+                    return b''
+                continue
+
+            self.arrivée = arrivée
+            self.retard = time.monotonic_ns() - arrivée
+            self.retard_max = max(self.retard_max, self.retard)
+            return bloc
+
+    def read_until(self, expected: bytes = SEP_BLOC, size: int | None = None) -> bytes:
+        '''Équivalent de :py:meth:`serial.Serial.read_until`, servi depuis la file
+
+        Le séparateur est fixé à la création du lecteur; ``expected`` et
+        ``size`` ne sont acceptés que pour la compatibilité.
+        '''
+        return self.prendre(self.timeout)
+
+    def close(self):
+        '''Arrête le fil de lecture et ferme la ligne série'''
+        self._arrêt.set()
+        # Interrompre une lecture en cours plutôt que d'attendre le délai
+        if hasattr(self.ser, 'cancel_read'):
+            self.ser.cancel_read()
+        if self.is_alive():
+            self.join()
+        self.ser.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
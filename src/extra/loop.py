@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+'''Boucle principale qui sépare l'acquisition de l'affichage
+
+Dans une boucle simple, chaque mesure est suivie d'un affichage: plus on
+mesure vite, plus on affiche souvent, et l'affichage finit par ralentir
+l'acquisition. :py:class:`Ordonnanceur` appelle plutôt l'acquisition aussi
+souvent que les données arrivent (ou à une fréquence fixe, pour un client),
+et l'affichage à un nombre fixe d'images par seconde, à partir des
+dernières données reçues.
+
+Les deux débits sont mesurés séparément et rapportés régulièrement avec
+:py:mod:`logging`, en même temps que les sondes de :py:mod:`extra.sondes`,
+si elles sont actives.
+
+Sans affichage (sur un serveur, par exemple), la boucle ne fait que
+l'acquisition, et s'arrête proprement à la réception de ``SIGINT`` (^C) ou
+``SIGTERM`` (``kill``, ``systemctl stop``) grâce à :py:class:`Arrêt`.
+'''
+
+import time
+import math
+import signal
+import logging
+
+from typing import Callable
+
+from extra.sondes import sondes
+from extra.decorators import Périodique, ns
+
+FPS: float = 30. #: Nombre d'images par seconde par défaut
+RAPPORT: float = 5. #: Intervalle entre les rapports de débit, en secondes
+ATTENTE: float = 0.1 #: Attente maximale de l'acquisition entre deux vérifications de ``continuer``, en secondes
+
+
+class Arrêt:
+    '''Demande d'arrêt reçue par signal
+
+    À utiliser avec ``with``: les gestionnaires de signaux sont installés à
+    l'entrée et remis comme avant à la sortie. Le premier signal ne fait que
+    lever :py:attr:`demandé`, pour que la boucle termine son tour et que le
+    programme passe par ses procédures de fin. Un deuxième signal lève
+    :py:exc:`KeyboardInterrupt`, si le programme ne répond plus.
+
+    .. code-block:: python
+
+        with Arrêt() as arrêt:
+            ordonnanceur.exécuter(acquérir, continuer=lambda: not arrêt.demandé)
+
+    Parameters
+    ----------
+    signaux
+        Signaux à intercepter
+    '''
+
+    def __init__(self, signaux: tuple[signal.Signals, ...] = (signal.SIGINT, signal.SIGTERM)):
+        self.signaux: tuple[signal.Signals, ...] = signaux
+        self.reçu: signal.Signals | None = None #: Premier signal reçu
+        self._anciens: dict = {}
+
+    @property
+    def demandé(self) -> bool:
+        return self.reçu is not None
+
+    def _recevoir(self, numéro: int, cadre):
+        if self.reçu is not None:
+            raise KeyboardInterrupt
+        self.reçu = signal.Signals(numéro)
+        logging.warning('%s reçu, arrêt en cours.', self.reçu.name)
+
+    def __enter__(self):
+        for s in self.signaux:
+            self._anciens[s] = signal.signal(s, self._recevoir)
+        return self
+
+    def __exit__(self, *exc):
+        for s, ancien in self._anciens.items():
+            signal.signal(s, ancien)
+        self._anciens.clear()
+
+
+class Ordonnanceur:
+    '''Appelle l'acquisition et l'affichage, chacun à son rythme
+
+    Parameters
+    ----------
+    fps
+        Nombre d'images affichées par seconde. ``None`` ou ``0`` sans
+        affichage.
+    fréquence
+        Fréquence des appels à l'acquisition, en Hz. ``None`` pour l'appeler
+        dès qu'elle a terminé, quand les données arrivent d'elles-mêmes
+        (annonceur).
+    rapport
+        Intervalle entre les rapports de débit, en secondes. ``None`` pour
+        ne pas en faire.
+    '''
+
+    def __init__(self,
+                 fps: float | None = FPS,
+                 fréquence: float | None = None,
+                 rapport: float | None = RAPPORT):
+        self.période_image: float = 1 / fps if fps else math.inf
+        self.période_mesure: float = 0 if fréquence is None else 1 / fréquence
+        self.rapport: float | None = rapport
+
+        self.appels: int = 0 #: Nombre d'appels à l'acquisition
+        self.reçus: int = 0 #: Nombre de valeurs reçues, selon l'acquisition
+        self.images: int = 0 #: Nombre d'images affichées
+
+        self.débit_acquisition: float = 0. #: Valeurs reçues par seconde, au dernier rapport
+        self.débit_affichage: float = 0. #: Images par seconde, au dernier rapport
+
+    def _rapporter(self, maintenant: float):
+        durée = maintenant - self._début_rapport
+        self.débit_acquisition = (self.reçus - self._reçus_rapport) / durée
+        self.débit_affichage = (self.images - self._images_rapport) / durée
+        logging.info('Acquisition: %.1f valeurs/s, affichage: %.1f images/s',
+                     self.débit_acquisition, self.débit_affichage)
+
+        self._début_rapport = maintenant
+        self._reçus_rapport = self.reçus
+        self._images_rapport = self.images
+
+        sondes.rapporter()
+
+    def exécuter(self,
+                 acquérir: Callable[[float], int],
+                 afficher: Callable[[], None] | None = None,
+                 continuer: Callable[[], bool] = lambda: True):
+        '''Boucle jusqu'à ce que ``continuer`` retourne faux
+
+        Parameters
+        ----------
+        acquérir
+            Reçoit le temps maximal, en secondes, qu'elle peut passer à
+            attendre des données avant la prochaine image, au plus
+            :py:data:`ATTENTE`. Retourne le nombre de valeurs reçues.
+        afficher
+            Affiche les dernières données reçues. ``None`` pour ne faire que
+            l'acquisition.
+        continuer
+            Vérifiée à chaque tour de boucle
+        '''
+        maintenant = time.monotonic()
+        prochaine_image: float = maintenant if afficher is not None else math.inf
+        #: Les mesures suivent des échéances fixes, sans dérive, même si
+        #: chaque tour prend un temps différent.
+        #: Voir :py:class:`extra.decorators.Périodique`.
+        self.cadence: Périodique | None = None
+        if self.période_mesure:
+            self.cadence = Périodique(1 / self.période_mesure)
+        self._début_rapport: float = maintenant
+        self._reçus_rapport: int = self.reçus
+        self._images_rapport: int = self.images
+
+        while continuer():
+            maintenant = time.monotonic()
+            début_tour: int = time.perf_counter_ns() if sondes.actif else 0
+
+            if afficher is not None and maintenant >= prochaine_image:
+                afficher()
+                self.images += 1
+                # Si l'affichage a pris du retard, on ne rattrape pas les
+                # images manquées: on repart de maintenant.
+                prochaine_image = max(prochaine_image + self.période_image,
+                                      maintenant)
+
+            # L'attente est bornée même sans affichage, pour que
+            # ``continuer`` soit vérifiée régulièrement.
+            limite: float = min(prochaine_image, maintenant + ATTENTE)
+            mesurer: bool = True
+            if self.cadence is not None and not self.cadence.due():
+                if self.cadence.prochaine * ns <= limite:
+                    # Réveil précis à l'échéance
+                    self.cadence.attendre()
+                else:
+                    time.sleep(max(0, limite - time.monotonic()))
+                    mesurer = False
+
+            if mesurer:
+                délai: float = min(prochaine_image - time.monotonic(), ATTENTE)
+                self.reçus += acquérir(max(0, délai))
+                self.appels += 1
+
+            if sondes.actif and début_tour:
+                sondes.durée('tour', time.perf_counter_ns() - début_tour)
+
+            if self.rapport and maintenant - self._début_rapport >= self.rapport:
+                self._rapporter(maintenant)
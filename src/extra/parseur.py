@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+'''Interprétation des blocs de données envoyés par l'annonceur
+
+Le programme d'annonceur envoie des blocs de la forme
+
+.. code-block:: text
+
+    ts=[0, 100, 200, ...]
+    A0=[512, 530, 541, ...]
+    F=[12, 3, 0, ...]
+
+terminés par une ligne vide. Chaque ligne a la même syntaxe qu'une liste
+Python. Plutôt que de convertir chaque valeur une à une en Python,
+:py:func:`analyser_bloc` confie toute une ligne à :py:func:`numpy.fromstring`,
+qui fait la conversion en C, en une seule passe.
+'''
+
+import numpy as np # <https://numpy.org/>
+import numpy.typing as npt
+
+from typing import Mapping
+
+DELIM_VAL = b'[]\r\n '
+'''Caractères délimitant les listes de valeurs dans la communication avec le micro-contrôleur
+
+Le programme d'annonceur sur le micro-contrôleur envoie les données avec la
+même syntaxe qu'une liste Python. On peut donc retirer les caractères de
+:py:data:`DELIM_VAL` des bouts de la chaîne avec :py:meth:`bytes.strip`.
+'''
+
+SEP_NOM = b'='
+'''Séparateur du nom de variable ou colonne et de la liste de données
+
+Le nom de la variable ou colonne lue sur la ligne série est séparé des données par un signe ``=``.
+'''
+
+SEP_VAL = b','
+'''Séparateur de valeurs
+
+Les valeurs dans la liste sont séparées par des virgules.
+'''
+
+SEP_LIGNE = b'\r\n'
+'''Séparateur de ligne du micro-contrôleur
+
+Arduino utilise la séquence ``\\r\\n`` pour finir les lignes, au lieu du plus
+commun ``\\n``. Il faut donc régler nos séparateurs en conséquence.
+'''
+
+SEP_BLOC = SEP_LIGNE*2
+'''Séparateur de blocs de données
+
+Les blocs de données sont séparés par une ligne vide, soit deux saut de ligne/retours chariots.
+'''
+
+
+class BlocInvalide(ValueError):
+    '''Le bloc reçu ne respecte pas le format de l'annonceur'''
+
+
+def analyser_ligne(ligne: bytes,
+                   dtype: npt.DTypeLike | Mapping[str, npt.DTypeLike] = np.float64) -> tuple[str, np.ndarray]:
+    '''Convertit une ligne ``nom=[v0, v1, ...]`` en nom et tableau de valeurs
+
+    Parameters
+    ----------
+    ligne
+        Ligne reçue, avec ou sans les caractères de fin de ligne
+    dtype
+        Type des valeurs retournées, ou type de chaque colonne
+        ``{nom: dtype}`` (``float64`` pour les colonnes absentes)
+
+    Returns
+    -------
+    nom
+        Nom de la colonne
+    valeurs
+        Valeurs converties
+
+    Raises
+    ------
+    BlocInvalide
+        Si la ligne n'a pas de :py:data:`SEP_NOM`, ou contient autre chose
+        que des nombres.
+    '''
+    nom, sep, valeurs = ligne.partition(SEP_NOM)
+    if not sep:
+        raise BlocInvalide(f'Pas de {SEP_NOM!r} présent dans {ligne[:40]!r}')
+    nom = nom.strip().decode('utf-8')
+    if isinstance(dtype, Mapping):
+        dtype = dtype.get(nom, np.float64)
+
+    valeurs = valeurs.strip(DELIM_VAL)
+    try:
+        # :py:func:`numpy.fromstring` en mode texte (avec ``sep``) convertit
+        # toute la ligne en C. Les espaces autour des virgules sont ignorés.
+        converties = np.fromstring(valeurs, dtype=np.float64, sep=SEP_VAL.decode())
+    except ValueError as e:
+        raise BlocInvalide(f'Valeurs invalides dans {ligne[:40]!r}') from e
+
+    if dtype != np.float64:
+        converties = converties.astype(dtype)
+
+    return nom, converties
+
+
+def analyser_bloc(bloc: bytes | memoryview,
+                  dtype: npt.DTypeLike | Mapping[str, npt.DTypeLike] = np.float64) -> dict[str, np.ndarray]:
+    '''Convertit un bloc complet en dictionnaire ``{nom: valeurs}``
+
+    Le bloc est validé en entier avant d'être retourné: si une seule ligne
+    est invalide, aucune donnée n'est retournée.
+
+    Parameters
+    ----------
+    bloc
+        Bloc reçu, terminé ou non par :py:data:`SEP_BLOC`. Une
+        :py:class:`memoryview` (voir :py:class:`extra.lecteur.Découpeur`) est
+        copiée une seule fois, puisque :py:func:`numpy.fromstring` n'accepte
+        que des :py:class:`bytes`.
+    dtype
+        Type des valeurs retournées, voir :py:func:`analyser_ligne`
+
+    Raises
+    ------
+    BlocInvalide
+        Si le bloc est vide ou qu'une ligne est invalide.
+    '''
+    if isinstance(bloc, memoryview):
+        bloc = bloc.tobytes()
+    bloc = bloc.strip()
+    if not bloc:
+        raise BlocInvalide('Bloc vide')
+
+    return dict(analyser_ligne(l, dtype) for l in bloc.split(SEP_LIGNE))
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+
+'''Pyramide min/max des mesures, pour un affichage à résolution adaptée
+
+Une courbe de :py:mod:`matplotlib` coûte à dessiner en proportion de son
+nombre de points, même quand des milliers de points tombent dans la même
+colonne de pixels. :py:class:`Pyramide` garde, à côté des mesures, des
+versions réduites de chaque colonne: au niveau ``k``, chaque case résume
+:py:data:`FACTEUR` ``** k`` mesures par leur minimum et leur maximum.
+
+Pour afficher une fenêtre sur un axe de ``largeur`` pixels, on choisit le
+niveau le plus fin qui a au plus ``largeur`` cases dans la fenêtre, et on
+dessine le minimum puis le maximum de chaque case: au plus ``2 × largeur``
+points, peu importe la durée de l'acquisition ou la fréquence
+d'échantillonage. Les pics restent visibles, contrairement à un
+sous-échantillonage qui ne garderait qu'une mesure sur ``n``.
+
+Les niveaux sont mis à jour à partir des nouvelles mesures seulement:
+chaque mesure n'est lue qu'une fois pour le niveau 1, et chaque case d'un
+niveau une fois pour le suivant. L'analyse continue d'utiliser les mesures
+complètes, dans le :py:class:`extra.tampon.TamponCirculaire` d'origine.
+'''
+
+import numpy as np # <https://numpy.org/>
+
+from typing import Iterable
+
+from extra.tampon import TamponCirculaire
+
+FACTEUR: int = 4 #: Nombre de cases d'un niveau résumées par une case du niveau suivant
+NIVEAUX: int = 16 #: Nombre maximal de niveaux, au-delà des mesures elles-mêmes
+
+
+class Pyramide:
+    '''Niveaux min/max des colonnes d'un :py:class:`extra.tampon.TamponCirculaire`
+
+    Chaque niveau est lui-même un :py:class:`extra.tampon.TamponCirculaire`,
+    avec la colonne de temps (le temps de la première mesure de chaque case)
+    et les colonnes ``<nom>_min`` et ``<nom>_max`` de chaque colonne de
+    valeurs. Les niveaux gardent la même durée que les mesures: si les
+    mesures ont une capacité fixe, chaque niveau a :py:data:`FACTEUR` fois
+    moins de cases que le précédent.
+
+    Parameters
+    ----------
+    res
+        Mesures complètes. Le temps doit être croissant.
+    temps
+        Nom de la colonne de temps
+    valeurs
+        Colonnes à résumer. Par défaut, toutes les autres.
+    facteur
+        Voir :py:data:`FACTEUR`
+    '''
+
+    def __init__(self,
+                 res: TamponCirculaire,
+                 temps: str = 't',
+                 valeurs: Iterable[str] | None = None,
+                 facteur: int = FACTEUR):
+        if facteur < 2:
+            raise ValueError(f'Le facteur doit être au moins 2, pas {facteur}.')
+
+        self.res: TamponCirculaire = res
+        self.temps: str = temps
+        self.valeurs: tuple[str, ...] = tuple(c for c in res.colonnes if c != temps) if valeurs is None else tuple(valeurs)
+        self.facteur: int = facteur
+
+        self.niveaux: list[TamponCirculaire] = [] #: Niveaux 1, 2, ..., créés au besoin
+        # Nombre de valeurs de chaque niveau (0 pour les mesures) déjà
+        # résumées dans le niveau suivant, en comptant depuis le début.
+        self._résumés: list[int] = [0]
+        self._vus: int = 0 # Nombre de mesures vues depuis le début
+
+    def _nouveau_niveau(self) -> TamponCirculaire:
+        # Les colonnes peuvent avoir des capacités différentes: celle du
+        # temps donne la durée gardée.
+        capacité = self.res[self.temps].capacité
+        if capacité is not None:
+            # Plus les cases qui attendent d'être résumées au niveau suivant
+            capacité = capacité // self.facteur ** (len(self.niveaux) + 1) + self.facteur
+        colonnes = {self.temps: self.res[self.temps].dtype}
+        for nom in self.valeurs:
+            dtype = self.res[nom].dtype
+            colonnes |= {f'{nom}_min': dtype, f'{nom}_max': dtype}
+        niveau = TamponCirculaire(capacité, colonnes)
+        self.niveaux.append(niveau)
+        self._résumés.append(0)
+        return niveau
+
+    def _total(self, k: int) -> int:
+        '''Nombre de valeurs écrites au niveau ``k`` depuis le début'''
+        if k == 0:
+            return self._vus
+        return self.niveaux[k-1][self.temps].total
+
+    def _colonnes(self, k: int, n: int) -> tuple[np.ndarray, dict[str, tuple[np.ndarray, np.ndarray]]]:
+        '''``n`` dernières valeurs du niveau ``k``: temps, et ``{nom: (min, max)}``'''
+        if k == 0:
+            # Une mesure est son propre minimum et son propre maximum.
+            t = self.res.dernier(self.temps, n)
+            return t, {nom: (self.res.dernier(nom, n),) * 2 for nom in self.valeurs}
+        niveau = self.niveaux[k-1]
+        t = niveau.dernier(self.temps, n)
+        return t, {nom: (niveau.dernier(f'{nom}_min', n), niveau.dernier(f'{nom}_max', n))
+                   for nom in self.valeurs}
+
+    def vider(self):
+        '''Oublie tous les niveaux'''
+        self.niveaux.clear()
+        self._résumés = [0]
+        self._vus = 0
+
+    def mettre_à_jour(self):
+        '''Résume les mesures ajoutées depuis le dernier appel
+
+        Les cases incomplètes attendent les prochaines mesures. Si les
+        mesures ont fait plus d'un tour de leur tampon depuis le dernier
+        appel, les plus anciennes sont perdues et ne sont pas résumées.
+        '''
+        total = min(self.res[c].total for c in (self.temps, *self.valeurs))
+        if total < self._vus:
+            # Les mesures ont été vidées.
+            self.vider()
+        # Les mesures plus anciennes que le tampon sont perdues.
+        self._résumés[0] = max(self._résumés[0], total - len(self.res))
+        self._vus = total
+
+        f = self.facteur
+        for k in range(NIVEAUX):
+            reste = self._total(k) - self._résumés[k]
+            cases = reste // f
+            if not cases:
+                break
+            if k == len(self.niveaux):
+                self._nouveau_niveau()
+
+            t, colonnes = self._colonnes(k, reste)
+            suivant = self.niveaux[k]
+            suivant.ajouter(self.temps, t[:cases * f:f])
+            for nom, (bas, haut) in colonnes.items():
+                suivant.ajouter(f'{nom}_min', bas[:cases * f].reshape(cases, f).min(axis=1))
+                suivant.ajouter(f'{nom}_max', haut[:cases * f].reshape(cases, f).max(axis=1))
+            self._résumés[k] += cases * f
+
+    def vue(self, nom: str, largeur: int, début: float | None = None) -> tuple[np.ndarray, np.ndarray]:
+        '''Points à dessiner pour la colonne ``nom``, à partir de ``début``
+
+        Met d'abord la pyramide à jour. Si la fenêtre a au plus
+        ``2 × largeur`` mesures, elles sont retournées telles quelles.
+        Sinon, chaque case du niveau choisi donne deux points, son minimum
+        puis son maximum, au temps de sa première mesure. Les mesures trop
+        récentes pour former une case complète sont ajoutées à la fin, à
+        partir des niveaux plus fins.
+
+        Parameters
+        ----------
+        nom
+            Colonne de valeurs
+        largeur
+            Largeur de l'axe, en pixels
+        début
+            Temps de la première mesure à afficher. ``None`` pour toutes les
+            mesures gardées.
+
+        Returns
+        -------
+        t, v
+            Temps et valeurs des points, au plus environ ``2 × largeur``
+        '''
+        self.mettre_à_jour()
+        largeur = max(int(largeur), 1)
+
+        for k in range(len(self.niveaux) + 1):
+            t = self.res.dernier(self.temps) if k == 0 else self.niveaux[k-1].dernier(self.temps)
+            n: int = t.size if début is None else t.size - int(np.searchsorted(t, début))
+            if k == 0 and n <= 2 * largeur:
+                return t[t.size-n:], self.res.dernier(nom, n)
+            if k > 0 and (n <= largeur or k == len(self.niveaux)):
+                break
+        else:
+            # Pas encore de niveau
+            return t[t.size-n:], self.res.dernier(nom, n)
+
+        # Cases du niveau k, puis ce qui n'est pas encore résumé aux niveaux
+        # k-1, ..., 0, du plus ancien au plus récent.
+        morceaux = [(k, n)] + [(j, self._total(j) - self._résumés[j]) for j in range(k-1, -1, -1)]
+        ts, vs = [], []
+        for j, m in morceaux:
+            if m <= 0:
+                continue
+            t, colonnes = self._colonnes(j, m)
+            bas, haut = colonnes[nom]
+            if j == 0:
+                ts.append(t)
+                vs.append(bas)
+            else:
+                ts.append(np.repeat(t, 2))
+                vs.append(np.stack((bas, haut), axis=1).ravel())
+        return np.concatenate(ts), np.concatenate(vs)
@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+
+'''Relecture d'un flux de l'annonceur, sans micro-contrôleur ni port série
+
+:py:class:`Relecture` imite la partie de l'interface de
+:py:class:`serial.Serial` utilisée par les programmes (:py:meth:`~Relecture.read`,
+:py:meth:`~Relecture.readinto`, :py:meth:`~Relecture.read_until`,
+:py:meth:`~Relecture.readline`, :py:attr:`~Relecture.in_waiting`,
+:py:meth:`~Relecture.write`, :py:meth:`~Relecture.close`), et peut donc le
+remplacer directement, y compris sous :py:class:`extra.lecteur.Découpeur` et
+:py:class:`extra.lecteur.LecteurSérie`. Contrairement à
+:py:class:`extra.simulateur.PseudoAnnonceur`, tout se passe dans le même
+fil d'exécution, sans pseudo-terminal: la relecture fonctionne sous tous les
+systèmes d'exploitation, et ne coûte presque rien au programme mesuré.
+
+Les blocs viennent:
+
+- d'un générateur synthétique au format de l'annonceur
+  (:py:meth:`Relecture.synthétique`);
+- d'une capture des octets reçus sur le port série, par exemple avec
+  ``cat /dev/ttyACM0 > capture.bin`` (:py:meth:`Relecture.capture`);
+- d'un enregistrement de :py:class:`extra.enregistreur.Enregistreur`
+  (:py:meth:`Relecture.enregistrement`).
+
+Chaque bloc dure ``N × d`` sur le micro-contrôleur, selon la bannière. Avec
+``vitesse=1``, les blocs deviennent disponibles au même rythme qu'en
+direct; avec ``vitesse=10``, dix fois plus vite; avec ``vitesse=None``,
+aussi vite que le programme les lit, ce qui mesure le débit maximal qu'il
+peut soutenir.
+
+.. code-block:: python
+
+    ser = Relecture.synthétique(vitesse=None, blocs=1000)
+    ser.read_until(SEP_BLOC) # Bannière
+    while bloc := ser.read_until(SEP_BLOC):
+        ...
+'''
+
+import itertools
+import os
+import threading
+import time
+
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np # <https://numpy.org/>
+
+from extra.parseur import SEP_BLOC
+from extra.trames import (TEXTE, BINAIRE, CANAUX, encoder_bloc, paramètres, protocole as lire_protocole,
+                          séparateur)
+from extra.simulateur import (N_DÉFAUT, PÉRIODE, TYPES_BINAIRES, bannière, bloc, bloc_binaire,
+                              encoder_texte, sans_temps, temps)
+from extra.enregistreur import lire
+
+us: float = 1e-6 # Facteur de conversion de µs → s
+TAMPON: int = 1 << 16
+'''Octets rendus disponibles d'avance quand la relecture n'est pas cadencée
+
+Comme le tampon du système d'exploitation: le lecteur trouve toujours
+quelque chose à lire, sans que tout le flux soit produit d'un coup.
+'''
+LF: bytes = b'\n' #: Séparateur par défaut de :py:meth:`serial.Serial.read_until`
+
+
+class Relecture:
+    '''Faux port série qui rejoue un flux de blocs de l'annonceur
+
+    Parameters
+    ----------
+    blocs
+        Blocs complets, avec leur séparateur, à commencer par la bannière
+    vitesse
+        Facteur d'accélération par rapport au temps réel. ``None`` pour
+        rendre les blocs disponibles aussi vite qu'ils sont lus.
+    durée
+        Durée d'un bloc sur le micro-contrôleur, en secondes. Par défaut,
+        ``N × d`` selon la bannière.
+    timeout
+        Attente maximale d'une lecture, en secondes, comme pour
+        :py:class:`serial.Serial`
+    port
+        Nom du port, pour les messages
+    '''
+
+    def __init__(self,
+                 blocs: Iterable[bytes],
+                 vitesse: float | None = 1.,
+                 durée: float | None = None,
+                 timeout: float | None = None,
+                 port: str = 'relecture'):
+        self.port: str = port
+        self.timeout: float | None = timeout
+        self.vitesse: float | None = vitesse
+        self.is_open: bool = True
+
+        self._blocs: Iterator[bytes] = iter(blocs)
+        self._prochain: bytes | None = next(self._blocs, None)
+        self.bannière: bytes = self._prochain or b''
+        if durée is None:
+            p = paramètres(self.bannière)
+            durée = int(p.get('N', 0)) * int(p.get('d', 0)) * us
+        self.durée: float = durée
+
+        self._tampon = bytearray()
+        self._position: int = 0 # Début des octets pas encore lus
+        self._début: float | None = None # Heure de la première lecture
+        self._annulé = threading.Event()
+
+        self.blocs: int = 0 #: Nombre de blocs rendus disponibles, bannière comprise
+        self.octets: int = 0 #: Nombre d'octets lus
+        self.écrits: int = 0 #: Nombre d'octets reçus par :py:meth:`write`, et ignorés
+
+    @classmethod
+    def synthétique(cls,
+                    N: int = N_DÉFAUT,
+                    protocole: str = TEXTE,
+                    blocs: int | None = None,
+                    **kargs) -> 'Relecture':
+        '''Relecture de blocs simulés, comme :py:class:`extra.simulateur.PseudoAnnonceur`
+
+        La colonne ``ts`` avance de ``N ×`` :py:data:`extra.simulateur.PÉRIODE`
+        à chaque bloc, quelle que soit la vitesse.
+
+        Parameters
+        ----------
+        N
+            Nombre de mesures par bloc
+        protocole
+            :py:data:`extra.trames.TEXTE` ou :py:data:`extra.trames.BINAIRE`
+        blocs
+            Nombre de blocs après la bannière. ``None`` pour ne jamais s'arrêter.
+        kargs
+            Voir :py:class:`Relecture`
+        '''
+        def générer() -> Iterator[bytes]:
+            yield bannière(N, protocole)
+            # Quelques blocs générés d'avance; seul le temps est produit à
+            # la volée, pour que la relecture ne soit pas plus lente que le
+            # programme mesuré.
+            générer = bloc_binaire if protocole == BINAIRE else bloc
+            modèles = [sans_temps(générer(N, i), N, protocole) for i in range(16)]
+            for i in itertools.count() if blocs is None else range(blocs):
+                ts = (np.arange(N) + i*N) * PÉRIODE
+                yield temps(ts, protocole) + modèles[i % len(modèles)]
+        return cls(générer(), **kargs)
+
+    @classmethod
+    def capture(cls, chemin: str | os.PathLike, **kargs) -> 'Relecture':
+        '''Relecture des octets bruts d'un port série, enregistrés dans un fichier
+
+        La capture doit commencer par la bannière, qui détermine le protocole
+        et la durée des blocs. Un bloc incomplet à la fin est ignoré.
+
+        Parameters
+        ----------
+        chemin
+            Fichier de la capture
+        kargs
+            Voir :py:class:`Relecture`
+        '''
+        données = Path(chemin).read_bytes()
+
+        def découper() -> Iterator[bytes]:
+            fin = données.find(SEP_BLOC)
+            if fin < 0:
+                return
+            fin += len(SEP_BLOC)
+            yield données[:fin]
+            sep = séparateur(lire_protocole(données[:fin]))
+            while (i := données.find(sep, fin)) >= 0:
+                début, fin = fin, i + len(sep)
+                yield données[début:fin]
+        return cls(découper(), port=str(chemin), **kargs)
+
+    @classmethod
+    def enregistrement(cls,
+                       chemin: str | os.PathLike,
+                       N: int = N_DÉFAUT,
+                       protocole: str = TEXTE,
+                       **kargs) -> 'Relecture':
+        '''Relecture d'un enregistrement de :py:class:`extra.enregistreur.Enregistreur`
+
+        Les colonnes ``ts``, ``A0`` et ``F`` sont renvoyées par blocs de
+        ``N`` mesures, comme par l'annonceur. La période de la bannière est
+        celle de la colonne ``ts``.
+
+        Parameters
+        ----------
+        chemin
+            Dossier de l'enregistrement
+        N
+            Nombre de mesures par bloc
+        protocole
+            :py:data:`extra.trames.TEXTE` ou :py:data:`extra.trames.BINAIRE`
+        kargs
+            Voir :py:class:`Relecture`
+        '''
+        colonnes = {nom: v for nom, v in lire(chemin).items() if nom in CANAUX}
+        ts = colonnes.get('ts', np.zeros(0, np.int64))
+        d = int(np.median(np.diff(ts[:N+1]))) if ts.size > 1 else PÉRIODE
+
+        def découper() -> Iterator[bytes]:
+            yield bannière(N, protocole, d)
+            for i in range(ts.size // N):
+                # F a N/2 valeurs par bloc, les autres colonnes N.
+                mes = {nom: v[i*(n := N * v.size // ts.size):(i+1)*n]
+                       for nom, v in colonnes.items()}
+                mes['ts'] = mes['ts'] % (1 << 32)
+                if protocole == BINAIRE:
+                    yield encoder_bloc(mes, TYPES_BINAIRES)
+                else:
+                    yield encoder_texte(mes)
+        return cls(découper(), port=str(chemin), **kargs)
+
+    @property
+    def terminé(self) -> bool:
+        '''Tous les blocs ont été lus'''
+        return self._prochain is None and self._position == len(self._tampon)
+
+    def _heure(self, i: int) -> float:
+        '''Heure où le bloc ``i`` devient disponible (la bannière est le bloc 0)'''
+        if self.vitesse is None:
+            return 0.
+        return self._début + i * self.durée / self.vitesse
+
+    def _libérer(self, forcer: bool = False):
+        '''Ajoute au tampon les blocs arrivés'''
+        maintenant = time.monotonic()
+        if self._début is None:
+            self._début = maintenant
+        while self._prochain is not None and self._heure(self.blocs) <= maintenant:
+            if self.vitesse is None and self._disponibles >= TAMPON and not forcer:
+                break
+            self._tampon += self._prochain
+            self._prochain = next(self._blocs, None)
+            self.blocs += 1
+            forcer = False
+
+    @property
+    def _disponibles(self) -> int:
+        return len(self._tampon) - self._position
+
+    def _attendre(self, prêt) -> int:
+        '''Attend que ``prêt(disponibles)`` soit vrai, ou le délai de lecture
+
+        Returns
+        -------
+        disponibles
+            Nombre d'octets dans le tampon
+        '''
+        self._annulé.clear()
+        limite = None if self.timeout is None else time.monotonic() + self.timeout
+        self._libérer()
+        while not prêt(self._disponibles) and self._prochain is not None:
+            maintenant = time.monotonic()
+            attente = self._heure(self.blocs) - maintenant
+            if attente <= 0:
+                # Relecture non cadencée, et le tampon est déjà plein
+                self._libérer(forcer=True)
+                continue
+            if limite is not None:
+                if maintenant >= limite:
+                    break
+                attente = min(attente, limite - maintenant)
+            if self._annulé.wait(attente):
+                break
+            self._libérer()
+        return self._disponibles
+
+    def _avancer(self, n: int):
+        self._position += n
+        self.octets += n
+        # On oublie les octets lus, de temps en temps seulement.
+        if self._position > TAMPON:
+            del self._tampon[:self._position]
+            self._position = 0
+
+    def _prendre(self, n: int) -> bytes:
+        données = bytes(self._tampon[self._position:self._position + n])
+        self._avancer(n)
+        return données
+
+    @property
+    def in_waiting(self) -> int:
+        '''Nombre d'octets disponibles immédiatement'''
+        self._libérer()
+        return self._disponibles
+
+    def read(self, size: int = 1) -> bytes:
+        '''Lit ``size`` octets, ou moins si le délai de lecture est écoulé'''
+        n = self._attendre(lambda disponibles: disponibles >= size)
+        return self._prendre(min(n, size))
+
+    def readinto(self, b) -> int:
+        '''Lit au plus ``len(b)`` octets dans ``b``, comme :py:meth:`io.RawIOBase.readinto`'''
+        b = memoryview(b).cast('B')
+        n = min(self._attendre(lambda disponibles: disponibles >= len(b)), len(b))
+        with memoryview(self._tampon) as tampon:
+            b[:n] = tampon[self._position:self._position + n]
+        self._avancer(n)
+        return n
+
+    def read_until(self, expected: bytes = LF, size: int | None = None) -> bytes:
+        '''Lit jusqu'à ``expected`` inclus, ``size`` octets, ou le délai de lecture'''
+        cherché = self._position # Le séparateur n'est pas avant cette position
+
+        def prêt(disponibles: int) -> bool:
+            nonlocal cherché
+            if size is not None and disponibles >= size:
+                return True
+            if self._tampon.find(expected, cherché) >= 0:
+                return True
+            cherché = max(self._position, len(self._tampon) - len(expected) + 1)
+            return False
+
+        n = self._attendre(prêt)
+        i = self._tampon.find(expected, self._position)
+        if i >= 0:
+            n = min(n, i + len(expected) - self._position)
+        if size is not None:
+            n = min(n, size)
+        return self._prendre(n)
+
+    def readline(self, size: int | None = None) -> bytes:
+        '''Lit jusqu'à ``\\n`` inclus'''
+        return self.read_until(LF, size)
+
+    def write(self, data: bytes) -> int:
+        '''Ignore les requêtes: l'annonceur n'écoute pas'''
+        self.écrits += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        '''Oublie les octets disponibles, comme à l'ouverture d'un vrai port'''
+        self._libérer()
+        self._position = len(self._tampon)
+
+    def cancel_read(self):
+        '''Interrompt une lecture en attente dans un autre fil d'exécution'''
+        self._annulé.set()
+
+    def close(self):
+        self.is_open = False
+        self.cancel_read()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+'''Affichage en direct par « blitting »
+
+:py:func:`matplotlib.pyplot.pause` redessine toute la figure: les axes, les
+graduations, les légendes et les titres, alors que seules les courbes
+changent. :py:class:`RenduBlit` garde plutôt une image du fond de la figure
+(tout sauf les courbes), et à chaque image:
+
+#. recolle le fond (:py:meth:`~matplotlib.backend_bases.FigureCanvasBase.restore_region`);
+#. dessine seulement les courbes (:py:meth:`~matplotlib.figure.Figure.draw_artist`);
+#. envoie le résultat à l'écran (:py:meth:`~matplotlib.backend_bases.FigureCanvasBase.blit`).
+
+Les limites des axes ne sont changées, et la figure redessinée au complet,
+que quand les données sortent des limites actuelles. Le nombre d'images par
+seconde est aussi plafonné, indépendamment de la fréquence d'acquisition.
+
+Voir `Faster rendering by using blitting
+<https://matplotlib.org/stable/users/explain/animations/blitting.html>`_.
+'''
+
+import math
+import time
+
+from typing import TYPE_CHECKING
+
+import numpy as np # <https://numpy.org/>
+
+# matplotlib n'est importé que pour les annotations: le module reste
+# léger pour les programmes qui n'affichent rien.
+if TYPE_CHECKING:
+    import matplotlib as mpl # <https://matplotlib.org/>
+    import matplotlib.axes
+    import matplotlib.figure
+    import matplotlib.lines
+
+FPS_MAX: float = 30. #: Nombre maximal d'images par seconde
+MARGE: float = 0.1 #: Marge ajoutée autour des données quand les limites changent
+RÉTRÉCIR: float = 0.25 #: Les limites sont resserrées si les données occupent moins de cette fraction de l'axe
+
+
+class RenduBlit:
+    '''Met à jour les courbes d'une figure sans redessiner le reste
+
+    Toutes les courbes (:py:class:`matplotlib.lines.Line2D`) présentes dans
+    les axes de la figure au moment de la création sont animées.
+
+    Parameters
+    ----------
+    fig
+        Figure à mettre à jour
+    fps_max
+        Nombre maximal d'images par seconde. ``None`` pour ne pas limiter.
+    '''
+
+    def __init__(self, fig: 'mpl.figure.Figure', fps_max: float | None = FPS_MAX):
+        self.fig: 'mpl.figure.Figure' = fig
+        self.canvas = fig.canvas
+        self.période: float = 0 if not fps_max else 1 / fps_max
+        self._dernière: float = -math.inf # Heure de la dernière image
+
+        self.lignes: 'list[mpl.lines.Line2D]' = [l for ax in fig.axes for l in ax.lines]
+        for l in self.lignes:
+            # Les courbes animées sont ignorées par canvas.draw, donc
+            # absentes du fond.
+            l.set_animated(True)
+
+        self._fond = None
+        self._redessiner: bool = True
+        self._cid = self.canvas.mpl_connect('draw_event', self._sur_dessin)
+
+        self.images: int = 0 #: Nombre d'images affichées
+        self.redessins: int = 0 #: Nombre d'images qui ont demandé de tout redessiner
+        self.sautées: int = 0 #: Nombre d'images sautées à cause de :py:attr:`période`
+
+    @property
+    def axes(self) -> 'list[mpl.axes.Axes]':
+        return self.fig.axes
+
+    def largeur(self, ax: 'mpl.axes.Axes') -> int:
+        '''Largeur de ``ax`` à l'écran, en pixels
+
+        Une courbe n'a pas besoin de plus de deux points par colonne de
+        pixels, voir :py:class:`extra.pyramide.Pyramide`.
+        '''
+        return max(1, round(ax.bbox.width))
+
+    def _sur_dessin(self, event):
+        # Appelé après chaque dessin complet, y compris quand la fenêtre est
+        # redimensionnée: le fond doit être recapturé.
+        self._fond = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._dessiner_lignes()
+
+    def _dessiner_lignes(self):
+        for l in self.lignes:
+            self.fig.draw_artist(l)
+
+    def prêt(self) -> bool:
+        '''Vrai s'il est temps d'afficher une nouvelle image
+
+        À appeler avant de préparer les données d'une image, pour ne pas
+        faire ce travail inutilement.
+        '''
+        if time.monotonic() - self._dernière >= self.période:
+            return True
+        self.sautées += 1
+        return False
+
+    def ajuster(self,
+                ax: 'mpl.axes.Axes',
+                x: np.ndarray | tuple[float, float] | None = None,
+                y: np.ndarray | tuple[float, float] | None = None):
+        '''Change les limites de ``ax`` seulement si les données en sortent
+
+        Parameters
+        ----------
+        ax
+            Système d'axes à ajuster
+        x, y
+            Données, ou limites ``(min, max)`` voulues, pour chaque axe.
+            ``None`` pour ne pas toucher à l'axe.
+        '''
+        for valeurs, lire, régler in ((x, ax.get_xlim, ax.set_xlim),
+                                      (y, ax.get_ylim, ax.set_ylim)):
+            if valeurs is None or len(valeurs) == 0:
+                continue
+            bas, haut = float(np.min(valeurs)), float(np.max(valeurs))
+            if not (math.isfinite(bas) and math.isfinite(haut)):
+                continue
+
+            g, d = lire()
+            étendue = haut - bas
+            if bas < g or haut > d or étendue < RÉTRÉCIR * (d - g):
+                marge = MARGE * étendue or 1
+                régler(bas - marge, haut + marge)
+                self._redessiner = True
+
+    def limites(self,
+                ax: 'mpl.axes.Axes',
+                xlim: tuple[float, float] | None = None,
+                ylim: tuple[float, float] | None = None):
+        '''Fixe les limites de ``ax``, en ne redessinant que si elles changent'''
+        if xlim is not None and tuple(ax.get_xlim()) != tuple(xlim):
+            ax.set_xlim(*xlim)
+            self._redessiner = True
+        if ylim is not None and tuple(ax.get_ylim()) != tuple(ylim):
+            ax.set_ylim(*ylim)
+            self._redessiner = True
+
+    def afficher(self):
+        '''Affiche les courbes avec leurs nouvelles données'''
+        self._dernière = time.monotonic()
+        self.images += 1
+
+        if self._fond is None or self._redessiner:
+            # Les axes ont changé: on redessine tout, ce qui recapture le fond
+            # via l'événement ``draw_event``.
+            self._redessiner = False
+            self.redessins += 1
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._fond)
+            self._dessiner_lignes()
+            self.canvas.blit(self.fig.bbox)
+
+        # Laisser l'interface graphique traiter ses événements, comme le
+        # ferait :py:func:`matplotlib.pyplot.pause`.
+        self.canvas.flush_events()
+
+    def close(self):
+        self.canvas.mpl_disconnect(self._cid)
@@ -0,0 +1,423 @@
+# -*- coding: utf-8 -*-
+
+'''Données synthétiques imitant les programmes Arduino
+
+Ces fonctions permettent de tester et de mesurer la performance des
+programmes Python sans micro-contrôleur branché. Les blocs produits ont le
+même format que ceux de l'annonceur, en mode texte (:py:mod:`extra.parseur`)
+ou binaire (:py:mod:`extra.trames`).
+'''
+
+import os
+import pty # <https://docs.python.org/3/library/pty.html>
+import tty
+import threading
+import time
+import itertools
+import select
+import logging
+
+import numpy as np # <https://numpy.org/>
+
+from extra.parseur import SEP_LIGNE, SEP_BLOC
+from extra.trames import TEXTE, BINAIRE, encoder_bloc, encoder_trame, CANAUX, Schéma
+
+N_DÉFAUT: int = 256 #: Nombre de mesures par bloc, comme ``auditeur.N_max``
+PÉRIODE: int = 100 #: Période d'échantillonage simulée, en µs
+F_POULS: float = 1.2 #: Fréquence du signal simulé, en Hz
+
+BOUCLE: float = 112e-6 #: Durée d'un ``analogRead`` sur un Arduino Nano Every, en secondes
+LATENCE_USB: float = 1e-3 #: Délai avant qu'une requête n'atteigne le micro-contrôleur, en secondes (une trame USB)
+TAMPON_RX: int = 64 #: Taille du tampon de réception d'un Arduino, en octets
+PAQUET_USB: int = 64 #: Taille d'un paquet USB, en octets
+M_MESURES: int = 500 #: Nombre de mesures gardées par ``serveur/rapide``, comme ``M_mesures``
+
+#: Type de chaque colonne en mode binaire: le temps en µs sur 32 bits, comme
+#: ``micros()``, et les mesures du CAN de 10 bits sur 16 bits.
+TYPES_BINAIRES: dict[str, str] = {'ts': '<u4', 'A0': '<u2', 'F': '<u2'}
+
+
+def valeurs(N: int = N_DÉFAUT, i: int = 0, bruit: float = 20.) -> dict[str, np.ndarray]:
+    '''Valeurs d'un bloc simulé
+
+    Parameters
+    ----------
+    N
+        Nombre de mesures dans le bloc
+    i
+        Numéro du bloc, pour que le temps avance d'un bloc à l'autre
+    bruit
+        Amplitude du bruit ajouté au signal, en unités CAN
+
+    Returns
+    -------
+    valeurs
+        ``{'ts': ..., 'A0': ..., 'F': ...}``, des entiers comme ceux envoyés
+        par le micro-contrôleur.
+    '''
+    ts = (np.arange(N) + i*N) * PÉRIODE
+    rng = np.random.default_rng(i)
+    A0 = 512 + 300*np.sin(2*np.pi*F_POULS*ts*1e-6) + bruit*rng.standard_normal(N)
+    A0 = np.clip(A0, 0, 1023).astype(np.int64)
+    F = np.abs(np.fft.rfft(A0 - A0.mean()))[:N//2].astype(np.int64)
+
+    return {'ts': ts, 'A0': A0, 'F': F}
+
+
+def encoder_texte(mes: dict[str, np.ndarray]) -> bytes:
+    '''Bloc au format texte de l'annonceur, terminé par :py:data:`extra.parseur.SEP_BLOC`
+
+    Parameters
+    ----------
+    mes
+        Valeurs entières de chaque colonne, ``{nom: valeurs}``
+    '''
+    lignes = (f'{nom}={np.asarray(v).tolist()}'.encode() for nom, v in mes.items())
+    return SEP_LIGNE.join(lignes) + SEP_BLOC
+
+
+def bloc(N: int = N_DÉFAUT, i: int = 0, **kargs) -> bytes:
+    '''Bloc simulé au format texte de l'annonceur, terminé par :py:data:`extra.parseur.SEP_BLOC`
+
+    Les arguments sont ceux de :py:func:`valeurs`.
+    '''
+    return encoder_texte(valeurs(N, i, **kargs))
+
+
+def bloc_binaire(N: int = N_DÉFAUT, i: int = 0, **kargs) -> bytes:
+    '''Bloc simulé au format binaire, terminé par :py:data:`extra.trames.FIN_BLOC`
+
+    Les arguments sont ceux de :py:func:`valeurs`.
+    '''
+    return encoder_bloc(valeurs(N, i, **kargs), TYPES_BINAIRES)
+
+
+def bannière(N: int = N_DÉFAUT, protocole: str = TEXTE, d: int = PÉRIODE) -> bytes:
+    '''Premier bloc envoyé par l'annonceur, avec les paramètres du micro-contrôleur
+
+    La bannière est toujours en texte. Elle annonce le protocole des blocs
+    suivants seulement s'il est binaire, comme le ferait un annonceur
+    modifié, puis les canaux de chaque bloc. ``d`` est la période
+    d'échantillonage, en µs. Voir :py:meth:`extra.trames.Schéma.bannière`.
+    '''
+    longueurs = {'ts': N, 'A0': N, 'F': N // 2}
+    canaux = {nom: (TYPES_BINAIRES[nom], n) for nom, n in longueurs.items()}
+    return Schéma(N, d, protocole, canaux).bannière()
+
+
+def sans_temps(modèle: bytes, N: int = N_DÉFAUT, protocole: str = TEXTE) -> bytes:
+    '''Bloc sans sa colonne ``ts``, pour y mettre le temps au moment de l'envoi
+
+    Voir :py:func:`temps`.
+    '''
+    if protocole == BINAIRE:
+        # La trame du temps est la première: entête, valeurs et CRC
+        return modèle[len(encoder_trame(0, np.zeros(N, TYPES_BINAIRES['ts']))):]
+    return modèle.partition(SEP_LIGNE)[2]
+
+
+def temps(ts: np.ndarray, protocole: str = TEXTE) -> bytes:
+    '''Colonne ``ts`` d'un bloc, à placer devant un bloc de :py:func:`sans_temps`
+
+    Les valeurs sont ramenées sur 32 bits, comme ``micros()``.
+    '''
+    ts = np.asarray(ts) % (1 << 32)
+    if protocole == BINAIRE:
+        return encoder_trame(CANAUX.index('ts'), ts, TYPES_BINAIRES['ts'])
+    return f'ts={ts.tolist()}'.encode() + SEP_LIGNE
+
+
+class PseudoTerminal(threading.Thread):
+    '''Faux micro-contrôleur branché sur un pseudo-terminal (Linux, macOS)
+
+    Le fil d'exécution écrit du côté maître d'un pseudo-terminal
+    (:py:func:`pty.openpty`). Le côté esclave, :py:attr:`port`, s'ouvre avec
+    :py:class:`serial.Serial` comme un vrai micro-contrôleur.
+
+    Parameters
+    ----------
+    débit
+        Débit simulé en baud (10 bits par octet). ``None`` pour écrire aussi
+        vite que le lecteur peut suivre.
+    '''
+
+    def __init__(self, débit: int | None = None):
+        super().__init__(daemon=True)
+        self.débit: int | None = débit
+
+        self._maître, self._esclave = pty.openpty()
+        tty.setraw(self._esclave) # Pas de conversion des \r\n
+        os.set_blocking(self._maître, False) # Pour pouvoir s'arrêter
+        self.port: str = os.ttyname(self._esclave)
+        self._arrêt = threading.Event()
+
+    def _pousser(self, données: bytes):
+        '''Écrit tout, sans simuler le débit'''
+        vue = memoryview(données)
+        while vue and not self._arrêt.is_set():
+            # On attend que le lecteur fasse de la place, mais on vérifie
+            # régulièrement si on doit s'arrêter.
+            if select.select([], [self._maître], [], 0.1)[1]:
+                try:
+                    vue = vue[os.write(self._maître, vue):]
+                except BlockingIOError:
+                    pass
+
+    def _écrire(self, données: bytes):
+        self._pousser(données)
+        if self.débit:
+            time.sleep(10 * len(données) / self.débit)
+
+    def arrêter(self):
+        '''Arrête l'écriture et ferme le pseudo-terminal'''
+        self._arrêt.set()
+        if self.is_alive():
+            self.join()
+        os.close(self._maître)
+        os.close(self._esclave)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.arrêter()
+
+
+class PseudoAnnonceur(PseudoTerminal):
+    '''Faux annonceur branché sur un pseudo-terminal (Linux, macOS)
+
+    Le fil d'exécution écrit la bannière, puis des blocs simulés. Voir
+    :py:class:`PseudoTerminal`.
+
+    Comme sur le vrai micro-contrôleur, la colonne ``ts`` suit le temps
+    réel, en µs sur 32 bits depuis le démarrage: chaque bloc se termine au
+    moment où il est envoyé.
+
+    Parameters
+    ----------
+    N
+        Nombre de mesures par bloc
+    débit
+        Débit simulé en baud (10 bits par octet). ``None`` pour écrire aussi
+        vite que le lecteur peut suivre.
+    blocs
+        Nombre de blocs à envoyer. ``None`` pour ne jamais s'arrêter.
+    protocole
+        :py:data:`extra.trames.TEXTE` ou :py:data:`extra.trames.BINAIRE`
+    démarrage
+        Attente avant la bannière, en secondes, comme un Arduino qui
+        redémarre à l'ouverture du port
+    '''
+
+    def __init__(self,
+                 N: int = N_DÉFAUT,
+                 débit: int | None = None,
+                 blocs: int | None = None,
+                 protocole: str = TEXTE,
+                 démarrage: float = 0.):
+        super().__init__(débit)
+        self.N: int = N
+        self.protocole: str = protocole
+        self.blocs: int | None = blocs
+        self.démarrage: float = démarrage
+        self.envoyés: int = 0 #: Nombre de blocs écrits
+
+        # Quelques blocs différents, générés d'avance pour que la simulation
+        # ne soit pas plus lente que le programme mesuré. Seule la ligne du
+        # temps est produite à l'envoi.
+        générer = bloc_binaire if protocole == BINAIRE else bloc
+        self._modèles: list[bytes] = [sans_temps(générer(N, i), N, protocole) for i in range(16)]
+
+    def _temps(self, début: int) -> bytes:
+        fin = (time.monotonic_ns() - début) // 1000
+        return temps(fin + (np.arange(self.N) - self.N + 1) * PÉRIODE, self.protocole)
+
+    def run(self):
+        try:
+            if self._arrêt.wait(self.démarrage):
+                return
+            début = time.monotonic_ns() - self.N * PÉRIODE * 1000
+            self._écrire(bannière(self.N, self.protocole))
+            for i in itertools.count() if self.blocs is None else range(self.blocs):
+                if self._arrêt.is_set():
+                    break
+                self._écrire(self._temps(début) + self._modèles[i % len(self._modèles)])
+                self.envoyés += 1
+        except OSError:
+            # Le pseudo-terminal a été fermé pendant une écriture.
+            if not self._arrêt.is_set():
+                logging.exception('Erreur d\'écriture sur %s.', self.port)
+
+
+class PseudoServeur(PseudoTerminal):
+    '''Faux ``serveur/base`` branché sur un pseudo-terminal (Linux, macOS)
+
+    Comme le programme Arduino, répond à chaque octet de requête ``i``,
+    avec ``i < broches``, par la dernière mesure de la broche ``i`` suivie de
+    ``\\r\\n``. Les autres octets sont ignorés.
+
+    Le programme Arduino ne traite qu'une requête par tour de boucle, après
+    avoir lu toutes ses broches. Les délais sont simulés: :py:data:`LATENCE_USB`
+    avant de recevoir un groupe de requêtes, puis ``broches ×``
+    :py:data:`BOUCLE` par requête, et le temps d'envoi des réponses au
+    ``débit`` donné. Les requêtes sont lues par groupes d'au plus
+    :py:data:`TAMPON_RX` octets; contrairement au vrai tampon, celles qui
+    dépassent ne sont pas perdues.
+
+    Parameters
+    ----------
+    broches
+        Nombre de broches mesurées
+    débit
+        Débit simulé en baud. ``None`` pour ne pas limiter.
+    latence
+        Délai de transmission des requêtes, en secondes
+    boucle
+        Durée de lecture d'une broche, en secondes
+    '''
+
+    def __init__(self,
+                 broches: int = 2,
+                 débit: int | None = 115200,
+                 latence: float = LATENCE_USB,
+                 boucle: float = BOUCLE):
+        super().__init__(débit)
+        self.broches: int = broches
+        self.latence: float = latence
+        self.boucle: float = boucle
+        self.requêtes: int = 0 #: Nombre de requêtes reçues
+        self._rng = np.random.default_rng(0)
+
+    def _mesure(self, broche: int) -> int:
+        t = time.monotonic()
+        v = 512 + 300*np.sin(2*np.pi*F_POULS*t + broche) + 20*self._rng.standard_normal()
+        return int(np.clip(v, 0, 1023))
+
+    def run(self):
+        try:
+            while not self._arrêt.is_set():
+                if not select.select([self._maître], [], [], 0.1)[0]:
+                    continue
+                try:
+                    requêtes: bytes = os.read(self._maître, TAMPON_RX)
+                except BlockingIOError:
+                    continue
+                time.sleep(self.latence + len(requêtes) * self.broches * self.boucle)
+
+                self.requêtes += len(requêtes)
+                réponses = b''.join(b'%d' % self._mesure(i) + SEP_LIGNE
+                                    for i in requêtes if i < self.broches)
+                self._écrire(réponses)
+        except OSError:
+            if not self._arrêt.is_set():
+                logging.exception('Erreur sur %s.', self.port)
+
+
+class PseudoServeurRapide(PseudoTerminal):
+    '''Faux ``serveur/rapide`` branché sur un pseudo-terminal (Linux, macOS)
+
+    Comme le programme Arduino, mesure en continu toutes ses broches dans
+    une mémoire circulaire de ``mesures`` colonnes, avec le temps de
+    ``micros()`` gardé sur 32 bits (``unsigned long``) et les mesures du CAN
+    sur 10 bits (``unsigned int``). Chaque octet reçu, peu importe sa valeur,
+    déclenche l'envoi de toute la mémoire, dans l'ordre de la mémoire: une
+    ligne ``0`` pour le temps, puis une par broche, les valeurs séparées par
+    des tabulations et chaque ligne terminée par ``\\r\\n``. La rafale
+    est écrite par paquets de :py:data:`PAQUET_USB` octets, au rythme du
+    ``débit``.
+
+    Un tour de boucle dure ``broches ×`` :py:data:`BOUCLE`. Le programme
+    Arduino ne mesure pas pendant qu'il envoie une rafale: le temps d'envoi
+    au ``débit`` donné ne compte pas de tours. La requête arrive après
+    :py:data:`LATENCE_USB`.
+
+    Parameters
+    ----------
+    broches
+        Nombre de broches mesurées
+    mesures
+        Nombre de mesures gardées en mémoire par broche
+    débit
+        Débit simulé en baud. ``None`` pour ne pas limiter.
+    latence
+        Délai de transmission de la requête, en secondes
+    boucle
+        Durée de lecture d'une broche, en secondes
+    '''
+
+    def __init__(self,
+                 broches: int = 2,
+                 mesures: int = M_MESURES,
+                 débit: int | None = 1000000,
+                 latence: float = LATENCE_USB,
+                 boucle: float = BOUCLE):
+        super().__init__(débit)
+        self.broches: int = broches
+        self.mesures: int = mesures
+        self.latence: float = latence
+        self.période: int = round(broches * boucle * 1e6) #: Durée d'un tour de boucle, en µs
+        self.rafales: int = 0 #: Nombre de rafales envoyées
+        self._rng = np.random.default_rng(0)
+
+        # Mémoire du micro-contrôleur, déjà pleine au démarrage
+        self._tours: int = 0 # Tours de boucle depuis le démarrage
+        self._temps = np.zeros(mesures, np.int64) # µs
+        self._valeurs = np.zeros((broches, mesures), np.int64)
+        self._début: int = time.monotonic_ns() // 1000 - mesures * self.période
+        self._reprise: int = self._début # Fin de la dernière rafale, en µs
+
+    def _mesurer(self, maintenant: int):
+        '''Remplit la mémoire avec les tours de boucle depuis la dernière rafale'''
+        tours = (maintenant - self._reprise) // self.période
+        # Seuls les derniers tours restent en mémoire.
+        n = min(tours, self.mesures)
+        i = self._tours + tours - n + np.arange(n)
+        ts = self._reprise + (i - self._tours + 1) * self.période
+        v = (512 + 300*np.sin(2*np.pi*F_POULS*ts[None, :]*1e-6 + np.arange(self.broches)[:, None])
+             + 20*self._rng.standard_normal((self.broches, n)))
+        case = i % self.mesures
+        self._temps[case] = (ts - self._début) % (1 << 32)
+        self._valeurs[:, case] = np.clip(v, 0, 1023)
+        self._tours += tours
+
+    def _rafale(self) -> bytes:
+        lignes = (f'{n}\t' + '\t'.join(map(str, v)) for n, v in
+                  enumerate([self._temps.tolist(), *self._valeurs.tolist()]))
+        return SEP_LIGNE.join(l.encode() for l in lignes) + SEP_LIGNE
+
+    def _écrire(self, données: bytes):
+        # Une rafale prend plusieurs centaines de ms à passer: elle est
+        # envoyée par paquets USB, au rythme du débit, pour que le client la
+        # lise pendant qu'elle arrive. Chaque paquet a une échéance, pour
+        # que les retards de time.sleep ne s'accumulent pas.
+        début = time.monotonic()
+        for i in range(0, len(données), PAQUET_USB):
+            if self._arrêt.is_set():
+                break
+            if self.débit:
+                time.sleep(max(0., début + 10 * i / self.débit - time.monotonic()))
+            self._pousser(données[i:i + PAQUET_USB])
+        if self.débit:
+            time.sleep(max(0., début + 10 * len(données) / self.débit - time.monotonic()))
+
+    def run(self):
+        try:
+            while not self._arrêt.is_set():
+                if not select.select([self._maître], [], [], 0.1)[0]:
+                    continue
+                try:
+                    requêtes: bytes = os.read(self._maître, TAMPON_RX)
+                except BlockingIOError:
+                    continue
+                time.sleep(self.latence)
+
+                # Une rafale par octet reçu
+                for _ in requêtes:
+                    self._mesurer(time.monotonic_ns() // 1000)
+                    self._écrire(self._rafale())
+                    self._reprise = time.monotonic_ns() // 1000
+                    self.rafales += 1
+        except OSError:
+            if not self._arrêt.is_set():
+                logging.exception('Erreur sur %s.', self.port)
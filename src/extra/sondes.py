@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+'''Chronométrage des étapes de la boucle d'acquisition
+
+Quand la boucle prend du retard, il faut savoir où passe le temps: lecture
+de la ligne série, analyse des blocs, transformée de Fourier ou affichage.
+Les fonctions des programmes sont décorées avec
+:py:meth:`Sondes.chronométrer`, et les événements notables (octets lus,
+blocs invalides, mesures incomplètes, ...) comptés avec
+:py:meth:`Sondes.compter`.
+
+Toutes les sondes passent par l'objet global :py:data:`sondes`, inactif par
+défaut: chaque appel ne coûte alors qu'une vérification de
+:py:attr:`Sondes.actif`. Une fois activé avec :py:meth:`Sondes.activer`,
+chaque étape est chronométrée avec :py:func:`time.perf_counter_ns`, et les
+durées sont classées dans un :py:class:`Histogramme` par puissances de 2:
+l'ajout d'une durée ne coûte qu'une addition, et la mémoire utilisée ne
+grandit pas.
+
+:py:meth:`Sondes.rapporter` écrit un résumé avec :py:mod:`logging`, et
+ajoute une ligne JSON au fichier de :py:meth:`Sondes.activer`, s'il y en a
+un. :py:class:`extra.loop.Ordonnanceur` l'appelle à chacun de ses rapports.
+
+.. code-block:: python
+
+    from extra.sondes import sondes
+
+    @sondes.chronométrer()
+    def analyser(bloc):
+        if not bloc:
+            sondes.compter('blocs vides')
+            return
+        ...
+
+    sondes.activer('sondes.jsonl')
+'''
+
+import functools
+import json
+import logging
+import os
+import time
+
+from pathlib import Path
+from typing import Callable
+
+RAPPORT: float = 5. #: Intervalle entre les rapports, en secondes
+CASES: int = 64 #: Nombre de cases des histogrammes, pour des durées jusqu'à 2⁶³ ns
+
+ns2ms: float = 1e-6 #: Conversion de ns à ms
+
+
+class Histogramme:
+    '''Répartition de durées, en ns, par puissances de 2
+
+    La case ``i`` compte les durées ``d`` telles que ``2**(i-1) <= d < 2**i``.
+    Les centiles sont donc précis à un facteur :math:`\\sqrt{2}` près, ce qui
+    suffit pour trouver une étape lente.
+    '''
+
+    __slots__ = ('cases', 'n', 'total', 'max')
+
+    def __init__(self):
+        self.cases: list[int] = [0] * CASES
+        self.n: int = 0 #: Nombre de durées
+        self.total: int = 0 #: Somme des durées, en ns
+        self.max: int = 0 #: Plus longue durée, en ns
+
+    def ajouter(self, durée: int):
+        self.cases[durée.bit_length()] += 1
+        self.n += 1
+        self.total += durée
+        if durée > self.max:
+            self.max = durée
+
+    def centile(self, p: float) -> float:
+        '''Durée sous laquelle tombent ``p`` % des durées, en ns'''
+        if not self.n:
+            return float('nan')
+        rang = p / 100 * self.n
+        cumul = 0
+        for i, n in enumerate(self.cases):
+            cumul += n
+            if cumul >= rang and n:
+                # Milieu géométrique de la case, sans dépasser le maximum
+                return min(2 ** (i - 0.5), self.max)
+        return float(self.max)
+
+    def résumé(self) -> dict[str, float]:
+        '''Nombre d'appels, et durées moyenne, médiane, p99 et maximale en ms'''
+        return {
+            'n': self.n,
+            'moyenne': self.total / self.n * ns2ms if self.n else float('nan'),
+            'p50': self.centile(50) * ns2ms,
+            'p99': self.centile(99) * ns2ms,
+            'max': self.max * ns2ms,
+        }
+
+
+class Sondes:
+    '''Chronomètres, compteurs et jauges des programmes
+
+    Voir :py:data:`sondes`, l'objet global utilisé par les programmes.
+
+    Parameters
+    ----------
+    actif
+        ``False`` pour que les sondes ne coûtent (presque) rien
+    '''
+
+    def __init__(self, actif: bool = False):
+        self.actif: bool = actif
+        self.fichier: Path | None = None #: Fichier des rapports, une ligne JSON chacun
+        self.période: float = RAPPORT #: Intervalle entre les rapports, en secondes
+
+        self.étapes: dict[str, Histogramme] = {} #: Durées de chaque étape depuis le dernier rapport
+        self.compteurs: dict[str, int] = {} #: Compteurs, depuis l'activation
+        self.jauges: dict[str, Callable[[], float]] = {} #: Valeurs lues à chaque rapport
+        self._dernier_rapport: float = time.monotonic()
+
+    def activer(self, fichier: str | os.PathLike | None = None, période: float = RAPPORT):
+        '''Active les sondes
+
+        Parameters
+        ----------
+        fichier
+            Fichier où ajouter chaque rapport, en JSON, une ligne par
+            rapport. ``None`` pour seulement utiliser :py:mod:`logging`.
+        période
+            Intervalle entre les rapports de :py:meth:`rapporter_si_dû`
+        '''
+        self.fichier = None if fichier is None else Path(fichier)
+        self.période = période
+        self._dernier_rapport = time.monotonic()
+        self.actif = True
+
+    def désactiver(self):
+        self.actif = False
+
+    def durée(self, nom: str, durée: int):
+        '''Ajoute la ``durée`` d'une étape, en ns'''
+        try:
+            self.étapes[nom].ajouter(durée)
+        except KeyError:
+            self.étapes[nom] = Histogramme()
+            self.étapes[nom].ajouter(durée)
+
+    def chronométrer(self, nom: str | None = None):
+        '''Décorateur qui chronomètre chaque appel de la fonction
+
+        Parameters
+        ----------
+        nom
+            Nom de l'étape. Par défaut, le nom de la fonction.
+        '''
+        def décorateur(f):
+            étape = nom or f.__name__
+
+            @functools.wraps(f)
+            def chronométrée(*args, **kargs):
+                if not self.actif:
+                    return f(*args, **kargs)
+                début = time.perf_counter_ns()
+                try:
+                    return f(*args, **kargs)
+                finally:
+                    self.durée(étape, time.perf_counter_ns() - début)
+            return chronométrée
+        return décorateur
+
+    def compter(self, nom: str, n: int = 1):
+        '''Ajoute ``n`` au compteur ``nom``'''
+        if self.actif:
+            self.compteurs[nom] = self.compteurs.get(nom, 0) + n
+
+    def jauge(self, nom: str, lire: Callable[[], float]):
+        '''Valeur lue seulement au moment du rapport
+
+        Pour les compteurs que les objets tiennent déjà eux-mêmes, comme
+        :py:attr:`extra.lecteur.LecteurSérie.perdus`: rien n'est fait entre
+        les rapports.
+        '''
+        self.jauges[nom] = lire
+
+    def instantané(self) -> dict:
+        '''État de toutes les sondes, prêt pour :py:func:`json.dumps`'''
+        jauges = {}
+        for nom, lire in self.jauges.items():
+            try:
+                jauges[nom] = lire()
+            except Exception as e:
+                jauges[nom] = repr(e)
+        return {
+            'heure': time.time(),
+            'étapes': {nom: h.résumé() for nom, h in self.étapes.items()},
+            'compteurs': dict(self.compteurs),
+            'jauges': jauges,
+        }
+
+    def rapporter(self):
+        '''Écrit l'état des sondes, puis repart à zéro pour les durées'''
+        self._dernier_rapport = time.monotonic()
+        if not self.actif:
+            return
+        état = self.instantané()
+        for nom, r in état['étapes'].items():
+            logging.info('%s: %d appels, moyenne %.3g ms, p50 %.3g ms, p99 %.3g ms, max %.3g ms',
+                         nom, r['n'], r['moyenne'], r['p50'], r['p99'], r['max'])
+        if état['compteurs'] or état['jauges']:
+            logging.info('Compteurs: %s', ', '.join(f'{nom}={v}' for nom, v in
+                                                     (état['compteurs'] | état['jauges']).items()))
+        if self.fichier is not None:
+            with open(self.fichier, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(état, ensure_ascii=False) + '\n')
+        # Les durées ne couvrent que le dernier intervalle, pour voir tout de
+        # suite quand une étape ralentit.
+        self.étapes.clear()
+
+    def rapporter_si_dû(self):
+        '''Appelle :py:meth:`rapporter` si la :py:attr:`période` est écoulée'''
+        if self.actif and time.monotonic() - self._dernier_rapport >= self.période:
+            self.rapporter()
+
+
+sondes: Sondes = Sondes()
+'''Sondes de tous les programmes, inactives par défaut'''
@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+
+'''Tampons de mesures en colonnes, à capacité fixe ou croissante
+
+Un programme d'acquisition qui tourne pendant des heures ne peut pas garder
+toutes ses mesures en mémoire: avec :py:func:`pandas.concat`, chaque nouveau
+bloc coûte une copie complète de l'historique, et la mémoire utilisée grandit
+sans arrêt. Les classes de ce module gardent plutôt les ``capacité`` dernières
+valeurs de chaque colonne dans des tableaux :py:mod:`numpy` alloués une seule
+fois au démarrage.
+
+Pour que les dernières valeurs soient toujours contiguës en mémoire, chaque
+valeur est écrite deux fois, à l'indice ``i`` et à l'indice ``i + capacité``.
+On paie le double de la mémoire, mais on peut toujours retourner une vue
+(sans copie) des ``n`` dernières valeurs, même quand l'écriture a fait le tour
+du tableau.
+
+Quand tout l'historique doit être gardé, :py:class:`Croissant` a la même
+interface qu'un :py:class:`Anneau`, mais double la taille de son tableau
+quand il est plein: chaque ajout coûte en moyenne une copie de la valeur
+ajoutée seulement, plutôt qu'une liste Python de ``int`` (28 octets chacun,
+plus un pointeur) à reconvertir en tableau à chaque image.
+'''
+
+import numpy as np # <https://numpy.org/>
+import numpy.typing as npt
+
+from typing import Iterable, Mapping
+
+CAPACITÉ_INITIALE: int = 1024 #: Taille initiale du tableau d'un :py:class:`Croissant`
+
+
+class Anneau:
+    '''Tampon circulaire pour une seule colonne de valeurs
+
+    Parameters
+    ----------
+    capacité
+        Nombre maximal de valeurs conservées
+    dtype
+        Type des valeurs, voir :py:class:`numpy.dtype`
+    '''
+
+    def __init__(self, capacité: int, dtype: npt.DTypeLike = np.float64):
+        if capacité < 1:
+            raise ValueError(f'La capacité doit être positive, pas {capacité}.')
+
+        self.capacité: int = capacité
+        #: Tableau doublé: les valeurs de [0, capacité) sont répétées dans
+        #: [capacité, 2*capacité).
+        self._données: np.ndarray = np.zeros(2*capacité, dtype=dtype)
+        self._pos: int = 0 #: Prochain indice d'écriture, dans [0, capacité)
+        self.taille: int = 0 #: Nombre de valeurs valides, au plus capacité
+        self.total: int = 0 #: Nombre de valeurs écrites depuis le début
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._données.dtype
+
+    def __len__(self) -> int:
+        return self.taille
+
+    def ajouter(self, valeurs: npt.ArrayLike):
+        '''Ajoute des valeurs à la fin du tampon
+
+        Si le tampon est plein, les valeurs les plus anciennes sont écrasées.
+        Le coût ne dépend que du nombre de valeurs ajoutées.
+
+        Parameters
+        ----------
+        valeurs
+            Une valeur ou une liste de valeurs
+        '''
+        valeurs = np.asarray(valeurs, dtype=self.dtype).ravel()
+        m: int = valeurs.size
+        self.total += m
+
+        # Seules les ``capacité`` dernières valeurs survivraient de toute façon
+        if m > self.capacité:
+            valeurs = valeurs[-self.capacité:]
+            m = self.capacité
+
+        c, p = self.capacité, self._pos
+        s1: int = min(m, c - p) # Valeurs avant la fin du tableau
+        s2: int = m - s1 # Valeurs à écrire au début du tableau
+        self._données[p:p+s1] = valeurs[:s1]
+        self._données[p+c:p+c+s1] = valeurs[:s1]
+        if s2:
+            self._données[:s2] = valeurs[s1:]
+            self._données[c:c+s2] = valeurs[s1:]
+
+        self._pos = (p + m) % c
+        self.taille = min(self.taille + m, c)
+
+    def dernier(self, n: int | None = None) -> np.ndarray:
+        '''Vue des ``n`` dernières valeurs, de la plus ancienne à la plus récente
+
+        La vue n'est valide que jusqu'au prochain appel de :py:meth:`ajouter`.
+        Il faut en faire une copie (:py:meth:`numpy.ndarray.copy`) pour la
+        conserver ou la modifier.
+
+        Parameters
+        ----------
+        n
+            Nombre de valeurs voulues. Par défaut, toutes les valeurs valides.
+        '''
+        n = self.taille if n is None else min(n, self.taille)
+        fin: int = self._pos + self.capacité
+        vue = self._données[fin-n:fin]
+        vue.flags.writeable = False
+        return vue
+
+    def vider(self):
+        '''Oublie toutes les valeurs, sans libérer la mémoire'''
+        self._pos = 0
+        self.taille = 0
+        self.total = 0
+
+
+class Croissant:
+    '''Colonne de valeurs sans limite de taille
+
+    Même interface qu':py:class:`Anneau`. Le tableau double de taille quand
+    il est plein: les ajouts coûtent en moyenne O(1) par valeur, et les
+    ``n`` dernières valeurs sont toujours une vue contiguë.
+
+    Parameters
+    ----------
+    dtype
+        Type des valeurs, voir :py:class:`numpy.dtype`
+    capacité
+        Taille initiale du tableau
+    '''
+
+    capacité: None = None #: Pas de capacité maximale
+
+    def __init__(self, dtype: npt.DTypeLike = np.float64, capacité: int = CAPACITÉ_INITIALE):
+        self._données: np.ndarray = np.zeros(max(capacité, 1), dtype=dtype)
+        self.taille: int = 0 #: Nombre de valeurs
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._données.dtype
+
+    @property
+    def total(self) -> int:
+        '''Nombre de valeurs écrites depuis le début, comme :py:attr:`Anneau.total`'''
+        return self.taille
+
+    def __len__(self) -> int:
+        return self.taille
+
+    def ajouter(self, valeurs: npt.ArrayLike):
+        '''Ajoute des valeurs à la fin, en agrandissant le tableau au besoin'''
+        valeurs = np.asarray(valeurs, dtype=self.dtype).ravel()
+        fin: int = self.taille + valeurs.size
+        if fin > self._données.size:
+            données = np.empty(max(2 * self._données.size, fin), dtype=self.dtype)
+            données[:self.taille] = self._données[:self.taille]
+            self._données = données
+        self._données[self.taille:fin] = valeurs
+        self.taille = fin
+
+    def dernier(self, n: int | None = None) -> np.ndarray:
+        '''Vue des ``n`` dernières valeurs, voir :py:meth:`Anneau.dernier`
+
+        La vue n'est valide que jusqu'au prochain appel de :py:meth:`ajouter`,
+        qui peut déplacer le tableau.
+        '''
+        n = self.taille if n is None else min(n, self.taille)
+        vue = self._données[self.taille-n:self.taille]
+        vue.flags.writeable = False
+        return vue
+
+    def vider(self):
+        '''Oublie toutes les valeurs, sans libérer la mémoire'''
+        self.taille = 0
+
+
+class TamponCirculaire:
+    '''Ensemble de colonnes nommées, chacune dans son propre :py:class:`Anneau`
+
+    Les colonnes sont indépendantes: elles n'ont pas besoin d'avoir la même
+    longueur. La transformée de Fourier, qui a moitié moins de valeurs que
+    les mesures, n'a donc pas besoin d'être complétée avec des
+    :py:data:`numpy.nan`.
+
+    Parameters
+    ----------
+    capacité
+        Nombre maximal de valeurs conservées dans chaque colonne, ou
+        dictionnaire ``{nom: capacité}`` pour des colonnes de longueurs
+        différentes. ``None`` pour tout garder, chaque colonne dans un
+        :py:class:`Croissant`.
+    colonnes
+        Noms des colonnes, ou dictionnaire ``{nom: dtype}``
+    '''
+
+    def __init__(self,
+                 capacité: int | Mapping[str, int] | None,
+                 colonnes: Iterable[str] | Mapping[str, npt.DTypeLike]):
+        if not isinstance(colonnes, Mapping):
+            colonnes = {nom: np.float64 for nom in colonnes}
+
+        self.capacité: int | Mapping[str, int] | None = capacité
+        self._anneaux: dict[str, Anneau | Croissant] = {}
+        for nom, dtype in colonnes.items():
+            c = capacité[nom] if isinstance(capacité, Mapping) else capacité
+            self._anneaux[nom] = Croissant(dtype) if c is None else Anneau(c, dtype)
+
+    @property
+    def colonnes(self) -> tuple[str, ...]:
+        return tuple(self._anneaux)
+
+    def __contains__(self, nom: str) -> bool:
+        return nom in self._anneaux
+
+    def __getitem__(self, nom: str) -> Anneau | Croissant:
+        return self._anneaux[nom]
+
+    def __len__(self) -> int:
+        '''Nombre de valeurs dans la colonne la plus courte'''
+        return min((len(a) for a in self._anneaux.values()), default=0)
+
+    def ajouter(self, nom: str, valeurs: npt.ArrayLike):
+        '''Ajoute des valeurs à la colonne ``nom``
+
+        Raises
+        ------
+        KeyError
+            Si la colonne n'existe pas.
+        '''
+        self._anneaux[nom].ajouter(valeurs)
+
+    def dernier(self, nom: str, n: int | None = None) -> np.ndarray:
+        '''Vue des ``n`` dernières valeurs de la colonne ``nom``, voir :py:meth:`Anneau.dernier`'''
+        return self._anneaux[nom].dernier(n)
+
+    def vider(self):
+        '''Oublie toutes les valeurs de toutes les colonnes'''
+        for a in self._anneaux.values():
+            a.vider()
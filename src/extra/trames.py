@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+
+'''Protocole binaire entre l'annonceur et l'auditeur
+
+En mode texte (:py:mod:`extra.parseur`), chaque mesure de 10 bits du
+convertisseur analogique-numérique prend 4 à 6 octets sur la ligne série
+(``"512, "``), et doit être reconvertie en nombre du côté de l'ordinateur.
+En mode binaire, chaque colonne d'un bloc est envoyée dans une trame:
+
+.. code-block:: text
+
+    A5 5A | canal | type | nombre      | valeurs...             | CRC-32
+    2 o   | 1 o   | 1 o  | 2 o (uint16)| nombre × taille du type | 4 o
+
+Tous les entiers sont petit-boutistes (*little-endian*), comme sur les
+micro-contrôleurs AVR et ARM. Les valeurs sont lues directement avec
+:py:func:`numpy.frombuffer`, sans conversion ni copie. Le CRC-32
+(:py:func:`zlib.crc32`) couvre l'entête et les valeurs: une trame corrompue
+est détectée et le bloc entier est rejeté.
+
+Un bloc se termine par une trame vide sur le canal :py:data:`CANAL_FIN`,
+toujours identique, :py:data:`FIN_BLOC`. Elle joue le rôle de
+:py:data:`extra.parseur.SEP_BLOC` pour :py:class:`extra.lecteur.LecteurSérie`.
+
+Le mode est choisi dans la bannière de l'annonceur, par une ligne
+``protocole=binaire`` (voir :py:func:`protocole`), et chaque bloc est
+reconnu à son premier octet par :py:func:`analyser`.
+
+La bannière décrit aussi les canaux de chaque bloc, voir :py:class:`Schéma`:
+
+.. code-block:: text
+
+    N=256
+    d=100
+    canaux=ts:u4:256,A0:u2:256,F:u2:128
+
+Chaque canal a un nom, un type (comme :py:class:`numpy.dtype`, sans l'ordre
+des octets) et un nombre de valeurs par bloc. L'auditeur réserve ainsi dès
+le départ des tableaux du bon type et de la bonne taille pour chaque canal.
+'''
+
+import struct # <https://docs.python.org/3/library/struct.html>
+import zlib
+
+import numpy as np # <https://numpy.org/>
+import numpy.typing as npt
+
+from typing import Mapping
+
+from extra.parseur import BlocInvalide, analyser_bloc, SEP_BLOC, SEP_LIGNE, SEP_NOM
+
+TEXTE: str = 'texte' #: Nom du protocole texte, voir :py:mod:`extra.parseur`
+BINAIRE: str = 'binaire' #: Nom du protocole binaire
+PROTOCOLES: tuple[str, ...] = (TEXTE, BINAIRE) #: Protocoles connus, voir :py:func:`séparateur`
+
+MAGIQUE: bytes = b'\xa5\x5a' #: Début de chaque trame, jamais présent en mode texte
+ENTÊTE = struct.Struct('<2sBBH') #: Magique, canal, type, nombre de valeurs
+CRC = struct.Struct('<I') #: CRC-32 de l'entête et des valeurs
+
+TYPES: dict[int, np.dtype] = {
+    0: np.dtype('<u1'),
+    1: np.dtype('<i2'),
+    2: np.dtype('<u2'),
+    3: np.dtype('<i4'),
+    4: np.dtype('<u4'),
+    5: np.dtype('<f4'),
+    6: np.dtype('<f8'),
+}
+'''Types de valeurs, par code envoyé dans l'entête'''
+
+CODES: dict[np.dtype, int] = {t: c for c, t in TYPES.items()}
+'''Code de l'entête, par type de valeurs'''
+
+CANAUX: tuple[str, ...] = ('ts', 'A0', 'F')
+'''Nom de la colonne de chaque canal, dans l'ordre des numéros de canal'''
+
+CANAL_FIN: int = 0xff #: Canal de la trame vide qui termine un bloc
+
+N_DÉFAUT: int = 256 #: Nombre de mesures par bloc, si la bannière ne l'annonce pas
+
+TYPES_CANAUX: dict[str, str] = {'ts': '<u4', 'A0': '<u2', 'F': '<u2'}
+'''Type de chaque canal, si la bannière n'annonce pas ses canaux
+
+Le temps vient de ``micros()``, sur 32 bits, et les mesures du CAN de 10
+bits tiennent sur 16 bits.
+'''
+
+
+def encoder_trame(canal: int, valeurs: npt.ArrayLike, dtype: npt.DTypeLike | None = None) -> bytes:
+    '''Trame binaire pour les ``valeurs`` d'un canal
+
+    Implémentation de référence du protocole, pour les tests et
+    :py:mod:`extra.simulateur`. Le programme du micro-contrôleur doit
+    produire exactement les mêmes octets.
+
+    Parameters
+    ----------
+    canal
+        Numéro du canal, de 0 à 254
+    valeurs
+        Valeurs à envoyer
+    dtype
+        Type des valeurs sur la ligne, parmi :py:data:`TYPES`. Par défaut,
+        celui de ``valeurs``.
+    '''
+    valeurs = np.asarray(valeurs, dtype=dtype)
+    # Les types natifs sont convertis en petit-boutistes, sans effet sur x86
+    # et ARM.
+    valeurs = valeurs.astype(valeurs.dtype.newbyteorder('<'), copy=False)
+    if valeurs.dtype not in CODES:
+        raise ValueError(f'Type {valeurs.dtype} non supporté, choisir parmi {list(CODES)}.')
+
+    entête = ENTÊTE.pack(MAGIQUE, canal, CODES[valeurs.dtype], valeurs.size)
+    données = entête + valeurs.tobytes()
+    return données + CRC.pack(zlib.crc32(données))
+
+
+FIN_BLOC: bytes = encoder_trame(CANAL_FIN, np.zeros(0, np.uint8))
+'''Trame qui termine chaque bloc binaire, toujours identique'''
+
+
+def encoder_bloc(mes: dict[str, npt.ArrayLike],
+                 types: dict[str, npt.DTypeLike] | None = None,
+                 canaux: tuple[str, ...] = CANAUX) -> bytes:
+    '''Bloc binaire complet, terminé par :py:data:`FIN_BLOC`
+
+    Parameters
+    ----------
+    mes
+        Valeurs de chaque colonne, ``{nom: valeurs}``
+    types
+        Type de chaque colonne sur la ligne. Par défaut, celui des valeurs.
+    canaux
+        Nom de la colonne de chaque canal
+    '''
+    types = types or {}
+    trames = (encoder_trame(canaux.index(nom), v, types.get(nom)) for nom, v in mes.items())
+    return b''.join(trames) + FIN_BLOC
+
+
+def analyser_bloc_binaire(bloc: bytes | memoryview,
+                          dtype: npt.DTypeLike | Mapping[str, npt.DTypeLike | None] | None = None,
+                          canaux: tuple[str, ...] = CANAUX) -> dict[str, np.ndarray]:
+    '''Convertit un bloc binaire complet en dictionnaire ``{nom: valeurs}``
+
+    Comme :py:func:`extra.parseur.analyser_bloc`, le bloc est validé en
+    entier avant d'être retourné.
+
+    Parameters
+    ----------
+    bloc
+        Bloc reçu, terminé ou non par :py:data:`FIN_BLOC`. Une
+        :py:class:`memoryview` (voir :py:class:`extra.lecteur.Découpeur`)
+        est lue sans copie.
+    dtype
+        Type des valeurs retournées. ``None`` pour garder le type envoyé:
+        les tableaux sont alors des vues de ``bloc``, sans copie. Un
+        dictionnaire ``{nom: dtype}`` donne le type de chaque colonne
+        (``float64`` pour les colonnes absentes).
+    canaux
+        Nom de la colonne de chaque canal
+
+    Raises
+    ------
+    BlocInvalide
+        Si le bloc est vide, tronqué, d'un canal ou d'un type inconnu, ou
+        si un CRC ne correspond pas.
+    '''
+    # Comparaisons par tranches plutôt que bytes.endswith, pour accepter
+    # aussi les memoryview.
+    if bloc[-len(FIN_BLOC):] == FIN_BLOC:
+        bloc = bloc[:-len(FIN_BLOC)]
+    if not bloc:
+        raise BlocInvalide('Bloc vide')
+
+    mes: dict[str, np.ndarray] = {}
+    i: int = 0
+    while i < len(bloc):
+        if len(bloc) - i < ENTÊTE.size + CRC.size:
+            raise BlocInvalide(f'Trame tronquée à l\'octet {i}')
+        magique, canal, code, nombre = ENTÊTE.unpack_from(bloc, i)
+        if magique != MAGIQUE:
+            raise BlocInvalide(f'Début de trame invalide à l\'octet {i}: {magique!r}')
+        if code not in TYPES:
+            raise BlocInvalide(f'Type {code} inconnu sur le canal {canal}')
+        if canal >= len(canaux):
+            raise BlocInvalide(f'Canal {canal} inconnu')
+
+        t: np.dtype = TYPES[code]
+        fin: int = i + ENTÊTE.size + nombre * t.itemsize
+        if fin + CRC.size > len(bloc):
+            raise BlocInvalide(f'Trame du canal {canal} tronquée')
+        # zlib.crc32 accepte une vue, sans copier la trame.
+        (crc,) = CRC.unpack_from(bloc, fin)
+        if zlib.crc32(memoryview(bloc)[i:fin]) != crc:
+            raise BlocInvalide(f'CRC invalide sur le canal {canal}')
+
+        valeurs = np.frombuffer(bloc, dtype=t, count=nombre, offset=i + ENTÊTE.size)
+        nom = canaux[canal]
+        sortie = dtype.get(nom, np.float64) if isinstance(dtype, Mapping) else dtype
+        mes[nom] = valeurs if sortie is None else valeurs.astype(sortie, copy=False)
+        i = fin + CRC.size
+
+    return mes
+
+
+def analyser(bloc: bytes | memoryview,
+             dtype: npt.DTypeLike | Mapping[str, npt.DTypeLike] = np.float64,
+             canaux: tuple[str, ...] = CANAUX) -> dict[str, np.ndarray]:
+    '''Convertit un bloc texte ou binaire, reconnu à son premier octet
+
+    Voir :py:func:`extra.parseur.analyser_bloc` et
+    :py:func:`analyser_bloc_binaire`. ``canaux`` ne sert qu'aux blocs
+    binaires, voir :py:attr:`Schéma.noms`.
+    '''
+    if bloc[:len(MAGIQUE)] == MAGIQUE:
+        return analyser_bloc_binaire(bloc, dtype, canaux)
+    return analyser_bloc(bloc, dtype)
+
+
+def paramètres(bannière: bytes) -> dict[str, str]:
+    '''Paramètres ``nom=valeur`` de la bannière de l'annonceur'''
+    paramètres: dict[str, str] = {}
+    for ligne in bytes(bannière).strip().split(SEP_LIGNE):
+        nom, _, valeur = ligne.partition(SEP_NOM)
+        if valeur:
+            paramètres[nom.strip().decode('utf-8')] = valeur.strip().decode('utf-8')
+    return paramètres
+
+
+def protocole(bannière: bytes) -> str:
+    '''Protocole annoncé par la bannière de l'annonceur
+
+    Une ligne ``protocole=binaire`` sélectionne :py:data:`BINAIRE`. Sans
+    cette ligne, l'annonceur utilise le protocole :py:data:`TEXTE`.
+    '''
+    for ligne in bannière.strip().split(SEP_LIGNE):
+        nom, _, valeur = ligne.partition(SEP_NOM)
+        if nom.strip() == b'protocole':
+            return valeur.strip().decode('utf-8')
+    return TEXTE
+
+
+def séparateur(protocole: str) -> bytes:
+    '''Séquence qui termine chaque bloc dans le ``protocole`` donné'''
+    return {TEXTE: SEP_BLOC, BINAIRE: FIN_BLOC}[protocole]
+
+
+class Schéma:
+    '''Description des blocs de l'annonceur, lue dans sa bannière
+
+    Voir :py:func:`schéma`.
+
+    Parameters
+    ----------
+    N
+        Nombre de mesures par bloc
+    d
+        Période d'échantillonage, en µs, ou ``None`` si elle n'est pas
+        annoncée
+    protocole
+        :py:data:`TEXTE` ou :py:data:`BINAIRE`
+    canaux
+        ``{nom: (dtype, longueur)}``, dans l'ordre des numéros de canal. Par
+        défaut, ``ts`` et ``A0`` de ``N`` valeurs et ``F`` de ``N // 2``
+        valeurs, avec les types de :py:data:`TYPES_CANAUX`.
+    '''
+
+    def __init__(self,
+                 N: int = N_DÉFAUT,
+                 d: float | None = None,
+                 protocole: str = TEXTE,
+                 canaux: dict[str, tuple[npt.DTypeLike, int]] | None = None):
+        if canaux is None:
+            longueurs = {'ts': N, 'A0': N, 'F': N // 2}
+            canaux = {nom: (TYPES_CANAUX[nom], n) for nom, n in longueurs.items()}
+
+        self.N: int = N
+        self.d: float | None = d
+        self.protocole: str = protocole
+        self.canaux: dict[str, tuple[np.dtype, int]] = {
+            nom: (np.dtype(t), int(n)) for nom, (t, n) in canaux.items()
+        }
+
+    @property
+    def noms(self) -> tuple[str, ...]:
+        '''Nom de chaque canal, dans l'ordre des numéros de canal'''
+        return tuple(self.canaux)
+
+    @property
+    def types(self) -> dict[str, np.dtype]:
+        '''Type de chaque canal sur la ligne, ``{nom: dtype}``'''
+        return {nom: t for nom, (t, n) in self.canaux.items()}
+
+    @property
+    def longueurs(self) -> dict[str, int]:
+        '''Nombre de valeurs de chaque canal par bloc, ``{nom: longueur}``'''
+        return {nom: n for nom, (t, n) in self.canaux.items()}
+
+    @property
+    def fréquence(self) -> float | None:
+        '''Fréquence d'échantillonage annoncée, en Hz'''
+        return None if not self.d else 1e6 / self.d
+
+    def valider(self, mes: dict[str, np.ndarray]):
+        '''Vérifie que chaque canal d'un bloc a le nombre de valeurs annoncé
+
+        Les canaux absents du schéma ne sont pas vérifiés.
+
+        Raises
+        ------
+        BlocInvalide
+            Si un canal a trop ou pas assez de valeurs.
+        '''
+        for nom, n in self.longueurs.items():
+            if nom in mes and mes[nom].size != n:
+                raise BlocInvalide(f'{mes[nom].size} valeurs sur le canal {nom}, {n} attendues')
+
+    def bannière(self) -> bytes:
+        '''Bannière qui annonce ce schéma, terminée par :py:data:`extra.parseur.SEP_BLOC`'''
+        paramètres = {'N': self.N}
+        if self.d is not None:
+            paramètres['d'] = f'{self.d:g}'
+        if self.protocole != TEXTE:
+            paramètres['protocole'] = self.protocole
+        # L'ordre des octets est toujours petit-boutiste: seul le code du
+        # type est envoyé, eg: 'u4' pour '<u4'.
+        paramètres['canaux'] = ','.join(f'{nom}:{t.str[1:]}:{n}' for nom, (t, n) in self.canaux.items())
+        lignes = (f'{nom}={v}'.encode() for nom, v in paramètres.items())
+        return SEP_LIGNE.join(lignes) + SEP_BLOC
+
+
+def schéma(bannière: bytes) -> Schéma:
+    '''Schéma des blocs annoncé par la bannière de l'annonceur
+
+    Chaque ligne ``nom=valeur`` de la bannière est un paramètre. ``N``,
+    ``d``, ``protocole`` et ``canaux`` sont reconnus, les autres sont
+    ignorés. Sans ligne ``canaux``, les canaux par défaut de
+    :py:class:`Schéma` sont utilisés.
+
+    Raises
+    ------
+    BlocInvalide
+        Si un paramètre reconnu n'a pas le bon format, ou si le protocole
+        n'est pas dans :py:data:`PROTOCOLES`.
+    '''
+    p = paramètres(bannière)
+    try:
+        N = int(p.get('N', N_DÉFAUT))
+        d = float(p['d']) if 'd' in p else None
+        canaux = None
+        if 'canaux' in p:
+            canaux = {}
+            for canal in p['canaux'].split(','):
+                nom, code, n = canal.strip().split(':')
+                canaux[nom] = (np.dtype('<' + code), int(n))
+    except (ValueError, TypeError) as e:
+        raise BlocInvalide(f'Bannière invalide: {bytes(bannière)[:80]!r}') from e
+
+    protocole = p.get('protocole', TEXTE)
+    if protocole not in PROTOCOLES:
+        raise BlocInvalide(f'Protocole {protocole!r} inconnu, choisir parmi {list(PROTOCOLES)}.')
+
+    return Schéma(N, d, protocole, canaux)
@@ -29,10 +29,19 @@ void set_PF(unsigned char);
 // Si vous voulez mesurer les valeurs de plus de diodes,
 // Augmentez la valeur de N_broches et ajoutez des valeurs
 // aux listes en conséquence.
+//
+// La mémoire vive du Nano Every est de 6ko: chaque mesure prend 4 octets
+// pour le temps et 2 par broche, soit 4000 octets pour 500 mesures de 2
+// broches. Réduisez M_mesures si vous ajoutez des broches.
 #define N_broches 2 // Nombre de broches
-#define M_mesures 1700 // Nombre de mesures
+#define M_mesures 500 // Nombre de mesures
 const unsigned char broche[N_broches] = {A0, A1}; // Liste pour les broches de lecture
-unsigned char mesure[N_broches+1][M_mesures]; // Liste pour les lectures analogiques
+// micros() compte sur 32 bits: dans un unsigned char, le temps reviendrait
+// à zéro toutes les 256µs, et le client ne pourrait pas remettre les
+// mesures en ordre.
+unsigned long temps[M_mesures]; // Temps de chaque mesure, en µs
+// analogRead retourne 10 bits: un unsigned char n'en garderait que 8.
+unsigned int mesure[N_broches][M_mesures]; // Liste pour les lectures analogiques
 
 // Initialisation du port série à 115200 bits par seconde et un timeout de DELAI
 void setup() {
@@ -48,9 +57,9 @@ unsigned int j = 0;
 
 void loop() {
 	// Lecture des données des ports de conversion analogiques
-	mesure[0][j] = micros();
+	temps[j] = micros();
 	for (unsigned char i=0; i < N_broches; i++) {
-		mesure[i+1][j] = analogRead(broche[i]);
+		mesure[i][j] = analogRead(broche[i]);
 	}
 	
 	// Serial.available retourne le nombre d'octets (max. 64o) disponibles
@@ -61,9 +70,16 @@ void loop() {
 		// client via la communication série.
 		Serial.read(); // Lire 1 octet
 		
-		// Envoyer toutes les données récoltées d'un coup
-		for (unsigned char n=0; n<=N_broches; n++) {
-			Serial.print(n);
+		// Envoyer toutes les données récoltées d'un coup: la ligne 0 pour
+		// le temps, puis une ligne par broche.
+		Serial.print(0);
+		for (int m=0; m<M_mesures; m++) {
+			Serial.print(F("\t"));
+			Serial.print(temps[m]);
+		}
+		Serial.println();
+		for (unsigned char n=0; n<N_broches; n++) {
+			Serial.print(n+1);
 			for (int m=0; m<M_mesures; m++) {
 				Serial.print(F("\t"));
 				Serial.print(mesure[n][m]);
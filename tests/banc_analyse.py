@@ -0,0 +1,115 @@
+'''Analyse lourde de chaque bloc, dans le programme principal ou en parallèle
+
+Compare trois façons d'appliquer une analyse lente (:py:func:`lourde`, une
+boucle Python de quelques ms par bloc) à :py:data:`BLOCS` blocs de
+:py:data:`N` mesures:
+
+``séquentiel``
+    Dans le programme principal, comme les fonctions de
+    :py:func:`auditeur.acquérir`: l'acquisition attend chaque analyse.
+``pickle``
+    Avec :py:meth:`concurrent.futures.ProcessPoolExecutor.submit`, les
+    tableaux étant copiés par :py:mod:`pickle` à chaque bloc.
+``mémoire partagée``
+    Avec :py:class:`extra.analyse.AnalyseParallèle`.
+
+Pour chacune, le banc rapporte le débit total d'analyse, et le temps que le
+programme principal passe à envoyer chaque bloc et à récupérer les
+résultats: c'est le temps volé à l'acquisition.
+
+.. code-block:: console
+
+    $ python3 tests/banc_analyse.py
+'''
+
+import sys
+import time
+import multiprocessing
+import concurrent.futures
+from collections import deque
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import numpy as np
+
+from extra.analyse import AnalyseParallèle, TRAVAILLEURS
+
+N: int = 1024 #: Nombre de mesures par bloc
+BLOCS: int = 400 #: Nombre de blocs analysés par essai
+
+
+def lourde(ts: np.ndarray, A0: np.ndarray) -> int:
+    '''Détection naïve des maximums locaux, mesure par mesure'''
+    pics = 0
+    for i in range(1, A0.size - 1):
+        if A0[i - 1] < A0[i] >= A0[i + 1] and ts[i] > ts[i - 1]:
+            pics += 1
+    return pics
+
+
+def blocs() -> list[dict[str, np.ndarray]]:
+    rng = np.random.default_rng(0)
+    return [{'ts': np.arange(i * N, (i + 1) * N, dtype='<i8') * 100,
+             'A0': rng.integers(0, 1024, N).astype('<i2')}
+            for i in range(BLOCS)]
+
+
+def séquentiel(données: list[dict]) -> tuple[float, float, list]:
+    début = time.perf_counter()
+    résultats = [lourde(**b) for b in données]
+    durée = time.perf_counter() - début
+    return durée, durée, résultats
+
+
+def par_pickle(données: list[dict], travailleurs: int) -> tuple[float, float, list]:
+    contexte = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(travailleurs, mp_context=contexte) as exécuteur:
+        # Les processus sont démarrés avant de chronométrer.
+        list(exécuteur.map(abs, range(travailleurs)))
+        envoyés: deque = deque()
+        résultats = []
+        principal = 0.
+        début = time.perf_counter()
+        for b in données:
+            t = time.perf_counter()
+            if len(envoyés) >= 2 * travailleurs:
+                résultats.append(envoyés.popleft().result())
+            envoyés.append(exécuteur.submit(lourde, **b))
+            principal += time.perf_counter() - t
+        résultats += [f.result() for f in envoyés]
+        durée = time.perf_counter() - début
+    return durée, principal, résultats
+
+
+def partagée(données: list[dict], travailleurs: int) -> tuple[float, float, list]:
+    with AnalyseParallèle(lourde, {'ts': '<i8', 'A0': '<i2'}, N, travailleurs) as analyse:
+        analyse.soumettre(**données[0])
+        list(analyse.attendre())
+        résultats = []
+        principal = 0.
+        début = time.perf_counter()
+        for b in données:
+            t = time.perf_counter()
+            analyse.soumettre(**b)
+            résultats += analyse.prêts()
+            principal += time.perf_counter() - t
+        résultats += analyse.attendre()
+        durée = time.perf_counter() - début
+    return durée, principal, résultats
+
+
+if __name__ == '__main__':
+    données = blocs()
+    référence = None
+    print(f'{TRAVAILLEURS} processus, {BLOCS} blocs de {N} mesures')
+    print('méthode\t\t\tblocs/s\t\tprincipal (ms/bloc)')
+    for nom, essai in (('séquentiel', séquentiel),
+                       ('pickle', lambda d: par_pickle(d, TRAVAILLEURS)),
+                       ('mémoire partagée', lambda d: partagée(d, TRAVAILLEURS))):
+        durée, principal, résultats = essai(données)
+        # Les résultats doivent être les mêmes, dans le même ordre.
+        if référence is None:
+            référence = résultats
+        assert résultats == référence, nom
+        print(f'{nom:<16}\t{BLOCS / durée:8.0f}\t{principal / BLOCS * 1e3:8.3f}')
@@ -0,0 +1,63 @@
+'''Banc d'essai du protocole binaire contre le protocole texte
+
+Un faux annonceur (:py:class:`extra.simulateur.PseudoAnnonceur`) limité à
+:py:data:`DEBIT` envoie des blocs en texte, puis en binaire. Les blocs sont
+lus comme dans ``auditeur.setup``: bannière, puis
+:py:class:`extra.lecteur.LecteurSérie` avec le séparateur du protocole
+annoncé, et analysés par :py:func:`extra.trames.analyser`.
+
+Affiche le nombre de mesures reçues par seconde, et le temps d'analyse
+d'un bloc.
+
+Fonctionne sous Linux et macOS, sans micro-contrôleur.
+
+.. code-block:: console
+
+    $ python3 tests/banc_binaire.py
+'''
+
+import sys
+import time
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import serial
+
+from extra.lecteur import LecteurSérie
+from extra.parseur import SEP_BLOC, BlocInvalide
+from extra.simulateur import PseudoAnnonceur, bloc, bloc_binaire
+from extra.trames import analyser, protocole, séparateur, TEXTE, BINAIRE
+
+DEBIT: int = 1000000 #: Débit simulé, comme ``auditeur.DEBIT``
+DURÉE: float = 2. #: Durée de chaque essai, en secondes
+
+def essai(mode: str) -> tuple[float, int]:
+    '''Mesures de ``A0`` reçues par seconde, et nombre de blocs invalides'''
+    with PseudoAnnonceur(débit=DEBIT, protocole=mode) as annonceur:
+        ser = serial.Serial(annonceur.port, timeout=0.1)
+        bannière = ser.read_until(SEP_BLOC)
+        assert protocole(bannière) == mode
+
+        mesures, invalides = 0, 0
+        with LecteurSérie(ser, séparateur=séparateur(protocole(bannière))) as lecteur:
+            fin = time.monotonic() + DURÉE
+            while time.monotonic() < fin:
+                b = lecteur.prendre(0.1)
+                if not b:
+                    continue
+                try:
+                    mesures += analyser(b)['A0'].size
+                except BlocInvalide:
+                    invalides += 1
+
+    return mesures / DURÉE, invalides
+
+if __name__ == '__main__':
+    print('protocole\toctets/bloc\tanalyse (µs)\tmesures/s\tinvalides')
+    for mode, générer in ((TEXTE, bloc), (BINAIRE, bloc_binaire)):
+        exemple = générer()
+        t = min(timeit.repeat(lambda: analyser(exemple), number=1000, repeat=3)) * 1e3
+        débit, invalides = essai(mode)
+        print(f'{mode}\t{len(exemple):10d}\t{t:10.1f}\t{débit:10.0f}\t{invalides:5d}')
@@ -0,0 +1,113 @@
+'''Précision et coût de la cadence des mesures des clients
+
+Compare trois façons d'appeler une mesure à :py:data:`client.base.FREQ` Hz
+(et plus vite), la mesure elle-même étant simulée par une attente de
+:py:data:`TRAVAIL` secondes:
+
+``attente active``
+    L'ancienne boucle des clients: vérifier l'heure sans arrêt, et mesurer
+    quand ``ESPACEMENT`` est écoulé depuis la dernière mesure.
+``délai fixe``
+    Mesurer, puis dormir une période.
+``Périodique``
+    :py:class:`extra.decorators.Périodique`, avec et sans attente active
+    pour la fin de l'attente (:py:data:`extra.decorators.MARGE`).
+
+Pour chaque façon, le banc rapporte l'écart entre les intervalles obtenus
+et la période (médiane et 99e centile), la dérive accumulée par rapport aux
+échéances idéales à la fin de l'essai (une échéance sautée compte pour une
+période), et le temps de processeur utilisé.
+
+.. code-block:: console
+
+    $ python3 tests/banc_cadence.py
+'''
+
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import numpy as np
+
+from extra.decorators import Périodique
+
+FRÉQUENCES: tuple[float, ...] = (10., 100., 1000.) #: Fréquences essayées, en Hz
+DURÉE: float = 2. #: Durée de chaque essai, en secondes
+TRAVAIL: float = 200e-6 #: Durée simulée d'une mesure, en secondes
+
+
+def mesure():
+    time.sleep(TRAVAIL)
+
+
+def attente_active(fréquence: float, fin: float) -> list[int]:
+    espacement = int(1e9 / fréquence)
+    heures = []
+    dernière = time.monotonic_ns() - espacement
+    while time.monotonic() < fin:
+        if time.monotonic_ns() > dernière + espacement:
+            dernière = time.monotonic_ns()
+            heures.append(dernière)
+            mesure()
+    return heures
+
+
+def délai_fixe(fréquence: float, fin: float) -> list[int]:
+    heures = []
+    while time.monotonic() < fin:
+        heures.append(time.monotonic_ns())
+        mesure()
+        time.sleep(1 / fréquence)
+    return heures
+
+
+def périodique(marge: float | None) -> Callable[[float, float], list[int]]:
+    def essai(fréquence: float, fin: float) -> list[int]:
+        cadence = Périodique(fréquence) if marge is None else Périodique(fréquence, marge)
+        heures = []
+        while time.monotonic() < fin:
+            cadence.attendre()
+            heures.append(time.monotonic_ns())
+            mesure()
+        return heures
+    return essai
+
+
+MÉTHODES: dict[str, Callable[[float, float], list[int]]] = {
+    'attente active': attente_active,
+    'délai fixe': délai_fixe,
+    'Périodique, marge 0': périodique(0.),
+    'Périodique': périodique(None),
+}
+'''Méthodes comparées'''
+
+
+def essai(méthode: Callable[[float, float], list[int]], fréquence: float) -> dict[str, float]:
+    cpu = time.process_time()
+    début = time.monotonic()
+    heures = np.array(méthode(fréquence, début + DURÉE))
+    cpu = (time.process_time() - cpu) / (time.monotonic() - début)
+
+    période = 1e9 / fréquence
+    écarts = np.abs(np.diff(heures) - période) * 1e-3
+    # Écart de la dernière mesure par rapport à l'échéance idéale
+    dérive = (heures[-1] - heures[0] - (heures.size - 1) * période) * 1e-6
+    return {
+        'mesures': heures.size,
+        'écart p50 (µs)': float(np.percentile(écarts, 50)),
+        'écart p99 (µs)': float(np.percentile(écarts, 99)),
+        'dérive (ms)': dérive,
+        'CPU (%)': cpu * 100,
+    }
+
+
+if __name__ == '__main__':
+    for fréquence in FRÉQUENCES:
+        print(f'\n{fréquence:g} Hz')
+        print('méthode\t\t\tmesures\técart p50 (µs)\técart p99 (µs)\tdérive (ms)\tCPU (%)')
+        for nom, méthode in MÉTHODES.items():
+            r = essai(méthode, fréquence)
+            print(f'{nom:<20}\t' + '\t'.join(f'{v:.4g}\t' for v in r.values()))
@@ -0,0 +1,81 @@
+'''Banc d'essai des requêtes de ``client.base.prendre_mesure``
+
+Un faux ``serveur/base`` (:py:class:`extra.simulateur.PseudoServeur`), qui
+simule la latence USB, le temps de lecture des broches et le débit de
+115200 baud, est interrogé pendant :py:data:`DURÉE` secondes:
+
+- à l'ancienne, une requête et une attente active par photodiode;
+- avec des requêtes groupées, pour une mesure à la fois (``lot=1``);
+- avec des requêtes groupées, pour autant de mesures que le tampon de
+  réception du micro-contrôleur le permet.
+
+Affiche le nombre de mesures complètes (toutes les photodiodes) par seconde
+et l'utilisation du processeur, selon le nombre de photodiodes.
+
+Fonctionne sous Linux et macOS, sans micro-contrôleur.
+
+.. code-block:: console
+
+    $ python3 tests/banc_client.py
+'''
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import serial
+
+from client.base import mesures, prendre_mesure, DEBIT, DELAI, TAMPON_RX
+from extra.simulateur import PseudoServeur
+
+DURÉE: float = 2. #: Durée de chaque essai, en secondes
+
+def ancien(res: list[list[int]], ser: serial.Serial) -> list[list[int]]:
+    '''L'ancienne version de ``client.base.prendre_mesure``'''
+    mes: list[float] = [time.process_time_ns()]
+    for i in bytes(range(1, len(res))):
+        ser.write(bytes([i-1]))
+        ser.flush()
+        while not ser.in_waiting: time.sleep(0.000000001)
+        mes.append(int(ser.readline()))
+    for r, m in zip(res, mes):
+        r.append(m)
+    return res
+
+def essai(broches: int, mesurer, listes: bool = False) -> tuple[float, float]:
+    '''Mesures par seconde, et fraction d'un cœur utilisée
+
+    ``listes`` pour garder les mesures dans des listes Python, comme
+    :py:func:`ancien`, plutôt que dans :py:func:`client.base.mesures`.
+    '''
+    with PseudoServeur(broches, débit=DEBIT) as serveur:
+        ser = serial.Serial(serveur.port, timeout=max(DELAI, 0.1))
+        res = [[] for _ in range(broches + 1)] if listes else mesures(broches, None)
+
+        début, cpu = time.monotonic(), time.process_time()
+        while time.monotonic() - début < DURÉE:
+            mesurer(res, ser)
+        durée = time.monotonic() - début
+        cpu = time.process_time() - cpu
+        ser.close()
+
+    if listes:
+        assert all(len(r) == len(res[0]) for r in res)
+        total = len(res[0])
+    else:
+        assert all(res[c].total == res['t'].total for c in res.colonnes)
+        total = res['t'].total
+    # Le fil du faux serveur est dans le même processus: son temps de
+    # processeur est inclus, mais il dort presque tout le temps.
+    return total / durée, cpu / durée
+
+if __name__ == '__main__':
+    print('photodiodes\tancien\t\tlot=1\t\tlot max\t\t(mesures/s, % CPU)')
+    for broches in (1, 2, 4, 8):
+        lot_max = TAMPON_RX // broches
+        résultats = [essai(broches, ancien, listes=True),
+                     essai(broches, lambda res, ser: prendre_mesure(res, ser, 1)),
+                     essai(broches, lambda res, ser: prendre_mesure(res, ser, lot_max))]
+        print(f'{broches}\t' + '\t'.join(f'{m:7.0f} {c:4.0%}' for m, c in résultats))
@@ -0,0 +1,311 @@
+'''Banc d'essai de bout en bout de l'auditeur et des clients
+
+Fait tourner l'acquisition de chaque programme, sans affichage, contre un
+faux micro-contrôleur sur un pseudo-terminal:
+
+- ``auditeur``, contre :py:class:`extra.simulateur.PseudoAnnonceur`, pour
+  plusieurs tailles de bloc (``N_max``), protocoles et débits;
+- ``client.base``, contre :py:class:`extra.simulateur.PseudoServeur`, pour
+  plusieurs nombres de photodiodes et débits;
+- ``client.rapide``, contre :py:class:`extra.simulateur.PseudoServeurRapide`,
+  de même: les échantillons/s se comparent directement à ceux de
+  ``client.base``.
+
+Chaque essai tourne dans un processus neuf, pour que la mémoire maximale
+(RSS) de l'un ne compte pas dans l'autre. Pour chaque essai, le banc
+rapporte:
+
+``blocs/s``
+    Blocs analysés (auditeur), cycles de requêtes (``client.base``) ou
+    rafales (``client.rapide``) par seconde
+``échantillons/s``
+    Valeurs reçues par seconde, toutes colonnes de mesure confondues
+``boucle p50/p99``
+    Temps entre l'arrivée d'un bloc et la fin de son analyse (auditeur), ou
+    durée d'un cycle de requêtes ou d'une rafale (clients), en ms
+``retard p50/p99``
+    Attente d'un bloc dans la file de :py:class:`extra.lecteur.LecteurSérie`
+    avant d'être analysé, en ms (auditeur seulement)
+``RSS``
+    Mémoire maximale du processus, en Mio
+``perdus``
+    Blocs abandonnés parce que la file était pleine (auditeur), mesures
+    demandées mais jamais reçues complètes (``client.base``), ou rafales
+    sans nouvelle mesure (``client.rapide``)
+``invalides``
+    Blocs reçus mais rejetés par l'analyse (auditeur seulement)
+
+Avec ``--json``, les résultats sont écrits dans un fichier, avec la version
+du code et de la plate-forme, pour suivre les régressions d'une version à
+l'autre. ``--référence`` compare avec un fichier produit plus tôt.
+
+Fonctionne sous Linux et macOS, sans micro-contrôleur.
+
+.. code-block:: console
+
+    $ python3 tests/banc_complet.py --json banc.json
+    $ git switch autre-branche
+    $ python3 tests/banc_complet.py --référence banc.json
+'''
+
+import sys
+import argparse
+import concurrent.futures
+import datetime
+import itertools
+import json
+import logging
+import multiprocessing
+import platform
+import resource
+import subprocess
+import time
+from pathlib import Path
+
+RACINE: Path = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RACINE / 'src'))
+
+import numpy as np
+import serial
+
+from extra.simulateur import PseudoAnnonceur, PseudoServeur, PseudoServeurRapide, PseudoTerminal
+from extra.trames import TEXTE, BINAIRE
+
+DURÉE: float = 2. #: Durée de chaque essai, en secondes
+
+#: Paramètres des essais de chaque programme, toutes les combinaisons sont essayées.
+GRILLES: dict[str, dict[str, tuple]] = {
+    'auditeur': {'N': (64, 256, 1024), 'protocole': (TEXTE, BINAIRE), 'débit': (115200, 1000000, None)},
+    'client.base': {'broches': (1, 2, 4, 8), 'débit': (115200, 1000000)},
+    'client.rapide': {'broches': (1, 2, 4, 8), 'débit': (115200, 1000000)},
+}
+
+MÉTRIQUES: tuple[str, ...] = ('blocs/s', 'échantillons/s', 'boucle p50', 'boucle p99',
+                              'retard p50', 'retard p99', 'RSS', 'perdus', 'invalides')
+'''Colonnes du tableau affiché, dans l'ordre'''
+
+ns2ms: float = 1e-6 #: Conversion de ns à ms
+
+
+def centiles(durées: list[int]) -> tuple[float, float]:
+    '''Médiane et 99e centile, en ms'''
+    if not durées:
+        return float('nan'), float('nan')
+    p50, p99 = np.percentile(durées, (50, 99))
+    return float(p50) * ns2ms, float(p99) * ns2ms
+
+
+def rss() -> float:
+    '''Mémoire maximale du processus, en Mio'''
+    maximum = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # En octets sous macOS, en kio ailleurs
+    return maximum / 2**20 if sys.platform == 'darwin' else maximum / 2**10
+
+
+def ouvrir(simulateur: PseudoTerminal, timeout: float) -> serial.Serial:
+    '''Ouvre le port avant de démarrer le faux micro-contrôleur
+
+    :py:class:`serial.Serial` vide le tampon d'entrée à l'ouverture: la
+    bannière de l'annonceur serait perdue si elle était déjà écrite.
+    '''
+    ser = serial.Serial(simulateur.port, timeout=timeout)
+    simulateur.start()
+    return ser
+
+
+def essai_auditeur(N: int, protocole: str, débit: int | None, durée: float) -> dict[str, float]:
+    '''Acquisition de l'auditeur: lecture, analyse, horloge et transformée de Fourier'''
+    import auditeur
+    from extra.fft import STFT
+    from extra.horloge import Horloge
+    from extra.lecteur import Découpeur, LecteurSérie
+    from extra.trames import schéma as lire_schéma, séparateur
+
+    annonceur = PseudoAnnonceur(N, débit, protocole=protocole)
+    try:
+        ser = Découpeur(ouvrir(annonceur, timeout=1))
+        schéma = lire_schéma(ser.read_until()) # Bannière
+        ser.séparateur = séparateur(schéma.protocole)
+        lecteur = LecteurSérie(ser)
+        lecteur.start()
+
+        res = auditeur.mesures(schéma, 16 * N)
+        spectre = STFT(N, 'hann', saut=N // 2)
+        horloge = Horloge(unité=auditeur.us)
+
+        boucles: list[int] = []
+        retards: list[int] = []
+        début = time.perf_counter()
+        while time.perf_counter() - début < durée:
+            reçus = lecteur.reçus - lecteur.en_attente
+            if auditeur.acquérir(res, lecteur, spectre, horloge, délai=0.1, schéma=schéma):
+                # L'heure d'arrivée est prise par le fil de lecture, avec
+                # :py:func:`time.monotonic_ns`.
+                boucles.append(time.monotonic_ns() - lecteur.arrivée)
+            if lecteur.reçus - lecteur.en_attente > reçus:
+                retards.append(lecteur.retard)
+        durée = time.perf_counter() - début
+        lecteur.close()
+    finally:
+        annonceur.arrêter()
+
+    valides = res['ts'].total // N
+    return {
+        'blocs/s': valides / durée,
+        'échantillons/s': res['A0'].total / durée,
+        'boucle p50': centiles(boucles)[0],
+        'boucle p99': centiles(boucles)[1],
+        'retard p50': centiles(retards)[0],
+        'retard p99': centiles(retards)[1],
+        'RSS': rss(),
+        'perdus': lecteur.perdus,
+        'invalides': lecteur.reçus - lecteur.perdus - lecteur.en_attente - valides,
+    }
+
+
+def essai_client(module: str, broches: int, débit: int, durée: float) -> dict[str, float]:
+    '''Requêtes et lecture des réponses d'un client, ``client.base`` ou ``client.rapide``'''
+    import importlib
+    from client.base import mesures
+    from extra.horloge import Horloge
+    client = importlib.import_module(module)
+
+    if module == 'client.rapide':
+        # Une rafale par appel, datée par l'horloge du micro-contrôleur
+        serveur = PseudoServeurRapide(broches, débit=débit)
+        options = {'horloge': Horloge(unité=client.us)}
+    else:
+        # Le plus gros lot que le tampon de réception accepte
+        serveur = PseudoServeur(broches, débit=débit)
+        options = {'lot': client.TAMPON_RX // broches}
+    try:
+        ser = ouvrir(serveur, timeout=max(client.DELAI, 0.1))
+        res = mesures(broches)
+
+        boucles: list[int] = []
+        cycles = demandés = 0
+        début = time.perf_counter()
+        while time.perf_counter() - début < durée:
+            t = time.perf_counter_ns()
+            avant = res['t'].total
+            client.prendre_mesure(res, ser, **options)
+            cycles += 1
+            demandés += options.get('lot', 0)
+            if res['t'].total > avant:
+                boucles.append(time.perf_counter_ns() - t)
+            if hasattr(client, 'remplissage'):
+                # Attendre que la mémoire du micro-contrôleur soit remplie
+                # de nouvelles mesures, comme le programme.
+                time.sleep(min(client.remplissage(res), max(0., durée - time.perf_counter() + début)))
+        durée = time.perf_counter() - début
+        ser.close()
+    finally:
+        serveur.arrêter()
+
+    return {
+        'blocs/s': cycles / durée,
+        'échantillons/s': res['t'].total * broches / durée,
+        'boucle p50': centiles(boucles)[0],
+        'boucle p99': centiles(boucles)[1],
+        'retard p50': float('nan'),
+        'retard p99': float('nan'),
+        'RSS': rss(),
+        'perdus': demandés - res['t'].total if demandés else cycles - len(boucles),
+        'invalides': 0,
+    }
+
+
+def essai(programme: str, paramètres: dict, durée: float) -> dict:
+    '''Un essai, exécuté dans un processus séparé'''
+    logging.basicConfig(level=logging.ERROR)
+    résultat = {'programme': programme, **paramètres}
+    try:
+        if programme == 'auditeur':
+            résultat |= essai_auditeur(**paramètres, durée=durée)
+        else:
+            résultat |= essai_client(programme, **paramètres, durée=durée)
+    except Exception as e:
+        # Un programme qui plante est rapporté, sans arrêter le banc.
+        résultat['erreur'] = f'{type(e).__name__}: {e}'
+    return résultat
+
+
+def version() -> dict[str, str]:
+    '''Version du code et de la plate-forme, pour comparer des résultats'''
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RACINE,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = 'inconnu'
+    return {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pyserial': serial.__version__,
+        'plateforme': platform.platform(),
+        'processeur': platform.processor() or platform.machine(),
+    }
+
+
+def clé(résultat: dict) -> tuple:
+    '''Identifiant d'un essai, pour le retrouver dans un autre fichier'''
+    return tuple((k, v) for k, v in résultat.items() if k not in MÉTRIQUES and k != 'erreur')
+
+
+def afficher(résultats: list[dict], référence: list[dict] | None = None):
+    '''Tableau des résultats, avec la variation par rapport à la référence'''
+    anciens = {clé(r): r for r in référence or []}
+    for programme, groupe in itertools.groupby(résultats, lambda r: r['programme']):
+        groupe = list(groupe)
+        noms = [k for k in GRILLES[programme]]
+        print(f'\n{programme}')
+        print('\t'.join(noms + list(MÉTRIQUES)))
+        for r in groupe:
+            cellules = [str(r[k]) for k in noms]
+            if 'erreur' in r:
+                print('\t'.join(cellules + [r['erreur']]))
+                continue
+            cellules += [f'{r[m]:.4g}' for m in MÉTRIQUES]
+            ancien = anciens.get(clé(r))
+            if ancien and 'erreur' not in ancien and ancien['échantillons/s']:
+                variation = r['échantillons/s'] / ancien['échantillons/s'] - 1
+                cellules.append(f'({variation:+.0%})')
+            print('\t'.join(cellules))
+
+
+if __name__ == '__main__':
+    arguments = argparse.ArgumentParser(description=__doc__.partition('\n')[0])
+    arguments.add_argument('--durée', type=float, default=DURÉE,
+                           help='durée de chaque essai, en secondes')
+    arguments.add_argument('--programmes', nargs='+', choices=list(GRILLES), default=list(GRILLES),
+                           help='programmes à essayer')
+    arguments.add_argument('--json', type=Path,
+                           help='fichier où écrire les résultats')
+    arguments.add_argument('--référence', type=Path,
+                           help='résultats précédents, pour comparer les échantillons/s')
+    arguments = arguments.parse_args()
+
+    essais = [(programme, dict(zip(grille, valeurs)))
+              for programme, grille in GRILLES.items() if programme in arguments.programmes
+              for valeurs in itertools.product(*grille.values())]
+
+    # Un processus neuf par essai: max_tasks_per_child=1
+    contexte = multiprocessing.get_context('spawn')
+    résultats: list[dict] = []
+    with concurrent.futures.ProcessPoolExecutor(1, mp_context=contexte, max_tasks_per_child=1) as exécuteur:
+        for programme, paramètres in essais:
+            print(f'{programme} {paramètres}...', file=sys.stderr)
+            résultats.append(exécuteur.submit(essai, programme, paramètres, arguments.durée).result())
+
+    référence = None
+    if arguments.référence:
+        référence = json.loads(arguments.référence.read_text())['résultats']
+    afficher(résultats, référence)
+
+    if arguments.json:
+        # Les NaN ne font pas partie du JSON standard: null à la place.
+        propres = [{k: None if isinstance(v, float) and np.isnan(v) else v for k, v in r.items()}
+                   for r in résultats]
+        rapport = {**version(), 'durée': arguments.durée, 'résultats': propres}
+        arguments.json.write_text(json.dumps(rapport, ensure_ascii=False, indent=1))
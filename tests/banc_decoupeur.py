@@ -0,0 +1,61 @@
+'''Banc d'essai du découpage des blocs de la ligne série
+
+Lit :py:data:`BLOCS` blocs d'un faux annonceur
+(:py:class:`extra.simulateur.PseudoAnnonceur`) qui écrit aussi vite que
+possible, une fois avec :py:meth:`serial.Serial.read_until`, puis avec
+:py:class:`extra.lecteur.Découpeur`, et compare le nombre de blocs par
+seconde et de lectures (appels système) par bloc.
+
+Fonctionne sous Linux et macOS, sans micro-contrôleur.
+
+.. code-block:: console
+
+    $ python3 tests/banc_decoupeur.py
+'''
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import serial
+
+from extra.lecteur import Découpeur
+from extra.parseur import SEP_BLOC
+from extra.simulateur import PseudoAnnonceur
+from extra.trames import analyser, séparateur, TEXTE, BINAIRE
+
+BLOCS: int = 200 #: Nombre de blocs lus pour chaque essai
+
+class Compteur(serial.Serial):
+    '''Compte les appels à :py:meth:`read`, un appel système chacun'''
+    lectures: int = 0
+
+    def read(self, size=1):
+        self.lectures += 1
+        return super().read(size)
+
+def essai(mode: str, découper: bool) -> tuple[float, float]:
+    '''Blocs par seconde et lectures par bloc'''
+    with PseudoAnnonceur(protocole=mode) as annonceur:
+        ser = Compteur(annonceur.port, timeout=1)
+        ser.read_until(SEP_BLOC) # Bannière
+        sep = séparateur(mode)
+        lecteur = Découpeur(ser, sep) if découper else ser
+
+        ser.lectures = 0
+        début = time.perf_counter()
+        for _ in range(BLOCS):
+            analyser(lecteur.read_until(sep))
+        durée = time.perf_counter() - début
+        ser.close()
+
+    return BLOCS / durée, ser.lectures / BLOCS
+
+if __name__ == '__main__':
+    print('protocole\tlecture\t\tblocs/s\tlectures/bloc')
+    for mode in (TEXTE, BINAIRE):
+        for découper, nom in ((False, 'read_until'), (True, 'Découpeur')):
+            débit, lectures = essai(mode, découper)
+            print(f'{mode}\t{nom:10s}\t{débit:8.0f}\t{lectures:8.1f}')
@@ -0,0 +1,98 @@
+'''Temps de démarrage de l'auditeur et des clients
+
+Mesure, chaque fois dans un processus neuf:
+
+``import``
+    Temps d'importation de chaque programme et de ses dépendances, et les
+    modules lourds (:py:data:`LOURDS`) qui ont été chargés au passage. Sans
+    affichage, aucun ne devrait l'être.
+``premier bloc``
+    Temps entre le lancement de l'auditeur (importation comprise) et la
+    fin de l'analyse du premier bloc, contre un
+    :py:class:`extra.simulateur.PseudoAnnonceur` qui attend
+    :py:data:`DÉMARRAGE` secondes avant sa bannière, comme un Arduino qui
+    redémarre à l'ouverture du port. La figure est créée avec le moteur
+    ``Agg``, sans fenêtre.
+
+Le premier essai ne fonctionne que sous Linux et macOS, sans
+micro-contrôleur.
+
+.. code-block:: console
+
+    $ python3 tests/banc_demarrage.py
+'''
+
+import os
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+RACINE: Path = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RACINE / 'src'))
+
+PROGRAMMES: tuple[str, ...] = ('auditeur', 'client.base', 'client.rapide') #: Programmes importés
+LOURDS: tuple[str, ...] = ('matplotlib', 'matplotlib.pyplot', 'scipy', 'scipy.signal') #: Modules lents à importer
+ESSAIS: int = 5 #: Nombre de processus par mesure, le meilleur temps est gardé
+DÉMARRAGE: float = 1. #: Attente simulée de l'Arduino avant sa bannière, en secondes
+
+IMPORTER: str = '''
+import sys, time, json
+début = time.perf_counter()
+import {module}
+durée = time.perf_counter() - début
+print(json.dumps({{'durée': durée, 'lourds': [m for m in {lourds!r} if m in sys.modules]}}))
+'''
+'''Programme exécuté dans chaque processus pour mesurer l'importation'''
+
+PREMIER_BLOC: str = '''
+import time, json
+début = time.perf_counter()
+import auditeur
+importé = time.perf_counter()
+from extra.simulateur import PseudoAnnonceur
+
+annonceur = PseudoAnnonceur(auditeur.N_max, démarrage={démarrage})
+annonceur.start()
+params = auditeur.setup(annonceur.port)
+prêt = time.perf_counter()
+res, ser, rendu, spectre, horloge, enregistreur, schéma = params
+while not auditeur.acquérir(res, ser, spectre, horloge, délai=0.1, schéma=schéma):
+    pass
+fin = time.perf_counter()
+auditeur.setdown(*params)
+annonceur.arrêter()
+print(json.dumps({{'import': importé - début, 'setup': prêt - importé, 'premier bloc': fin - début}}))
+'''
+'''Programme exécuté dans chaque processus pour mesurer le premier bloc'''
+
+
+def exécuter(programme: str) -> dict:
+    '''Exécute ``programme`` dans un processus neuf, et lit son résultat'''
+    environnement = os.environ | {'PYTHONPATH': str(RACINE / 'src'), 'MPLBACKEND': 'Agg'}
+    sortie = subprocess.run([sys.executable, '-c', programme], env=environnement,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(sortie.splitlines()[-1])
+
+
+def importation(module: str) -> tuple[float, list[str]]:
+    '''Meilleur temps d'importation, en secondes, et modules lourds chargés'''
+    résultats = [exécuter(IMPORTER.format(module=module, lourds=LOURDS)) for _ in range(ESSAIS)]
+    return min(r['durée'] for r in résultats), résultats[0]['lourds']
+
+
+def premier_bloc() -> dict[str, float]:
+    '''Meilleurs temps jusqu'au premier bloc analysé par l'auditeur, en secondes'''
+    résultats = [exécuter(PREMIER_BLOC.format(démarrage=DÉMARRAGE)) for _ in range(ESSAIS)]
+    return {k: min(r[k] for r in résultats) for k in résultats[0]}
+
+
+if __name__ == '__main__':
+    print('programme\timport (s)\tmodules lourds')
+    for module in PROGRAMMES:
+        durée, lourds = importation(module)
+        print(f'{module}\t{durée:.3f}\t\t{", ".join(lourds) or "-"}')
+
+    print(f'\nauditeur, Arduino prêt après {DÉMARRAGE} s')
+    for étape, durée in premier_bloc().items():
+        print(f'{étape}\t{durée:.3f} s')
@@ -0,0 +1,59 @@
+'''Banc d'essai des transformées de Fourier multi-canaux des clients
+
+Compare, pour un nombre croissant de photodiodes, l'ancienne version de
+``client.base.fft`` (une transformée et une conversion par canal) et la
+version par lot de :py:func:`extra.fft.spectres`, en double et en simple
+précision. Les résultats doivent être identiques à l'arrondi près.
+
+.. code-block:: console
+
+    $ python3 tests/banc_fft.py
+'''
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import numpy as np
+import scipy.signal
+
+from extra.fft import spectres
+
+N: int = 500 #: Nombre de mesures par canal, comme ``client.rapide.N_max``
+RÉPÉTITIONS: int = 200 #: Nombre d'appels chronométrés pour chaque essai
+
+def par_canal(res: list[list[int]], N: int = N, cadre: str = 'hann') -> list[np.ndarray]:
+    '''L'ancienne boucle, une photodiode à la fois'''
+    ys = []
+    for sig in res[1:]:
+        fenêtre = scipy.signal.get_window(cadre, N)
+        signal = np.array(sig[-N:]) * fenêtre
+        ys.append(np.abs(np.fft.rfft(signal)))
+    return ys
+
+def par_lot(res: list[list[int]], N: int = N, cadre: str = 'hann', dtype=np.float64) -> np.ndarray:
+    '''La nouvelle version de ``client.base.fft``'''
+    signaux = np.array([sig[-N:] for sig in res[1:]], dtype=dtype)
+    return spectres(signaux, cadre, dtype)
+
+def chrono(f, *args, **kargs) -> float:
+    '''Durée moyenne d'un appel, en µs'''
+    return min(timeit.repeat(lambda: f(*args, **kargs), number=RÉPÉTITIONS, repeat=3)) / RÉPÉTITIONS * 1e6
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    print('canaux\tpar canal (µs)\tlot f64 (µs)\tlot f32 (µs)\taccélération f64\tf32')
+    for canaux in (1, 2, 4, 8, 16, 32):
+        # Même format que les clients: des listes Python d'entiers
+        res = [list(range(N))] + [rng.integers(0, 1024, N).tolist() for _ in range(canaux)]
+
+        référence = np.array(par_canal(res))
+        assert np.allclose(par_lot(res), référence)
+        assert np.allclose(par_lot(res, dtype=np.float32), référence, rtol=1e-3, atol=1e-2 * référence.max())
+
+        t0 = chrono(par_canal, res)
+        t1 = chrono(par_lot, res)
+        t2 = chrono(par_lot, res, dtype=np.float32)
+        print(f'{canaux}\t{t0:10.1f}\t{t1:10.1f}\t{t2:10.1f}\t{t0/t1:10.1f}×\t{t0/t2:6.1f}×')
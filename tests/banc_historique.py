@@ -0,0 +1,113 @@
+'''Coût d'une image des clients selon la durée de l'acquisition
+
+Avant, ``client.base`` gardait ses mesures dans des listes Python
+``[t, pd1, pd2, ...]``: chaque image reconvertissait tout l'historique des
+temps en tableau, et estimait la période sur tout l'historique. Avec
+:py:func:`client.base.mesures`, chaque image ne lit que des vues des
+dernières valeurs.
+
+Pour des historiques de plus en plus longs, le banc mesure:
+
+``ajout (µs)``
+    Ajout d'un lot de :py:data:`LOT` mesures de :py:data:`PDS` photodiodes
+``image (ms)``
+    Préparation d'une image: transformée de Fourier et données de la
+    fenêtre affichée, sans matplotlib
+``mémoire (o/mesure)``
+    Mémoire utilisée par mesure (temps et photodiodes), selon
+    :py:mod:`tracemalloc`
+
+.. code-block:: console
+
+    $ python3 tests/banc_historique.py
+'''
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import numpy as np
+
+from client import base
+from extra.fft import spectres, fréquences
+
+HISTORIQUES: tuple[int, ...] = (1_000, 10_000, 100_000, 1_000_000) #: Nombres de mesures essayés
+PDS: int = 2 #: Nombre de photodiodes
+LOT: int = 16 #: Nombre de mesures par ajout
+RÉPÉTITIONS: int = 20 #: Nombre d'images chronométrées
+
+
+def lots(n: int):
+    '''Lots de mesures simulées, 1 ms entre deux mesures'''
+    rng = np.random.default_rng(0)
+    for début in range(0, n, LOT):
+        temps = np.arange(début, début + LOT, dtype=np.int64) * 1_000_000
+        yield temps, rng.integers(0, 1024, (LOT, PDS))
+
+
+def image_listes(res: list[list[int]]):
+    '''Ancienne préparation d'une image, sur des listes'''
+    N = min(len(res[0]), 50)
+    ts = res[0]
+    d = np.mean(np.array(ts[1:]) - np.array(ts[:-1]))
+    signaux = np.array([sig[-N:] for sig in res[1:]], dtype=np.float64)
+    spectres(signaux), fréquences(N, d)
+    ts = np.array(res[0])
+    ts = (ts - ts[-1]) * base.ns2s
+    return ts, res[1:]
+
+
+def image_colonnes(res):
+    '''Préparation d'une image comme :py:func:`client.base.plot`'''
+    base.fft(res)
+    t = res.dernier('t')
+    n = t.size - np.searchsorted(t, t[-1] - base.FENÊTRE / base.ns2s)
+    ts = (t[-n:] - t[-1]) * base.ns2s
+    return ts, [res.dernier(pd, n) for pd in res.colonnes[1:]]
+
+
+def essai_listes(n: int) -> tuple[float, float, float]:
+    tracemalloc.start()
+    res: list[list[int]] = [[] for _ in range(PDS + 1)]
+    début = time.perf_counter()
+    for temps, valeurs in lots(n):
+        res[0].extend(temps.tolist())
+        for r, v in zip(res[1:], valeurs.T):
+            r.extend(v.tolist())
+    ajout = (time.perf_counter() - début) / (n / LOT)
+    mémoire = tracemalloc.get_traced_memory()[0] / n
+    tracemalloc.stop()
+
+    début = time.perf_counter()
+    for _ in range(RÉPÉTITIONS):
+        image_listes(res)
+    return ajout, (time.perf_counter() - début) / RÉPÉTITIONS, mémoire
+
+
+def essai_colonnes(n: int) -> tuple[float, float, float]:
+    tracemalloc.start()
+    res = base.mesures(PDS, None)
+    début = time.perf_counter()
+    for temps, valeurs in lots(n):
+        res.ajouter('t', temps)
+        for nom, v in zip(res.colonnes[1:], valeurs.T):
+            res.ajouter(nom, v)
+    ajout = (time.perf_counter() - début) / (n / LOT)
+    mémoire = tracemalloc.get_traced_memory()[0] / n
+    tracemalloc.stop()
+
+    début = time.perf_counter()
+    for _ in range(RÉPÉTITIONS):
+        image_colonnes(res)
+    return ajout, (time.perf_counter() - début) / RÉPÉTITIONS, mémoire
+
+
+if __name__ == '__main__':
+    print('mesures\t\tstockage\tajout (µs)\timage (ms)\tmémoire (o/mesure)')
+    for n in HISTORIQUES:
+        for nom, essai in (('listes', essai_listes), ('colonnes', essai_colonnes)):
+            ajout, image, mémoire = essai(n)
+            print(f'{n:<8}\t{nom}\t\t{ajout * 1e6:8.1f}\t{image * 1e3:8.3f}\t{mémoire:8.1f}')
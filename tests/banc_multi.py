@@ -0,0 +1,100 @@
+'''Banc d'essai de l'acquisition simultanée sur plusieurs ports
+
+Lance 1, 2, 4 puis 8 faux annonceurs (:py:class:`extra.simulateur.PseudoAnnonceur`)
+sur des pseudo-terminaux et les lit tous avec :py:mod:`extra.acquisition`.
+Chaque faux annonceur est limité au débit de :py:data:`DEBIT`: le débit total
+devrait augmenter avec le nombre de ports. Un dernier essai ajoute un port
+dix fois plus lent, qui ne doit pas ralentir les autres.
+
+Chaque faux annonceur envoie environ :py:data:`DURÉE` secondes de blocs,
+puis s'arrête. Le banc vérifie que chaque appareil a reçu tous les blocs de
+son annonceur, et seulement ceux-là: autant de blocs que
+:py:attr:`~extra.simulateur.PseudoAnnonceur.envoyés`, aucun bloc invalide,
+le temps toujours croissant, et les valeurs de chaque bloc dans l'ordre
+d'envoi.
+
+Fonctionne sous Linux et macOS, sans micro-contrôleur.
+
+.. code-block:: console
+
+    $ python3 tests/banc_multi.py
+'''
+
+import sys
+import time
+import asyncio
+import contextlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import numpy as np
+
+from extra.acquisition import Acquisition, Appareil
+from extra.simulateur import PseudoAnnonceur, N_DÉFAUT, bloc, valeurs
+
+DEBIT: int = 1000000 #: Débit simulé de chaque faux annonceur
+DURÉE: float = 2. #: Durée approximative de chaque essai, en secondes
+MODÈLES: int = 16 #: Nombre de blocs différents d'un faux annonceur, qui se répètent
+
+def essai(débits: list[int]) -> list[float]:
+    '''Blocs par seconde reçus de chaque port'''
+    # Assez de blocs pour occuper chaque port pendant environ DURÉE secondes
+    taille = len(bloc(N_DÉFAUT))
+    nombres = [max(1, round(DURÉE * d / (10 * taille))) for d in débits]
+
+    with contextlib.ExitStack() as pile:
+        annonceurs = [PseudoAnnonceur(débit=d, blocs=n) for d, n in zip(débits, nombres)]
+        # Les ports sont ouverts avant de démarrer les annonceurs, pour ne
+        # pas perdre les bannières.
+        appareils = [Appareil(a.port) for a in annonceurs]
+        acq = Acquisition(appareils)
+        pile.callback(acq.close)
+        for a in annonceurs:
+            pile.enter_context(a)
+
+        reçus: dict[str, list[dict[str, np.ndarray]]] = {app.port: [] for app in appareils}
+        fins: dict[str, float] = {}
+
+        async def principal():
+            arrêt = asyncio.Event()
+
+            def rappel(app: Appareil, mes: dict[str, np.ndarray]):
+                reçus[app.port].append(mes)
+                if app.blocs == nombres[appareils.index(app)]:
+                    fins[app.port] = time.perf_counter()
+                    if len(fins) == len(appareils):
+                        arrêt.set()
+
+            acq.rappel = rappel
+            # Une marge, pour qu'un bloc perdu fasse échouer le banc plutôt
+            # que de le bloquer.
+            await acq.exécuter(arrêt, durée=3 * DURÉE + 1)
+
+        début = time.perf_counter()
+        asyncio.run(principal())
+
+    for a, app, n in zip(annonceurs, appareils, nombres):
+        assert app.invalides == 0, f'{app.invalides} blocs invalides sur {app.port}'
+        assert app.blocs == a.envoyés == n, f'{app.blocs} blocs reçus sur {app.port}, {a.envoyés} envoyés'
+        assert app.res['ts'].total == n * N_DÉFAUT
+
+        # Les blocs de chaque appareil sont ceux de son annonceur, complets
+        # et dans l'ordre d'envoi.
+        ts = np.concatenate([mes['ts'] for mes in reçus[app.port]])
+        assert np.all(np.diff(ts) > 0), f'Temps non croissant sur {app.port}'
+        for i, mes in enumerate(reçus[app.port]):
+            attendu = valeurs(N_DÉFAUT, i % MODÈLES)
+            for nom in ('A0', 'F'):
+                assert np.array_equal(mes[nom], attendu[nom]), f'Bloc {i} de {app.port} différent sur {nom}'
+
+    return [n / (fins[app.port] - début) for app, n in zip(appareils, nombres)]
+
+if __name__ == '__main__':
+    print('ports\tblocs/s total\tblocs/s par port')
+    for n in (1, 2, 4, 8):
+        par_port = essai([DEBIT] * n)
+        print(f'{n}\t{sum(par_port):10.1f}\t{np.mean(par_port):10.1f}')
+
+    *rapides, lent = essai([DEBIT] * 4 + [DEBIT // 10])
+    print(f'4 ports + 1 lent\trapides: {np.mean(rapides):.1f} blocs/s\tlent: {lent:.1f} blocs/s')
@@ -0,0 +1,58 @@
+'''Banc d'essai de l'interprétation des blocs de l'annonceur
+
+Compare :py:func:`extra.parseur.analyser_bloc` à l'ancienne interprétation
+valeur par valeur de ``auditeur.prendre_mesure``, sur des blocs de 256
+mesures. Aucun micro-contrôleur n'est nécessaire.
+
+.. code-block:: console
+
+    $ python3 tests/banc_parseur.py
+'''
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import numpy as np
+
+from extra import simulateur
+from extra.parseur import analyser_bloc, DELIM_VAL, SEP_NOM, SEP_VAL, SEP_LIGNE
+
+def analyser_bloc_naïf(bloc: bytes) -> dict[str, np.ndarray]:
+    '''Interprétation valeur par valeur, telle qu'elle était dans ``auditeur.prendre_mesure``'''
+    mes = {}
+    for l in bloc.strip().split(SEP_LIGNE):
+        if SEP_NOM not in l:
+            return {}
+        nom, valeurs = l.split(SEP_NOM, 1)
+        nom = nom.strip().decode('utf-8')
+        valeurs_separees = valeurs.strip(DELIM_VAL).split(SEP_VAL)
+        mes[nom] = np.array([np.float64(v) for v in valeurs_separees])
+    return mes
+
+def mesurer(f, blocs: list[bytes], répétitions: int) -> float:
+    '''Nombre de valeurs converties par seconde'''
+    n_valeurs = sum(v.size for v in f(blocs[0]).values()) * len(blocs) * répétitions
+    début = time.perf_counter()
+    for _ in range(répétitions):
+        for b in blocs:
+            f(b)
+    return n_valeurs / (time.perf_counter() - début)
+
+if __name__ == '__main__':
+    N = 256
+    blocs = [simulateur.bloc(N, i) for i in range(100)]
+
+    # Les deux interprétations doivent donner les mêmes valeurs
+    for b in blocs:
+        a, n = analyser_bloc(b), analyser_bloc_naïf(b)
+        assert a.keys() == n.keys()
+        assert all(np.array_equal(a[k], n[k]) for k in a)
+
+    naïf = mesurer(analyser_bloc_naïf, blocs, 20)
+    rapide = mesurer(analyser_bloc, blocs, 20)
+    print(f'Blocs de {N} mesures')
+    print(f'valeur par valeur\t{naïf:12.0f} valeurs/s')
+    print(f'numpy.fromstring\t{rapide:12.0f} valeurs/s\t×{rapide/naïf:.1f}')
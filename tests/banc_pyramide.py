@@ -0,0 +1,102 @@
+'''Coût d'une image selon le nombre de mesures dans la fenêtre affichée
+
+Avant, les clients dessinaient toutes les mesures de la fenêtre: plus la
+fenêtre est longue ou la fréquence d'échantillonage élevée, plus chaque
+image coûte cher, même si l'axe n'a que quelques centaines de pixels. Avec
+une :py:class:`extra.pyramide.Pyramide`, on ne dessine qu'au plus deux
+points par pixel.
+
+Pour des fenêtres de plus en plus de mesures, le banc mesure, sur une figure
+:py:data:`LARGEUR` pixels de large dessinée par le moteur Agg (sans
+fenêtre):
+
+``points``
+    Nombre de points dessinés pour chaque courbe
+``image (ms)``
+    Ajout d'un lot de :py:data:`LOT` mesures, préparation des données de la
+    fenêtre et dessin complet de la figure
+``mise à jour (ns/mesure)``
+    Coût de :py:meth:`extra.pyramide.Pyramide.mettre_à_jour` par mesure
+    ajoutée
+
+.. code-block:: console
+
+    $ python3 tests/banc_pyramide.py
+'''
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from client.base import mesures
+from extra.pyramide import Pyramide
+
+FENÊTRES: tuple[int, ...] = (1_000, 10_000, 100_000, 1_000_000) #: Nombres de mesures dans la fenêtre
+PDS: int = 2 #: Nombre de photodiodes
+LOT: int = 1_000 #: Nombre de mesures ajoutées avant chaque image
+LARGEUR: int = 640 #: Largeur de la figure, en pixels
+RÉPÉTITIONS: int = 10 #: Nombre d'images chronométrées
+
+
+def signal(début: int, n: int) -> tuple[np.ndarray, np.ndarray]:
+    '''Temps en ns (1 ms entre deux mesures) et valeurs simulées'''
+    i = np.arange(début, début + n)
+    rng = np.random.default_rng(début)
+    v = 512 + 300 * np.sin(2 * np.pi * 1.2e-3 * i)[None, :] + 20 * rng.standard_normal((PDS, n))
+    return i * 1_000_000, np.clip(v, 0, 1023).astype(np.int16)
+
+
+def ajouter(res, début: int, n: int):
+    t, v = signal(début, n)
+    res.ajouter('t', t)
+    for nom, vi in zip(res.colonnes[1:], v):
+        res.ajouter(nom, vi)
+
+
+def essai(n: int, réduire: bool) -> tuple[int, float, float]:
+    fig, ax = plt.subplots(figsize=(LARGEUR / 100, 3), dpi=100)
+    lignes = [ax.plot([])[0] for _ in range(PDS)]
+    ax.set_xlim(-n * 1e-3, 0)
+    ax.set_ylim(0, 1030)
+
+    res = mesures(PDS)
+    ajouter(res, 0, n)
+    pyramide = Pyramide(res)
+    pyramide.mettre_à_jour()
+    largeur = round(ax.bbox.width)
+
+    mise_à_jour = 0.
+    durée = 0.
+    for r in range(RÉPÉTITIONS):
+        ajouter(res, n + r * LOT, LOT)
+        début = time.perf_counter()
+        if réduire:
+            pyramide.mettre_à_jour()
+            mise_à_jour += time.perf_counter() - début
+        t = res.dernier('t')
+        fin = t[-1]
+        for nom, ligne in zip(res.colonnes[1:], lignes):
+            if réduire:
+                tp, vp = pyramide.vue(nom, largeur, fin - n * 1_000_000)
+            else:
+                tp, vp = t[-n:], res.dernier(nom, n)
+            ligne.set_data((tp - fin) * 1e-9, vp)
+        fig.canvas.draw()
+        durée += time.perf_counter() - début
+    plt.close(fig)
+    return tp.size, durée / RÉPÉTITIONS, mise_à_jour / (RÉPÉTITIONS * LOT)
+
+
+if __name__ == '__main__':
+    print('fenêtre\t\taffichage\tpoints\timage (ms)\tmise à jour (ns/mesure)')
+    for n in FENÊTRES:
+        for nom, réduire in (('toutes', False), ('pyramide', True)):
+            points, image, mise_à_jour = essai(n, réduire)
+            print(f'{n:<8}\t{nom:<8}\t{points}\t{image * 1e3:8.2f}\t{mise_à_jour * 1e9:8.1f}')
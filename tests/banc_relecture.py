@@ -0,0 +1,62 @@
+'''Débit maximal de l'acquisition de l'auditeur, sans micro-contrôleur
+
+Rejoue :py:data:`BLOCS` blocs synthétiques avec
+:py:class:`extra.relecture.Relecture`, aussi vite que possible
+(``vitesse=None``), à travers :py:func:`auditeur.acquérir`: découpage,
+analyse, correction de l'horloge et transformée de Fourier, sans
+affichage. Le débit obtenu est comparé au débit réel de l'annonceur, pour
+savoir combien de fois plus vite que le micro-contrôleur l'acquisition peut
+aller.
+
+Fonctionne sous tous les systèmes d'exploitation, sans micro-contrôleur ni
+pseudo-terminal.
+
+.. code-block:: console
+
+    $ python3 tests/banc_relecture.py
+'''
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import auditeur
+
+from extra.fft import STFT
+from extra.horloge import Horloge
+from extra.lecteur import Découpeur
+from extra.parseur import SEP_BLOC
+from extra.relecture import Relecture
+from extra.trames import schéma as lire_schéma, séparateur, TEXTE, BINAIRE
+
+BLOCS: int = 500 #: Nombre de blocs rejoués pour chaque essai
+
+def essai(protocole: str) -> tuple[float, float]:
+    '''Blocs par seconde, et facteur par rapport au temps réel'''
+    relecture = Relecture.synthétique(auditeur.N_max, protocole, BLOCS,
+                                      vitesse=None, timeout=0.1)
+    ser = Découpeur(relecture)
+    schéma = lire_schéma(ser.read_until(SEP_BLOC)) # Bannière
+    ser.séparateur = séparateur(schéma.protocole)
+
+    res = auditeur.mesures(schéma)
+    spectre = STFT(schéma.N, 'hann', saut=auditeur.SAUT)
+    horloge = Horloge(unité=auditeur.us)
+
+    début = time.perf_counter()
+    # Le découpeur garde des blocs d'avance même quand la relecture est
+    # terminée.
+    while auditeur.acquérir(res, ser, spectre, horloge, schéma=schéma) or not relecture.terminé:
+        pass
+    durée = time.perf_counter() - début
+
+    débit = BLOCS / durée
+    return débit, débit * relecture.durée
+
+if __name__ == '__main__':
+    print('protocole\tblocs/s\t\tfois le temps réel')
+    for protocole in (TEXTE, BINAIRE):
+        débit, facteur = essai(protocole)
+        print(f'{protocole}\t\t{débit:8.0f}\t{facteur:8.1f}')
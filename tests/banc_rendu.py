@@ -0,0 +1,91 @@
+'''Banc d'essai de l'affichage en direct
+
+Compare le nombre d'images par seconde de l'ancienne mise à jour (limites
+changées et figure redessinée à chaque image, comme avec
+:py:func:`matplotlib.pyplot.pause`) et de :py:class:`extra.rendu.RenduBlit`.
+Utilise le moteur Agg, sans fenêtre.
+
+.. code-block:: console
+
+    $ python3 tests/banc_rendu.py
+'''
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+
+from extra import simulateur
+from extra.rendu import RenduBlit
+
+N: int = 256 #: Nombre de mesures affichées
+IMAGES: int = 200 #: Nombre d'images par essai
+
+def figure():
+    '''Figure semblable à celle de ``auditeur.setup``'''
+    fig, (ax, ax2) = plt.subplots(1, 2, figsize=(12, 6))
+    fig.suptitle('Banc d\'essai')
+    ax.set_xlabel('Temps (s)')
+    ax.plot([], color='black', label='A0', ls=':', marker='.')
+    ax.legend()
+    ax2.plot([], color='black', label='FFT (Arduino)', ls=':')
+    ax2.plot([], color='red', label='FFT (Python)', ls=':')
+    ax2.legend()
+    ax.set_ylim(0, 1024)
+    ax2.set_ylim(0, 1)
+    fig.tight_layout()
+    return fig
+
+def images(i: int):
+    v = simulateur.valeurs(N, i)
+    ts = v['ts'] * 1e-6
+    fs = np.fft.rfftfreq(N, 1e-4)[:N//2]
+    F = v['F'] / v['F'].max()
+    return ts, v['A0'], fs, F
+
+def naïf() -> float:
+    fig = figure()
+    ax, ax2 = fig.axes
+    début = time.perf_counter()
+    for i in range(IMAGES):
+        ts, A0, fs, F = images(i)
+        ax.lines[0].set_data(ts, A0)
+        ax.set_xlim(ts[0], ts[-1])
+        ax2.set_xlim(fs[0], fs[-1])
+        ax2.lines[0].set_data(fs, F)
+        ax2.lines[1].set_data(fs, F)
+        fig.canvas.draw()
+        fig.canvas.flush_events()
+    plt.close(fig)
+    return IMAGES / (time.perf_counter() - début)
+
+def blit() -> float:
+    fig = figure()
+    rendu = RenduBlit(fig, fps_max=None)
+    ax, ax2 = rendu.axes
+    début = time.perf_counter()
+    for i in range(IMAGES):
+        ts, A0, fs, F = images(i)
+        ts = ts - ts[-1]
+        ax.lines[0].set_data(ts, A0)
+        rendu.ajuster(ax, x=ts)
+        rendu.ajuster(ax2, x=fs)
+        ax2.lines[0].set_data(fs, F)
+        ax2.lines[1].set_data(fs, F)
+        rendu.afficher()
+    rendu.close()
+    plt.close(fig)
+    print(f'{rendu.redessins} redessins complets sur {rendu.images} images')
+    return IMAGES / (time.perf_counter() - début)
+
+if __name__ == '__main__':
+    avant = naïf()
+    après = blit()
+    print(f'figure redessinée\t{avant:8.1f} images/s')
+    print(f'RenduBlit\t\t{après:8.1f} images/s\t×{après/avant:.1f}')
@@ -0,0 +1,72 @@
+'''Coût d'un appel en parallèle: un processus par appel ou des travailleurs
+
+L'ancien :py:func:`extra.decorators.en_parallèle` démarrait un
+:py:class:`multiprocessing.Process` par appel, jamais attendu. Le banc
+compare, pour :py:data:`APPELS` appels d'une fonction presque vide:
+
+``Process par appel``
+    Démarrer un processus par appel, comme avant (avec ``join``, sinon les
+    processus restent en zombies)
+``Travailleurs (fils)``
+    :py:class:`extra.decorators.Travailleurs`, fils d'exécution persistants
+``Travailleurs (processus)``
+    :py:class:`extra.decorators.Travailleurs`, processus persistants
+
+et rapporte le nombre d'appels par seconde, le temps que le programme
+principal passe à soumettre chaque appel, et les processus enfants qui
+restent après la fermeture.
+
+.. code-block:: console
+
+    $ python3 tests/banc_travailleurs.py
+'''
+
+import sys
+import time
+import multiprocessing
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+from extra.decorators import Travailleurs
+
+APPELS: int = 200 #: Nombre d'appels par essai
+
+
+def tâche(x: int) -> int:
+    return x + 1
+
+
+def par_processus() -> tuple[float, float]:
+    début = time.perf_counter()
+    processus = []
+    for i in range(APPELS):
+        p = multiprocessing.Process(target=tâche, args=(i,))
+        p.start()
+        processus.append(p)
+    soumission = time.perf_counter() - début
+    for p in processus:
+        p.join()
+    return time.perf_counter() - début, soumission
+
+
+def par_travailleurs(processus: bool) -> tuple[float, float]:
+    with Travailleurs(2, processus=processus) as groupe:
+        # Les travailleurs sont démarrés avant de chronométrer.
+        groupe.soumettre(tâche, 0).result()
+        début = time.perf_counter()
+        futurs = [groupe.soumettre(tâche, i) for i in range(APPELS)]
+        soumission = time.perf_counter() - début
+        assert [f.result() for f in futurs] == list(range(1, APPELS + 1))
+        durée = time.perf_counter() - début
+    return durée, soumission
+
+
+if __name__ == '__main__':
+    print('méthode\t\t\t\tappels/s\tsoumission (ms/appel)\tenfants restants')
+    for nom, essai in (('Process par appel', par_processus),
+                       ('Travailleurs (fils)', lambda: par_travailleurs(False)),
+                       ('Travailleurs (processus)', lambda: par_travailleurs(True))):
+        durée, soumission = essai()
+        restants = len(multiprocessing.active_children())
+        print(f'{nom:<24}\t{APPELS / durée:8.0f}\t{soumission / APPELS * 1e3:8.3f}\t\t{restants}')
@@ -1,8 +1,15 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
 from serial.tools.list_ports import comports
 from serial.tools.miniterm import Miniterm, key_description
 from serial import Serial
 import logging
 
+from extra.lecteur import Découpeur
+
 def choix():
     ports_disponibles = comports()
     for i, c in enumerate(ports_disponibles):
@@ -25,9 +32,10 @@ if __name__ == '__main__':
     logging.info('--- Allez! ---')
     try:
         s.open()
+        d = Découpeur(s, b'\r\n\r\n')
         while True:
-            bloc = s.read_until(b'\r\n\r\n')
-            print(bloc.decode('utf-8'))
+            bloc = d.read_until()
+            print(str(bloc, 'utf-8'))
     except KeyboardInterrupt:
         logging.info('Arrêt par ^C.')
     finally: